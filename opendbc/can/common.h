@@ -17,6 +17,7 @@
 
 #define MAX_BAD_COUNTER 5
 #define CAN_INVALID_CNT 5
+#define CAN_MAX_DATA_LEN 64
 
 // Car specific functions
 unsigned int honda_checksum(uint32_t address, const Signal &sig, const std::vector<uint8_t> &d);
@@ -32,7 +33,8 @@ unsigned int pedal_checksum(uint32_t address, const Signal &sig, const std::vect
 struct CanFrame {
   long src;
   uint32_t address;
-  std::vector<uint8_t> dat;
+  uint32_t size;  // frames longer than CAN_MAX_DATA_LEN are skipped
+  uint8_t dat[CAN_MAX_DATA_LEN];
 };
 
 struct CanData {
@@ -50,6 +52,16 @@ public:
   std::vector<double> vals;
   std::vector<std::vector<double>> all_vals;
 
+  // per-frame scratch, allocated once so parsing doesn't allocate
+  std::vector<double> tmp_vals;
+  std::vector<uint8_t> frame_dat;
+  bool updated = false;
+
+  // change tracking: values before this update, and the signals that differ
+  bool track_changes = false;
+  std::vector<double> prev_vals;
+  std::vector<int> changed_sigs;
+
   uint64_t last_seen_nanos;
   uint64_t check_threshold;
 
@@ -59,8 +71,10 @@ public:
   bool ignore_checksum = false;
   bool ignore_counter = false;
 
-  bool parse(uint64_t nanos, const std::vector<uint8_t> &dat);
+  void init_signals(const std::vector<Signal> &sigs);
+  bool parse(uint64_t nanos, const uint8_t *dat, size_t dat_size);
   bool update_counter_generic(int64_t v, int cnt_size);
+  void update_changes();
 };
 
 class CANParser {
@@ -68,10 +82,15 @@ private:
   const int bus;
   const DBC *dbc = NULL;
   std::unordered_map<uint32_t, MessageState> message_states;
+  std::vector<uint32_t> updated_addresses;
+  uint64_t last_log_time = 0;
 
 public:
   bool can_valid = false;
   bool bus_timeout = false;
+  // checked messages that are not seen yet, or timed out, as of the last update
+  std::vector<uint32_t> missing_addresses;
+  std::vector<uint32_t> timed_out_addresses;
   uint64_t first_nanos = 0;
   uint64_t last_nonempty_nanos = 0;
   uint64_t bus_timeout_threshold = 0;
@@ -80,22 +99,39 @@ public:
   CANParser(int abus, const std::string& dbc_name,
             const std::vector<std::pair<uint32_t, int>> &messages);
   CANParser(int abus, const std::string& dbc_name, bool ignore_checksum, bool ignore_counter);
-  std::set<uint32_t> update(const std::vector<CanData> &can_data);
+  const std::vector<uint32_t> &update(const std::vector<CanData> &can_data);
+  void decode(size_t n, const uint64_t *nanos, const uint32_t *addresses, const uint8_t *buses,
+              const uint8_t *dat, const uint64_t *offsets, std::unordered_map<uint32_t, std::vector<uint64_t>> &timestamps,
+              std::unordered_map<uint32_t, std::vector<std::vector<double>>> &values);
   MessageState *getMessageState(uint32_t address) { return &message_states.at(address); }
+  void set_track_changes(bool track);
 
 protected:
-  void UpdateCans(const CanData &can, std::set<uint32_t> &updated_addresses);
+  void UpdateCans(const CanData &can);
   void UpdateValid(uint64_t nanos);
 };
 
 class CANPacker {
 private:
+  // everything needed to pack a message, resolved once at construction
+  struct MessagePacker {
+    const Msg *msg;
+    std::unordered_map<std::string, const Signal *> signal_lookup;
+    const Signal *counter = nullptr;
+    const Signal *checksum = nullptr;
+    uint32_t counter_value = 0;
+  };
+
   const DBC *dbc = NULL;
-  std::map<std::pair<uint32_t, std::string>, Signal> signal_lookup;
-  std::map<uint32_t, uint32_t> counters;
+  std::unordered_map<uint32_t, MessagePacker> messages;
+
+  void set_signal(std::vector<uint8_t> &msg, MessagePacker &packer, const Signal &sig, double value, bool &counter_set);
+  std::vector<uint8_t> pack(uint32_t address, const std::vector<SignalPackIndexValue> &values,
+                            const std::vector<SignalPackValue> &named_values);
 
 public:
   CANPacker(const std::string& dbc_name);
   std::vector<uint8_t> pack(uint32_t address, const std::vector<SignalPackValue> &values);
+  std::vector<std::vector<uint8_t>> pack(const std::vector<MessagePackValues> &msgs);
   const Msg* lookup_message(uint32_t address);
 };
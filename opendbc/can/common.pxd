@@ -58,20 +58,36 @@ cdef extern from "common_dbc.h":
     string name
     double value
 
+  cdef struct SignalPackIndexValue:
+    int index
+    double value
+
+  cdef struct MessagePackValues:
+    uint32_t address
+    vector[SignalPackIndexValue] values
+    vector[SignalPackValue] named_values
+
 
 cdef extern from "common.h":
   cdef const DBC* dbc_lookup(const string) except +
 
   cdef cppclass MessageState:
+    string name
+    uint32_t address
     vector[Signal] parse_sigs
     vector[double] vals
     vector[vector[double]] all_vals
     uint64_t last_seen_nanos
+    vector[double] prev_vals
+    vector[int] changed_sigs
+
+  cdef int CAN_MAX_DATA_LEN
 
   cdef struct CanFrame:
     long src
     uint32_t address
-    vector[uint8_t] dat
+    uint32_t size
+    uint8_t dat[64]
 
   cdef struct CanData:
     uint64_t nanos
@@ -80,10 +96,16 @@ cdef extern from "common.h":
   cdef cppclass CANParser:
     bool can_valid
     bool bus_timeout
+    vector[uint32_t] missing_addresses
+    vector[uint32_t] timed_out_addresses
     CANParser(int, string, vector[pair[uint32_t, int]]) except + nogil
-    set[uint32_t] update(vector[CanData]&) except + nogil
+    const vector[uint32_t]& update(vector[CanData]&) except + nogil
+    void decode(size_t, const uint64_t*, const uint32_t*, const uint8_t*, const uint8_t*, const uint64_t*,
+                unordered_map[uint32_t, vector[uint64_t]]&, unordered_map[uint32_t, vector[vector[double]]]&) except + nogil
     MessageState *getMessageState(uint32_t address) nogil
+    void set_track_changes(bool)
 
   cdef cppclass CANPacker:
    CANPacker(string)
    vector[uint8_t] pack(uint32_t, vector[SignalPackValue]&)
+   vector[vector[uint8_t]] pack(vector[MessagePackValues]&)
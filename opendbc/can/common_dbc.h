@@ -1,5 +1,7 @@
 #pragma once
 
+#include <sys/stat.h>
+
 #include <cstdint>
 #include <string>
 #include <unordered_map>
@@ -10,6 +12,19 @@ struct SignalPackValue {
   double value;
 };
 
+// a signal given by its index in Msg::sigs, packed without a name lookup
+struct SignalPackIndexValue {
+  int index;
+  double value;
+};
+
+// one message of a batch pack
+struct MessagePackValues {
+  uint32_t address;
+  std::vector<SignalPackIndexValue> values;
+  std::vector<SignalPackValue> named_values;
+};
+
 enum SignalType {
   DEFAULT,
   COUNTER,
@@ -32,6 +47,13 @@ struct Signal {
   bool is_little_endian;
   SignalType type;
   unsigned int (*calc_checksum)(uint32_t address, const Signal &sig, const std::vector<uint8_t> &d);
+
+  // extraction plan, compiled at DBC load time: the raw value is
+  // (load64(dat + plan_byte) >> plan_shift) & plan_mask, loaded in the signal's
+  // byte order. only valid if plan_fast, i.e. the signal spans <= 8 bytes
+  bool plan_fast;
+  int plan_byte, plan_end, plan_shift;
+  uint64_t plan_mask;
 };
 
 struct Msg {
@@ -66,7 +88,15 @@ typedef struct ChecksumState {
   unsigned int (*calc_checksum)(uint32_t address, const Signal &sig, const std::vector<uint8_t> &d);
 } ChecksumState;
 
-DBC* dbc_parse(const std::string& dbc_path);
+void compile_signal_plan(Signal &sig);
+DBC* dbc_parse(const std::string& dbc_path, bool use_cache = false);
 DBC* dbc_parse_from_stream(const std::string &dbc_name, std::istream &stream, ChecksumState *checksum = nullptr, bool allow_duplicate_msg_name=false);
 const DBC* dbc_lookup(const std::string& dbc_name);
 std::vector<std::string> get_dbc_names();
+
+// binary cache of parsed DBCs, see dbc_cache.cc
+uint64_t dbc_cache_hash(const std::string &dbc_path, const struct stat &st);
+std::string dbc_cache_dir();
+std::string dbc_cache_path(const std::string &cache_dir, const std::string &dbc_name, uint64_t hash);
+DBC* dbc_cache_load(const std::string &cache_path, uint64_t hash);
+void dbc_cache_save(const DBC *dbc, const std::string &cache_path, uint64_t hash);
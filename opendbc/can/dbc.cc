@@ -1,25 +1,19 @@
 #include <algorithm>
+#include <cctype>
 #include <filesystem>
 #include <fstream>
 #include <map>
-#include <regex>
 #include <set>
 #include <sstream>
+#include <string_view>
 #include <vector>
 #include <mutex>
-#include <iterator>
 #include <cstring>
 #include <clocale>
 
 #include "opendbc/can/common.h"
 #include "opendbc/can/common_dbc.h"
 
-std::regex bo_regexp(R"(^BO_ (\w+) (\w+) *: (\w+) (\w+))");
-std::regex sg_regexp(R"(^SG_ (\w+) : (\d+)\|(\d+)@(\d+)([\+|\-]) \(([0-9.+\-eE]+),([0-9.+\-eE]+)\) \[([0-9.+\-eE]+)\|([0-9.+\-eE]+)\] \"(.*)\" (.*))");
-std::regex sgm_regexp(R"(^SG_ (\w+) (\w+) *: (\d+)\|(\d+)@(\d+)([\+|\-]) \(([0-9.+\-eE]+),([0-9.+\-eE]+)\) \[([0-9.+\-eE]+)\|([0-9.+\-eE]+)\] \"(.*)\" (.*))");
-std::regex val_regexp(R"(VAL_ (\w+) (\w+) (\s*[-+]?[0-9]+\s+\".+?\"[^;]*))");
-std::regex val_split_regexp{R"([\"]+)"};  // split on "
-
 #define DBC_ASSERT(condition, message)                             \
   do {                                                             \
     if (!(condition)) {                                            \
@@ -49,6 +43,128 @@ inline std::string& trim(std::string& s, const char* t = " \t\n\r\f\v") {
   return s.erase(0, s.find_first_not_of(t));
 }
 
+// Single pass scanner for the BO_, SG_ and VAL_ lines. Each method consumes
+// its token and returns true, or returns false and leaves the position alone.
+class LineScanner {
+public:
+  explicit LineScanner(const std::string &line) : p(line.data()), end(line.data() + line.size()) {}
+
+  bool lit(char c) {
+    if (p == end || *p != c) return false;
+    p++;
+    return true;
+  }
+  bool lit(std::string_view s) {
+    if (std::string_view(p, end - p).substr(0, s.size()) != s) return false;
+    p += s.size();
+    return true;
+  }
+  bool one_of(std::string_view chars, char &out) {
+    if (p == end || chars.find(*p) == std::string_view::npos) return false;
+    out = *p++;
+    return true;
+  }
+  // \w+
+  bool word(std::string_view &out) {
+    return span(out, [](char c) { return std::isalnum((unsigned char)c) || c == '_'; });
+  }
+  // \d+
+  bool digits(std::string_view &out) {
+    return span(out, [](char c) { return c >= '0' && c <= '9'; });
+  }
+  // [0-9.+\-eE]+
+  bool number(std::string_view &out) {
+    return span(out, [](char c) { return (c >= '0' && c <= '9') || c == '.' || c == '+' || c == '-' || c == 'e' || c == 'E'; });
+  }
+  // \s*, or \s+ if required
+  bool spaces(bool required = false) {
+    std::string_view out;
+    return span(out, [](char c) { return std::isspace((unsigned char)c) != 0; }) || !required;
+  }
+  void skip(char c) {
+    while (p != end && *p == c) p++;
+  }
+  std::string_view rest() const { return std::string_view(p, end - p); }
+
+  const char *p, *end;
+
+private:
+  template <typename F>
+  bool span(std::string_view &out, F match) {
+    const char *start = p;
+    while (p != end && match(*p)) p++;
+    out = std::string_view(start, p - start);
+    return p != start;
+  }
+};
+
+// BO_ <address> <name> : <size> <transmitter>
+bool scan_bo(const std::string &line, std::string_view &address, std::string_view &name, std::string_view &size) {
+  LineScanner s(line);
+  std::string_view transmitter;
+  if (!(s.lit("BO_ ") && s.word(address) && s.lit(' ') && s.word(name))) return false;
+  s.skip(' ');
+  return s.lit(": ") && s.word(size) && s.lit(' ') && s.word(transmitter) && s.p == s.end;
+}
+
+// SG_ <name> [<mux>] : <start>|<size>@<endianness><sign> (<factor>,<offset>) [<min>|<max>] "<unit>" <receivers>
+bool scan_sg(const std::string &line, std::string_view &name, std::string_view &start_bit, std::string_view &size,
+             std::string_view &endianness, char &sign, std::string_view &factor, std::string_view &offset) {
+  LineScanner s(line);
+  std::string_view mux, min, max;
+  if (!(s.lit("SG_ ") && s.word(name))) return false;
+  if (!s.lit(" : ")) {
+    if (!(s.lit(' ') && s.word(mux))) return false;
+    s.skip(' ');
+    if (!s.lit(": ")) return false;
+  }
+  return s.digits(start_bit) && s.lit('|') && s.digits(size) && s.lit('@') && s.digits(endianness) && s.one_of("+|-", sign) &&
+         s.lit(" (") && s.number(factor) && s.lit(',') && s.number(offset) && s.lit(") [") &&
+         s.number(min) && s.lit('|') && s.number(max) && s.lit("] \"") && s.rest().find("\" ") != std::string_view::npos;
+}
+
+// VAL_ <address> <signal> <value> "<definition>" ... ;
+bool scan_val(const std::string &line, std::string_view &address, std::string_view &name, std::string_view &defvals) {
+  LineScanner s(line);
+  std::string_view value;
+  char sign;
+  if (!(s.lit("VAL_ ") && s.word(address) && s.lit(' ') && s.word(name) && s.lit(' '))) return false;
+
+  const char *start = s.p;
+  s.spaces();
+  s.one_of("-+", sign);
+  if (!(s.digits(value) && s.spaces(true) && s.lit('"'))) return false;
+
+  // the first definition needs at least one character, up to the first ; after it
+  const size_t close = s.rest().find('"', 1);
+  if (close == std::string_view::npos) return false;
+  const size_t stop = s.rest().find(';', close);
+  defvals = std::string_view(start, (stop == std::string_view::npos ? s.end : s.p + stop) - start);
+  return true;
+}
+
+// "0 \"Off\" 1 \"Some value\" " -> "0 OFF 1 SOME_VALUE"
+std::string format_val_definition(std::string_view defvals) {
+  std::string def_val;
+  size_t pos = 0;
+  while (pos <= defvals.size()) {
+    size_t quote = defvals.find('"', pos);
+    if (quote == std::string_view::npos) quote = defvals.size();
+    if (quote == defvals.size() && quote == pos && pos != 0) break;
+
+    // convert strings to UPPER_CASE_WITH_UNDERSCORES
+    std::string w(defvals.substr(pos, quote - pos));
+    w = trim(w);
+    std::transform(w.begin(), w.end(), w.begin(), ::toupper);
+    std::replace(w.begin(), w.end(), ' ', '_');
+    def_val += w + " ";
+
+    pos = defvals.find_first_not_of('"', quote);
+    if (pos == std::string_view::npos) break;
+  }
+  return trim(def_val);
+}
+
 ChecksumState* get_checksum(const std::string& dbc_name) {
   ChecksumState* s = nullptr;
   if (startswith(dbc_name, {"honda_", "acura_"})) {
@@ -101,6 +217,18 @@ void set_signal_type(Signal& s, ChecksumState* chk, const std::string& dbc_name,
   }
 }
 
+void compile_signal_plan(Signal &sig) {
+  // first and last byte of the signal, in the order they are read
+  const int first_byte = (sig.is_little_endian ? sig.lsb : sig.msb) / 8;
+  const int last_byte = (sig.is_little_endian ? sig.msb : sig.lsb) / 8;
+
+  sig.plan_fast = (last_byte - first_byte) < 8;
+  sig.plan_byte = first_byte;
+  sig.plan_end = last_byte + 1;
+  sig.plan_shift = sig.is_little_endian ? (sig.lsb % 8) : ((7 - (last_byte - first_byte)) * 8 + sig.lsb % 8);
+  sig.plan_mask = sig.size >= 64 ? ~0ULL : ((1ULL << sig.size) - 1);
+}
+
 DBC* dbc_parse_from_stream(const std::string &dbc_name, std::istream &stream, ChecksumState *checksum, bool allow_duplicate_msg_name) {
   uint32_t address = 0;
   std::set<uint32_t> address_set;
@@ -111,30 +239,22 @@ DBC* dbc_parse_from_stream(const std::string &dbc_name, std::istream &stream, Ch
   dbc->name = dbc_name;
   std::setlocale(LC_NUMERIC, "C");
 
-  // used to find big endian LSB from MSB and size
-  std::vector<int> be_bits;
-  for (int i = 0; i < 64; i++) {
-    for (int j = 7; j >= 0; j--) {
-      be_bits.push_back(j + i * 8);
-    }
-  }
-
   std::string line;
   int line_num = 0;
-  std::smatch match;
-  // TODO: see if we can speed up the regex statements in this loop, SG_ is specifically the slowest
+  std::string_view tokens[7];
+  char sign;
   while (std::getline(stream, line)) {
     line = trim(line);
     line_num += 1;
     if (startswith(line, "BO_ ")) {
       // new group
-      bool ret = std::regex_match(line, match, bo_regexp);
+      bool ret = scan_bo(line, tokens[0], tokens[1], tokens[2]);
       DBC_ASSERT(ret, "bad BO: " << line);
 
       Msg& msg = dbc->msgs.emplace_back();
-      address = msg.address = std::stoul(match[1].str());  // could be hex
-      msg.name = match[2].str();
-      msg.size = std::stoul(match[3].str());
+      address = msg.address = std::stoul(std::string(tokens[0]));  // could be hex
+      msg.name = tokens[1];
+      msg.size = std::stoul(std::string(tokens[2]));
 
       // check for duplicates
       DBC_ASSERT(address_set.find(address) == address_set.end(), "Duplicate message address: " << address << " (" << msg.name << ")");
@@ -146,57 +266,42 @@ DBC* dbc_parse_from_stream(const std::string &dbc_name, std::istream &stream, Ch
       }
     } else if (startswith(line, "SG_ ")) {
       // new signal
-      int offset = 0;
-      if (!std::regex_search(line, match, sg_regexp)) {
-        bool ret = std::regex_search(line, match, sgm_regexp);
-        DBC_ASSERT(ret, "bad SG: " << line);
-        offset = 1;
-      }
+      bool ret = scan_sg(line, tokens[0], tokens[1], tokens[2], tokens[3], sign, tokens[4], tokens[5]);
+      DBC_ASSERT(ret, "bad SG: " << line);
+
       Signal& sig = signals[address].emplace_back();
-      sig.name = match[1].str();
-      sig.start_bit = std::stoi(match[offset + 2].str());
-      sig.size = std::stoi(match[offset + 3].str());
-      sig.is_little_endian = std::stoi(match[offset + 4].str()) == 1;
-      sig.is_signed = match[offset + 5].str() == "-";
-      sig.factor = std::stod(match[offset + 6].str());
-      sig.offset = std::stod(match[offset + 7].str());
+      sig.name = tokens[0];
+      sig.start_bit = std::stoi(std::string(tokens[1]));
+      sig.size = std::stoi(std::string(tokens[2]));
+      sig.is_little_endian = std::stoi(std::string(tokens[3])) == 1;
+      sig.is_signed = sign == '-';
+      sig.factor = std::stod(std::string(tokens[4]));
+      sig.offset = std::stod(std::string(tokens[5]));
       set_signal_type(sig, checksum, dbc_name, line_num);
       if (sig.is_little_endian) {
         sig.lsb = sig.start_bit;
         sig.msb = sig.start_bit + sig.size - 1;
       } else {
-        auto it = find(be_bits.begin(), be_bits.end(), sig.start_bit);
-        sig.lsb = be_bits[(it - be_bits.begin()) + sig.size - 1];
+        // big endian bits are numbered 7..0, 15..8, ... from the MSB
+        const int lsb_pos = (sig.start_bit / 8) * 8 + (7 - sig.start_bit % 8) + sig.size - 1;
+        sig.lsb = (lsb_pos / 8) * 8 + (7 - lsb_pos % 8);
         sig.msb = sig.start_bit;
       }
       DBC_ASSERT(sig.lsb < (64 * 8) && sig.msb < (64 * 8), "Signal out of bounds: " << line);
+      compile_signal_plan(sig);
 
       // Check for duplicate signal names
       DBC_ASSERT(signal_name_sets[address].find(sig.name) == signal_name_sets[address].end(), "Duplicate signal name: " << sig.name);
       signal_name_sets[address].insert(sig.name);
     } else if (startswith(line, "VAL_ ")) {
       // new signal value/definition
-      bool ret = std::regex_search(line, match, val_regexp);
+      bool ret = scan_val(line, tokens[0], tokens[1], tokens[2]);
       DBC_ASSERT(ret, "bad VAL: " << line);
 
       auto& val = dbc->vals.emplace_back();
-      val.address = std::stoul(match[1].str());  // could be hex
-      val.name = match[2].str();
-
-      auto defvals = match[3].str();
-      std::sregex_token_iterator it{defvals.begin(), defvals.end(), val_split_regexp, -1};
-      // convert strings to UPPER_CASE_WITH_UNDERSCORES
-      std::vector<std::string> words{it, {}};
-      for (auto& w : words) {
-        w = trim(w);
-        std::transform(w.begin(), w.end(), w.begin(), ::toupper);
-        std::replace(w.begin(), w.end(), ' ', '_');
-      }
-      // join string
-      std::stringstream s;
-      std::copy(words.begin(), words.end(), std::ostream_iterator<std::string>(s, " "));
-      val.def_val = s.str();
-      val.def_val = trim(val.def_val);
+      val.address = std::stoul(std::string(tokens[0]));  // could be hex
+      val.name = tokens[1];
+      val.def_val = format_val_definition(tokens[2]);
     }
   }
 
@@ -211,14 +316,33 @@ DBC* dbc_parse_from_stream(const std::string &dbc_name, std::istream &stream, Ch
   return dbc;
 }
 
-DBC* dbc_parse(const std::string& dbc_path) {
-  std::ifstream infile(dbc_path);
-  if (!infile) return nullptr;
-
+DBC* dbc_parse(const std::string& dbc_path, bool use_cache) {
   const std::string dbc_name = std::filesystem::path(dbc_path).filename();
+  auto parse_text = [&]() -> DBC* {
+    std::ifstream infile(dbc_path, std::ios::binary);
+    if (!infile) return nullptr;
+    std::unique_ptr<ChecksumState> checksum(get_checksum(dbc_name));
+    return dbc_parse_from_stream(dbc_name, infile, checksum.get());
+  };
 
-  std::unique_ptr<ChecksumState> checksum(get_checksum(dbc_name));
-  return dbc_parse_from_stream(dbc_name, infile, checksum.get());
+  const std::string cache_dir = use_cache ? dbc_cache_dir() : "";
+  struct stat st;
+  if (cache_dir.empty() || stat(dbc_path.c_str(), &st) != 0) {
+    return parse_text();
+  }
+
+  // a hit only needs the DBC's stat, its text is read on a miss
+  const uint64_t hash = dbc_cache_hash(dbc_path, st);
+  const std::string cache_path = dbc_cache_path(cache_dir, dbc_name, hash);
+  DBC *dbc = dbc_cache_load(cache_path, hash);
+  if (dbc != nullptr) return dbc;
+
+  dbc = parse_text();
+  // don't cache a DBC that changed while it was parsed under the hash of its old stat
+  if (dbc != nullptr && stat(dbc_path.c_str(), &st) == 0 && dbc_cache_hash(dbc_path, st) == hash) {
+    dbc_cache_save(dbc, cache_path, hash);
+  }
+  return dbc;
 }
 
 const std::string get_dbc_root_path() {
@@ -242,7 +366,7 @@ const DBC* dbc_lookup(const std::string& dbc_name) {
   std::unique_lock lk(lock);
   auto it = dbcs.find(dbc_name);
   if (it == dbcs.end()) {
-    it = dbcs.insert(it, {dbc_name, dbc_parse(dbc_file_path)});
+    it = dbcs.insert(it, {dbc_name, dbc_parse(dbc_file_path, true)});
   }
   return it->second;
 }
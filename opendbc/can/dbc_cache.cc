@@ -0,0 +1,325 @@
+#include <fcntl.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <filesystem>
+#include <string>
+#include <vector>
+
+#include "opendbc/can/common.h"
+#include "opendbc/can/common_dbc.h"
+
+// Binary cache of parsed DBCs. A cache file holds a header followed by the
+// messages, signals and value tables, all in host byte order:
+//   magic, format hash, hash
+//   msgs: name, address, size, sigs
+//   vals: name, address, def_val, sigs
+// Strings and vectors are prefixed by their uint32_t length. The hash covers the
+// DBC's path, size and mtime, and the format hash, so a hit only needs a stat of
+// the DBC, not its text. An edited DBC or a rebuilt parser gets a new cache file,
+// and saving it removes the DBC's older cache files.
+//
+// The cache saves parse time only: a cache file is read into a regular heap
+// allocated DBC, so no memory is shared between processes using the same DBC.
+// It's in $DBC_CACHE_DIR, $XDG_CACHE_HOME/opendbc/dbc or ~/.cache/opendbc/dbc,
+// and an empty DBC_CACHE_DIR disables it.
+
+// hash of the sources that define the parsed DBC and the cache format, set by the SConscript
+#ifndef DBC_CACHE_FORMAT_HASH
+#define DBC_CACHE_FORMAT_HASH 0ULL
+#endif
+
+namespace {
+
+const char DBC_CACHE_MAGIC[4] = {'D', 'B', 'C', 'C'};
+const uint64_t DBC_CACHE_FORMAT = DBC_CACHE_FORMAT_HASH;
+
+// smallest size of a record in the file, counts that can't fit in the rest of the file are corrupt
+const size_t SIGNAL_MIN_SIZE = 4 + 4 * 4 + 1 + 8 + 8 + 1 + 4 + 1;
+const size_t MSG_MIN_SIZE = 4 + 4 + 4 + 4;
+const size_t VAL_MIN_SIZE = 4 + 4 + 4 + 4;
+
+typedef unsigned int (*checksum_fn)(uint32_t address, const Signal &sig, const std::vector<uint8_t> &d);
+
+class CacheWriter {
+public:
+  template <typename T>
+  void put(T v) { buf.append((const char *)&v, sizeof(v)); }
+  void put(const std::string &s) {
+    put<uint32_t>(s.size());
+    buf += s;
+  }
+  void put(const std::vector<Signal> &sigs) {
+    put<uint32_t>(sigs.size());
+    for (const auto &sig : sigs) {
+      put(sig.name);
+      put<int32_t>(sig.start_bit);
+      put<int32_t>(sig.msb);
+      put<int32_t>(sig.lsb);
+      put<int32_t>(sig.size);
+      put<uint8_t>(sig.is_signed);
+      put<double>(sig.factor);
+      put<double>(sig.offset);
+      put<uint8_t>(sig.is_little_endian);
+      put<int32_t>(sig.type);
+      put<uint8_t>(sig.calc_checksum != nullptr);
+    }
+  }
+
+  std::string buf;
+};
+
+class CacheReader {
+public:
+  CacheReader(const char *data, size_t size) : p(data), end(data + size) {}
+
+  template <typename T>
+  T get() {
+    T v{};
+    if (end - p < sizeof(v)) {
+      ok = false;
+      return v;
+    }
+    memcpy(&v, p, sizeof(v));
+    p += sizeof(v);
+    return v;
+  }
+  uint32_t get_count(size_t min_record_size) {
+    const uint32_t count = get<uint32_t>();
+    if (!ok || count > (end - p) / min_record_size) {
+      ok = false;
+      return 0;
+    }
+    return count;
+  }
+  std::string get_string() {
+    const uint32_t size = get<uint32_t>();
+    if (!ok || end - p < size) {
+      ok = false;
+      return {};
+    }
+    std::string s(p, size);
+    p += size;
+    return s;
+  }
+  std::vector<Signal> get_signals() {
+    std::vector<Signal> sigs(get_count(SIGNAL_MIN_SIZE));
+    for (auto &sig : sigs) {
+      if (!ok) break;
+      sig.name = get_string();
+      sig.start_bit = get<int32_t>();
+      sig.msb = get<int32_t>();
+      sig.lsb = get<int32_t>();
+      sig.size = get<int32_t>();
+      sig.is_signed = get<uint8_t>();
+      sig.factor = get<double>();
+      sig.offset = get<double>();
+      sig.is_little_endian = get<uint8_t>();
+      sig.type = (SignalType)get<int32_t>();
+      sig.calc_checksum = get<uint8_t>() ? checksum_function(sig.type) : nullptr;
+      // same bounds as the DBC parser, the extraction plans rely on them to stay within a frame
+      ok = ok && sig.size >= 1 && sig.size <= 64 && sig.type >= DEFAULT && sig.type <= FCA_GIORGIO_CHECKSUM &&
+           sig.lsb >= 0 && sig.msb >= 0 && sig.lsb < (CAN_MAX_DATA_LEN * 8) && sig.msb < (CAN_MAX_DATA_LEN * 8) &&
+           (sig.is_little_endian ? (sig.msb >= sig.lsb) : (sig.lsb / 8 >= sig.msb / 8));
+      compile_signal_plan(sig);
+    }
+    return sigs;
+  }
+
+  bool at_end() const { return p == end; }
+
+  bool ok = true;
+
+private:
+  static checksum_fn checksum_function(SignalType type) {
+    switch (type) {
+      case HONDA_CHECKSUM: return &honda_checksum;
+      case TOYOTA_CHECKSUM: return &toyota_checksum;
+      case PEDAL_CHECKSUM: return &pedal_checksum;
+      case VOLKSWAGEN_MQB_MEB_CHECKSUM: return &volkswagen_mqb_meb_checksum;
+      case XOR_CHECKSUM: return &xor_checksum;
+      case SUBARU_CHECKSUM: return &subaru_checksum;
+      case CHRYSLER_CHECKSUM: return &chrysler_checksum;
+      case HKG_CAN_FD_CHECKSUM: return &hkg_can_fd_checksum;
+      case FCA_GIORGIO_CHECKSUM: return &fca_giorgio_checksum;
+      default: return nullptr;
+    }
+  }
+
+  const char *p, *end;
+};
+
+// a directory only this user can write to, so no one else can plant cache files in it
+bool is_private_dir(const std::string &dir) {
+  std::error_code ec;
+  std::filesystem::create_directories(std::filesystem::path(dir).parent_path(), ec);
+  mkdir(dir.c_str(), 0700);
+
+  struct stat st;
+  return lstat(dir.c_str(), &st) == 0 && S_ISDIR(st.st_mode) && st.st_uid == geteuid() && (st.st_mode & 077) == 0;
+}
+
+}  // namespace
+
+uint64_t dbc_cache_hash(const std::string &dbc_path, const struct stat &st) {
+  // FNV-1a
+  uint64_t hash = 0xcbf29ce484222325ULL;
+  const uint64_t key[] = {DBC_CACHE_FORMAT, (uint64_t)st.st_dev, (uint64_t)st.st_ino, (uint64_t)st.st_size,
+                          (uint64_t)st.st_mtim.tv_sec, (uint64_t)st.st_mtim.tv_nsec};
+  const std::string path = std::filesystem::absolute(dbc_path);
+  for (const std::string &s : {std::string((const char *)key, sizeof(key)), path}) {
+    for (unsigned char c : s) {
+      hash = (hash ^ c) * 0x100000001b3ULL;
+    }
+  }
+  return hash;
+}
+
+// The cache dir, or an empty string if the cache is disabled. It's disabled if DBC_CACHE_DIR
+// is empty or no dir can be found, or if the dir isn't owned by this user or others can access it
+std::string dbc_cache_dir() {
+  std::string dir;
+  const char *env = std::getenv("DBC_CACHE_DIR");
+  const char *xdg_cache = std::getenv("XDG_CACHE_HOME");
+  const char *home = std::getenv("HOME");
+  if (env != nullptr) {
+    dir = env;
+  } else if (xdg_cache != nullptr && xdg_cache[0] == '/') {
+    dir = std::string(xdg_cache) + "/opendbc/dbc";
+  } else if (home != nullptr && home[0] == '/') {
+    dir = std::string(home) + "/.cache/opendbc/dbc";
+  }
+  if (dir.empty() || !is_private_dir(dir)) return "";
+  return dir;
+}
+
+std::string dbc_cache_path(const std::string &cache_dir, const std::string &dbc_name, uint64_t hash) {
+  char hash_str[17];
+  snprintf(hash_str, sizeof(hash_str), "%016llx", (unsigned long long)hash);
+  return cache_dir + "/" + dbc_name + "." + hash_str + ".bin";
+}
+
+// Returns nullptr if there's no valid cache file, a corrupt one is deleted
+DBC* dbc_cache_load(const std::string &cache_path, uint64_t hash) {
+  int fd = open(cache_path.c_str(), O_RDONLY | O_NOFOLLOW);
+  if (fd < 0) return nullptr;
+
+  struct stat st;
+  std::string data;
+  if (fstat(fd, &st) == 0 && S_ISREG(st.st_mode) && st.st_uid == geteuid() && st.st_size > 0) {
+    data.resize(st.st_size);
+    size_t read_size = 0;
+    while (read_size < data.size()) {
+      const ssize_t ret = read(fd, data.data() + read_size, data.size() - read_size);
+      if (ret <= 0) break;
+      read_size += ret;
+    }
+    data.resize(read_size);
+  }
+  close(fd);
+  if (data.empty()) {
+    unlink(cache_path.c_str());
+    return nullptr;
+  }
+
+  DBC *dbc = nullptr;
+  try {
+    CacheReader r(data.data(), data.size());
+    char magic[sizeof(DBC_CACHE_MAGIC)];
+    for (char &c : magic) c = r.get<char>();
+    const uint64_t format = r.get<uint64_t>();
+    const uint64_t file_hash = r.get<uint64_t>();
+
+    if (r.ok && memcmp(magic, DBC_CACHE_MAGIC, sizeof(magic)) == 0 && format == DBC_CACHE_FORMAT && file_hash == hash) {
+      dbc = new DBC;
+      dbc->name = r.get_string();
+      dbc->msgs.resize(r.get_count(MSG_MIN_SIZE));
+      for (auto &msg : dbc->msgs) {
+        if (!r.ok) break;
+        msg.name = r.get_string();
+        msg.address = r.get<uint32_t>();
+        msg.size = r.get<uint32_t>();
+        msg.sigs = r.get_signals();
+      }
+      dbc->vals.resize(r.ok ? r.get_count(VAL_MIN_SIZE) : 0);
+      for (auto &val : dbc->vals) {
+        if (!r.ok) break;
+        val.name = r.get_string();
+        val.address = r.get<uint32_t>();
+        val.def_val = r.get_string();
+        val.sigs = r.get_signals();
+      }
+
+      if (r.ok && r.at_end()) {
+        for (auto &m : dbc->msgs) {
+          dbc->addr_to_msg[m.address] = &m;
+          dbc->name_to_msg[m.name] = &m;
+        }
+      } else {
+        delete dbc;
+        dbc = nullptr;
+      }
+    }
+  } catch (...) {
+    delete dbc;
+    dbc = nullptr;
+  }
+
+  if (dbc == nullptr) unlink(cache_path.c_str());
+  return dbc;
+}
+
+void dbc_cache_save(const DBC *dbc, const std::string &cache_path, uint64_t hash) {
+  CacheWriter w;
+  for (char c : DBC_CACHE_MAGIC) w.put<char>(c);
+  w.put<uint64_t>(DBC_CACHE_FORMAT);
+  w.put<uint64_t>(hash);
+  w.put(dbc->name);
+  w.put<uint32_t>(dbc->msgs.size());
+  for (const auto &msg : dbc->msgs) {
+    w.put(msg.name);
+    w.put<uint32_t>(msg.address);
+    w.put<uint32_t>(msg.size);
+    w.put(msg.sigs);
+  }
+  w.put<uint32_t>(dbc->vals.size());
+  for (const auto &val : dbc->vals) {
+    w.put(val.name);
+    w.put<uint32_t>(val.address);
+    w.put(val.def_val);
+    w.put(val.sigs);
+  }
+
+  // write to a temporary file and rename, so concurrent readers never see a partial file
+  std::string tmp_path = cache_path + ".XXXXXX";
+  int fd = mkstemp(tmp_path.data());
+  if (fd < 0) return;
+
+  size_t written = 0;
+  while (written < w.buf.size()) {
+    const ssize_t ret = write(fd, w.buf.data() + written, w.buf.size() - written);
+    if (ret <= 0) break;
+    written += ret;
+  }
+  const bool ok = close(fd) == 0 && written == w.buf.size();
+  if (!ok || rename(tmp_path.c_str(), cache_path.c_str()) != 0) {
+    unlink(tmp_path.c_str());
+    return;
+  }
+
+  // remove the DBC's cache files for older DBC versions or cache formats, named <dbc>.<hash>.bin
+  const std::filesystem::path path(cache_path);
+  const std::string filename = path.filename();
+  const std::string prefix = filename.substr(0, filename.size() - (16 + 4));
+  std::error_code ec;
+  for (std::filesystem::directory_iterator it(path.parent_path(), ec), end; !ec && it != end; it.increment(ec)) {
+    const std::string name = it->path().filename();
+    if (name != filename && name.size() == filename.size() && name.compare(0, prefix.size(), prefix) == 0 &&
+        name.compare(name.size() - 4, 4, ".bin") == 0) {
+      unlink(it->path().c_str());
+    }
+  }
+}
@@ -1,7 +1,6 @@
 #include <algorithm>
 #include <cassert>
 #include <cmath>
-#include <map>
 #include <stdexcept>
 #include <utility>
 
@@ -33,64 +32,86 @@ CANPacker::CANPacker(const std::string& dbc_name) {
   assert(dbc);
 
   for (const auto& msg : dbc->msgs) {
+    MessagePacker &packer = messages[msg.address];
+    packer.msg = &msg;
     for (const auto& sig : msg.sigs) {
-      signal_lookup[std::make_pair(msg.address, sig.name)] = sig;
+      packer.signal_lookup[sig.name] = &sig;
+      if (sig.name == "COUNTER") {
+        packer.counter = &sig;
+      } else if (sig.name == "CHECKSUM" && sig.calc_checksum != nullptr) {
+        packer.checksum = &sig;
+      }
     }
   }
 }
 
+void CANPacker::set_signal(std::vector<uint8_t> &msg, MessagePacker &packer, const Signal &sig, double value, bool &counter_set) {
+  int64_t ival = (int64_t)(round((value - sig.offset) / sig.factor));
+  if (ival < 0) {
+    ival = (1ULL << sig.size) + ival;
+  }
+  set_value(msg, sig, ival);
+
+  if (&sig == packer.counter) {
+    packer.counter_value = value;
+    counter_set = true;
+  }
+}
+
 std::vector<uint8_t> CANPacker::pack(uint32_t address, const std::vector<SignalPackValue> &signals) {
-  auto msg_it = dbc->addr_to_msg.find(address);
-  if (msg_it == dbc->addr_to_msg.end()) {
+  return pack(address, {}, signals);
+}
+
+std::vector<std::vector<uint8_t>> CANPacker::pack(const std::vector<MessagePackValues> &msgs) {
+  std::vector<std::vector<uint8_t>> ret;
+  ret.reserve(msgs.size());
+  for (const auto &msg : msgs) {
+    ret.push_back(pack(msg.address, msg.values, msg.named_values));
+  }
+  return ret;
+}
+
+std::vector<uint8_t> CANPacker::pack(uint32_t address, const std::vector<SignalPackIndexValue> &values,
+                                     const std::vector<SignalPackValue> &named_values) {
+  auto packer_it = messages.find(address);
+  if (packer_it == messages.end()) {
     LOGE("undefined address %d", address);
     return {};
   }
+  MessagePacker &packer = packer_it->second;
+  const Msg *msg = packer.msg;
 
-  std::vector<uint8_t> ret(msg_it->second->size, 0);
+  std::vector<uint8_t> ret(msg->size, 0);
 
   // set all values for all given signal/value pairs
   bool counter_set = false;
-  for (const auto& sigval : signals) {
-    auto sig_it = signal_lookup.find(std::make_pair(address, sigval.name));
-    if (sig_it == signal_lookup.end()) {
+  for (const auto& sigval : values) {
+    if (sigval.index < 0 || (size_t)sigval.index >= msg->sigs.size()) {
+      LOGE("undefined signal index %d - %d\n", sigval.index, address);
+      continue;
+    }
+    set_signal(ret, packer, msg->sigs[sigval.index], sigval.value, counter_set);
+  }
+  for (const auto& sigval : named_values) {
+    auto sig_it = packer.signal_lookup.find(sigval.name);
+    if (sig_it == packer.signal_lookup.end()) {
       // TODO: do something more here. invalid flag like CANParser?
       LOGE("undefined signal %s - %d\n", sigval.name.c_str(), address);
       continue;
     }
-    const auto &sig = sig_it->second;
-
-    int64_t ival = (int64_t)(round((sigval.value - sig.offset) / sig.factor));
-    if (ival < 0) {
-      ival = (1ULL << sig.size) + ival;
-    }
-    set_value(ret, sig, ival);
-
-    if (sigval.name == "COUNTER") {
-      counters[address] = sigval.value;
-      counter_set = true;
-    }
+    set_signal(ret, packer, *sig_it->second, sigval.value, counter_set);
   }
 
   // set message counter
-  auto sig_it_counter = signal_lookup.find(std::make_pair(address, "COUNTER"));
-  if (!counter_set && sig_it_counter != signal_lookup.end()) {
-    const auto& sig = sig_it_counter->second;
-
-    if (counters.find(address) == counters.end()) {
-      counters[address] = 0;
-    }
-    set_value(ret, sig, counters[address]);
-    counters[address] = (counters[address] + 1) % (1 << sig.size);
+  if (!counter_set && packer.counter != nullptr) {
+    set_value(ret, *packer.counter, packer.counter_value);
+    packer.counter_value = (packer.counter_value + 1) % (1 << packer.counter->size);
   }
 
   // set message checksum
-  auto sig_it_checksum = signal_lookup.find(std::make_pair(address, "CHECKSUM"));
-  if (sig_it_checksum != signal_lookup.end()) {
-    const auto &sig = sig_it_checksum->second;
-    if (sig.calc_checksum != nullptr) {
-      unsigned int checksum = sig.calc_checksum(address, sig, ret);
-      set_value(ret, sig, checksum);
-    }
+  if (packer.checksum != nullptr) {
+    unsigned int checksum = packer.checksum->calc_checksum(address, *packer.checksum, ret);
+    set_value(ret, *packer.checksum, checksum);
   }
 
   return ret;
@@ -5,13 +5,27 @@ from libc.stdint cimport uint8_t, uint32_t
 from libcpp.vector cimport vector
 
 from .common cimport CANPacker as cpp_CANPacker
-from .common cimport dbc_lookup, SignalPackValue, DBC, Msg
+from .common cimport dbc_lookup, SignalPackValue, SignalPackIndexValue, MessagePackValues, DBC, Msg
+
+
+cdef class MessageTemplate:
+  # A message with a fixed set of signals, resolved to signal indices once.
+  # Made by CANPacker.make_template and packed with CANPacker.make_can_msgs.
+  cdef:
+    const DBC *dbc
+    vector[int] sig_idxs
+
+  cdef readonly:
+    uint32_t address
+    str name
+    tuple signal_names
 
 
 cdef class CANPacker:
   cdef:
     cpp_CANPacker *packer
     const DBC *dbc
+    dict sig_indices
 
   def __init__(self, dbc_name):
     self.dbc = dbc_lookup(dbc_name)
@@ -19,6 +33,7 @@ cdef class CANPacker:
       raise RuntimeError(f"Can't lookup {dbc_name}")
 
     self.packer = new cpp_CANPacker(dbc_name)
+    self.sig_indices = {}
 
   def __dealloc__(self):
     if self.packer:
@@ -36,18 +51,99 @@ cdef class CANPacker:
 
     return self.packer.pack(addr, values_thing)
 
-  cpdef make_can_msg(self, name_or_addr, bus, values):
-    cdef uint32_t addr = 0
+  cdef uint32_t lookup_address(self, name_or_addr):
     cdef const Msg* m
     if isinstance(name_or_addr, int):
-      addr = name_or_addr
-    else:
+      return name_or_addr
+    try:
+      m = self.dbc.name_to_msg.at(name_or_addr.encode("utf8"))
+      return m.address
+    except IndexError:
+      # The C++ pack function will log an error message for invalid addresses
+      return 0
+
+  cdef dict signal_indices(self, uint32_t addr):
+    # {signal name: index in Msg::sigs}, built on first use of each message
+    cdef const Msg* m
+    ret = self.sig_indices.get(addr)
+    if ret is None:
       try:
-        m = self.dbc.name_to_msg.at(name_or_addr.encode("utf8"))
-        addr = m.address
+        m = self.dbc.addr_to_msg.at(addr)
+        ret = {m.sigs[i].name.decode("utf8"): i for i in range(m.sigs.size())}
       except IndexError:
-        # The C++ pack function will log an error message for invalid addresses
-        pass
+        ret = {}
+      self.sig_indices[addr] = ret
+    return ret
 
+  cpdef make_can_msg(self, name_or_addr, bus, values):
+    cdef uint32_t addr = self.lookup_address(name_or_addr)
     cdef vector[uint8_t] val = self.pack(addr, values)
     return addr, (<char *>&val[0])[:val.size()], bus
+
+  def make_template(self, name_or_addr, signal_names):
+    cdef uint32_t addr = self.lookup_address(name_or_addr)
+    cdef const Msg* m
+    try:
+      m = self.dbc.addr_to_msg.at(addr)
+    except IndexError:
+      raise RuntimeError(f"could not find message {repr(name_or_addr)} in DBC {self.dbc.name.decode('utf8')}")
+
+    cdef MessageTemplate tmpl = MessageTemplate.__new__(MessageTemplate)
+    tmpl.dbc = self.dbc
+    tmpl.address = addr
+    tmpl.name = m.name.decode("utf8")
+    tmpl.signal_names = tuple(signal_names)
+
+    sig_indices = self.signal_indices(addr)
+    for name in tmpl.signal_names:
+      if name not in sig_indices:
+        raise RuntimeError(f"could not find signal {repr(name)} in message {tmpl.name}")
+      tmpl.sig_idxs.push_back(sig_indices[name])
+    return tmpl
+
+  def make_can_msgs(self, msgs):
+    # Packs [(name_or_addr, bus, values), ...] in one call. Counters advance
+    # as if each message was made by make_can_msg, in order. A MessageTemplate
+    # may be given in place of name_or_addr, with values as a sequence in the
+    # order of its signal_names.
+    cdef vector[MessagePackValues] msgs_v
+    msgs_v.resize(len(msgs))
+    cdef MessagePackValues *msg_v
+    cdef SignalPackIndexValue spiv
+    cdef SignalPackValue spv
+    cdef MessageTemplate tmpl
+    cdef size_t i, j
+
+    buses = []
+    for i, (target, bus, values) in enumerate(msgs):
+      msg_v = &msgs_v[i]
+      buses.append(bus)
+      if isinstance(target, MessageTemplate):
+        tmpl = target
+        if tmpl.dbc != self.dbc:
+          raise ValueError(f"template for {tmpl.name} is from another DBC")
+        if len(values) != tmpl.sig_idxs.size():
+          raise ValueError(f"expected {tmpl.sig_idxs.size()} values for {tmpl.name}, got {len(values)}")
+        msg_v.address = tmpl.address
+        msg_v.values.resize(tmpl.sig_idxs.size())
+        for j in range(tmpl.sig_idxs.size()):
+          msg_v.values[j].index = tmpl.sig_idxs[j]
+          msg_v.values[j].value = values[j]
+      else:
+        msg_v.address = self.lookup_address(target)
+        sig_indices = self.signal_indices(msg_v.address)
+        msg_v.values.reserve(len(values))
+        for name, value in values.items():
+          idx = sig_indices.get(name)
+          if idx is None:
+            # unknown signals are logged by the C++ packer
+            spv.name = name.encode("utf8")
+            spv.value = value
+            msg_v.named_values.push_back(spv)
+          else:
+            spiv.index = idx
+            spiv.value = value
+            msg_v.values.push_back(spiv)
+
+    cdef vector[vector[uint8_t]] packed = self.packer.pack(msgs_v)
+    return [(msgs_v[i].address, (<char *>packed[i].data())[:packed[i].size()], buses[i]) for i in range(packed.size())]
@@ -4,10 +4,14 @@
 #include <limits>
 #include <stdexcept>
 #include <sstream>
+#include <unordered_map>
+#include <utility>
+#include <vector>
 #include <unistd.h>
 
 #include "opendbc/can/common.h"
 
+// slow path: walk the signal one byte at a time
 int64_t get_raw_value(const std::vector<uint8_t> &msg, const Signal &sig) {
   int64_t ret = 0;
 
@@ -27,16 +31,45 @@ int64_t get_raw_value(const std::vector<uint8_t> &msg, const Signal &sig) {
   return ret;
 }
 
+// fast path: a single 64-bit load, shift and mask. buf is dat zero padded
+// to at least plan_byte + 8 bytes
+inline int64_t get_raw_value_fast(const uint8_t *buf, const Signal &sig) {
+  uint64_t word;
+  memcpy(&word, buf + sig.plan_byte, sizeof(word));
+#if __BYTE_ORDER__ == __ORDER_LITTLE_ENDIAN__
+  if (!sig.is_little_endian) word = __builtin_bswap64(word);
+#else
+  if (sig.is_little_endian) word = __builtin_bswap64(word);
+#endif
+  return (word >> sig.plan_shift) & sig.plan_mask;
+}
+
 
-bool MessageState::parse(uint64_t nanos, const std::vector<uint8_t> &dat) {
-  std::vector<double> tmp_vals(parse_sigs.size());
+void MessageState::init_signals(const std::vector<Signal> &sigs) {
+  parse_sigs = sigs;
+  vals.assign(sigs.size(), 0);
+  all_vals.assign(sigs.size(), {});
+  tmp_vals.assign(sigs.size(), 0);
+  frame_dat.reserve(CAN_MAX_DATA_LEN);
+  prev_vals.assign(sigs.size(), 0);
+  changed_sigs.reserve(sigs.size());
+}
+
+bool MessageState::parse(uint64_t nanos, const uint8_t *dat, size_t dat_size) {
   bool checksum_failed = false;
   bool counter_failed = false;
 
+  // checksum functions take a vector, reuse the reserved one
+  frame_dat.assign(dat, dat + dat_size);
+
+  uint8_t buf[CAN_MAX_DATA_LEN + 8] = {0};
+  memcpy(buf, dat, dat_size);
+
   for (int i = 0; i < parse_sigs.size(); i++) {
     const auto &sig = parse_sigs[i];
 
-    int64_t tmp = get_raw_value(dat, sig);
+    // signals cut off by a short frame keep the byte walk's semantics
+    int64_t tmp = (sig.plan_fast && sig.plan_end <= dat_size) ? get_raw_value_fast(buf, sig) : get_raw_value(frame_dat, sig);
     if (sig.is_signed) {
       tmp -= ((tmp >> (sig.size-1)) & 0x1) ? (1ULL << sig.size) : 0;
     }
@@ -44,7 +77,7 @@ bool MessageState::parse(uint64_t nanos, const std::vector<uint8_t> &dat) {
     //DEBUG("parse 0x%X %s -> %ld\n", address, sig.name, tmp);
 
     if (!ignore_checksum) {
-      if (sig.calc_checksum != nullptr && sig.calc_checksum(address, sig, dat) != tmp) {
+      if (sig.calc_checksum != nullptr && sig.calc_checksum(address, sig, frame_dat) != tmp) {
         checksum_failed = true;
       }
     }
@@ -64,6 +97,11 @@ bool MessageState::parse(uint64_t nanos, const std::vector<uint8_t> &dat) {
     return false;
   }
 
+  // first frame of this update, keep the values to diff against
+  if (track_changes && !updated) {
+    prev_vals = vals;
+  }
+
   for (int i = 0; i < parse_sigs.size(); i++) {
     vals[i] = tmp_vals[i];
     all_vals[i].push_back(vals[i]);
@@ -87,6 +125,15 @@ bool MessageState::update_counter_generic(int64_t v, int cnt_size) {
   return counter_fail < MAX_BAD_COUNTER;
 }
 
+void MessageState::update_changes() {
+  changed_sigs.clear();
+  for (int i = 0; i < vals.size(); i++) {
+    if (vals[i] != prev_vals[i]) {
+      changed_sigs.push_back(i);
+    }
+  }
+}
+
 
 CANParser::CANParser(int abus, const std::string& dbc_name, const std::vector<std::pair<uint32_t, int>> &messages)
   : bus(abus) {
@@ -121,10 +168,11 @@ CANParser::CANParser(int abus, const std::string& dbc_name, const std::vector<st
     assert(state.size <= 64);  // max signal size is 64 bytes
 
     // track all signals for this message
-    state.parse_sigs = msg->sigs;
-    state.vals.resize(msg->sigs.size());
-    state.all_vals.resize(msg->sigs.size());
+    state.init_signals(msg->sigs);
   }
+  updated_addresses.reserve(message_states.size());
+  missing_addresses.reserve(message_states.size());
+  timed_out_addresses.reserve(message_states.size());
 }
 
 CANParser::CANParser(int abus, const std::string& dbc_name, bool ignore_checksum, bool ignore_counter)
@@ -143,35 +191,88 @@ CANParser::CANParser(int abus, const std::string& dbc_name, bool ignore_checksum
       .ignore_counter = ignore_counter,
     };
 
-    for (const auto& sig : msg.sigs) {
-      state.parse_sigs.push_back(sig);
-      state.vals.push_back(0);
-      state.all_vals.push_back({});
-    }
+    state.init_signals(msg.sigs);
 
     message_states[state.address] = state;
   }
+  updated_addresses.reserve(message_states.size());
+  missing_addresses.reserve(message_states.size());
+  timed_out_addresses.reserve(message_states.size());
 }
 
-std::set<uint32_t> CANParser::update(const std::vector<CanData> &can_data) {
+const std::vector<uint32_t> &CANParser::update(const std::vector<CanData> &can_data) {
   // Clear all_values
   for (auto &state : message_states) {
     for (auto &vals : state.second.all_vals) vals.clear();
+    state.second.updated = false;
+    state.second.changed_sigs.clear();
   }
 
-  std::set<uint32_t> updated_addresses;
+  updated_addresses.clear();
   for (const auto &c : can_data) {
     if (first_nanos == 0) {
       first_nanos = c.nanos;
     }
 
-    UpdateCans(c, updated_addresses);
+    UpdateCans(c);
     UpdateValid(c.nanos);
   }
+  std::sort(updated_addresses.begin(), updated_addresses.end());
+
+  for (uint32_t address : updated_addresses) {
+    MessageState &state = message_states.at(address);
+    if (state.track_changes) {
+      state.update_changes();
+    }
+  }
   return updated_addresses;
 }
 
-void CANParser::UpdateCans(const CanData &can, std::set<uint32_t> &updated_addresses) {
+void CANParser::set_track_changes(bool track) {
+  for (auto &state : message_states) {
+    state.second.track_changes = track;
+  }
+}
+
+// Decode a whole log in one call. Frame i has data dat[offsets[i]:offsets[i+1]].
+// The log is decoded on a copy of the message states, reset as in a new parser, so
+// live updates are unaffected and the live counters don't affect the log.
+// Values of every valid frame are appended to values[address], and their
+// timestamps to timestamps[address].
+void CANParser::decode(size_t n, const uint64_t *nanos, const uint32_t *addresses, const uint8_t *buses,
+                       const uint8_t *dat, const uint64_t *offsets, std::unordered_map<uint32_t, std::vector<uint64_t>> &timestamps,
+                       std::unordered_map<uint32_t, std::vector<std::vector<double>>> &values) {
+  std::unordered_map<uint32_t, MessageState> states = message_states;
+  for (auto &[address, state] : states) {
+    for (auto &vals : state.all_vals) vals.clear();
+    state.updated = false;
+    state.track_changes = false;
+    state.last_seen_nanos = 0;
+    state.counter = 0;
+    state.counter_fail = 0;
+    timestamps[address].clear();
+  }
+
+  for (size_t i = 0; i < n; i++) {
+    if (buses[i] != bus) continue;
+
+    auto state_it = states.find(addresses[i]);
+    if (state_it == states.end()) continue;
+
+    const uint64_t size = offsets[i + 1] - offsets[i];
+    if (size > CAN_MAX_DATA_LEN) continue;
+
+    if (state_it->second.parse(nanos[i], dat + offsets[i], size)) {
+      timestamps[state_it->first].push_back(nanos[i]);
+    }
+  }
+
+  for (auto &state : states) {
+    values[state.first] = std::move(state.second.all_vals);
+  }
+}
+
+void CANParser::UpdateCans(const CanData &can) {
   //DEBUG("got %zu messages\n", can.frames.size());
 
   bool bus_empty = true;
@@ -188,19 +289,21 @@ void CANParser::UpdateCans(const CanData &can, std::set<uint32_t> &updated_addre
       // DEBUG("skip %d: not specified\n", cmsg.getAddress());
       continue;
     }
-    if (frame.dat.size() > 64) {
-      DEBUG("got message longer than 64 bytes: 0x%X %zu\n", frame.address, frame.dat.size());
+    if (frame.size > CAN_MAX_DATA_LEN) {
+      DEBUG("got message longer than 64 bytes: 0x%X %u\n", frame.address, frame.size);
       continue;
     }
 
     // TODO: this actually triggers for some cars. fix and enable this
-    //if (dat.size() != state_it->second.size) {
-    //  DEBUG("got message with unexpected length: expected %d, got %zu for %d", state_it->second.size, dat.size(), cmsg.getAddress());
+    //if (frame.size != state_it->second.size) {
+    //  DEBUG("got message with unexpected length: expected %d, got %u for %d", state_it->second.size, frame.size, cmsg.getAddress());
     //  continue;
     //}
 
-    if (state_it->second.parse(can.nanos, frame.dat)) {
-      updated_addresses.insert(state_it->first);
+    MessageState &state = state_it->second;
+    if (state.parse(can.nanos, frame.dat, frame.size) && !state.updated) {
+      state.updated = true;
+      updated_addresses.push_back(state_it->first);
     }
   }
 
@@ -212,11 +315,13 @@ void CANParser::UpdateCans(const CanData &can, std::set<uint32_t> &updated_addre
 }
 
 void CANParser::UpdateValid(uint64_t nanos) {
-  static uint64_t last_log_time = 0;
   const uint64_t LOG_INTERVAL = 2e9;
 
   const bool show_missing = (nanos - first_nanos) > 8e9;
 
+  missing_addresses.clear();
+  timed_out_addresses.clear();
+
   bool _valid = true;
   bool _counters_valid = true;
   for (const auto& kv : message_states) {
@@ -229,23 +334,18 @@ void CANParser::UpdateValid(uint64_t nanos) {
     const bool missing = state.last_seen_nanos == 0;
     const bool timed_out = (nanos - state.last_seen_nanos) > state.check_threshold;
     if (state.check_threshold > 0 && (missing || timed_out)) {
-      if (show_missing && !bus_timeout) {
-        char str[256];
-        const char* parser_result_params = "/data/params/d/CanParserResult";
+      if (missing) {
+        missing_addresses.push_back(state.address);
+      } else {
+        timed_out_addresses.push_back(state.address);
+      }
+
+      if (show_missing && !bus_timeout && (nanos - last_log_time) > LOG_INTERVAL) {
+        last_log_time = nanos;
         if (missing) {
-          if ((nanos - last_log_time) > LOG_INTERVAL) {
-            last_log_time = nanos;
-            LOGE_100("0x%X '%s' NOT SEEN", state.address, state.name.c_str());
-            sprintf(str, "echo -n \"0x%X '%s' NOT SEEN\" > %s", state.address, state.name.c_str(), parser_result_params);
-            system(str);
-          }
-        } else if (timed_out) {
-          if ((nanos - last_log_time) > LOG_INTERVAL) {
-            last_log_time = nanos;
-            LOGE_100("0x%X '%s' TIMED OUT", state.address, state.name.c_str());
-            sprintf(str, "echo -n \"0x%X '%s' TIMED OUT\" > %s", state.address, state.name.c_str(), parser_result_params);
-            system(str);
-          }
+          LOGE_100("0x%X '%s' NOT SEEN", state.address, state.name.c_str());
+        } else {
+          LOGE_100("0x%X '%s' TIMED OUT", state.address, state.name.c_str());
         }
       }
       _valid = false;
@@ -4,20 +4,38 @@
 from libcpp.pair cimport pair
 from libcpp.string cimport string
 from libcpp.vector cimport vector
-from libc.stdint cimport uint32_t, int
+from libcpp.unordered_map cimport unordered_map
+from libc.stdint cimport uint8_t, uint32_t, uint64_t, int
+from libc.string cimport memcpy
 
 from .common cimport CANParser as cpp_CANParser
-from .common cimport dbc_lookup, Msg, DBC, CanData
+from .common cimport dbc_lookup, Msg, DBC, CanData, MessageState, CAN_MAX_DATA_LEN
 
+cimport numpy as cnp
+import numpy as np
 import numbers
 from collections import defaultdict
 
+cnp.import_array()
+
+
+cdef cnp.ndarray readonly_view(void *data, int ndim, cnp.npy_intp *dims, int typenum, object owner):
+  # zero-copy, read-only ndarray over memory owned by `owner`
+  cdef cnp.ndarray arr = cnp.PyArray_SimpleNewFromData(ndim, dims, typenum, data)
+  cnp.PyArray_CLEARFLAGS(arr, cnp.NPY_ARRAY_WRITEABLE)
+  cnp.set_array_base(arr, owner)
+  return arr
+
 
 cdef class CANParser:
+  # All parser state is per instance, and decoding runs without the GIL, so
+  # separate parsers (e.g. one per bus) can update concurrently from a thread
+  # pool. A single parser must not be updated from more than one thread.
   cdef:
     cpp_CANParser *can
     const DBC *dbc
     set addresses
+    dict msg_names
 
   cdef readonly:
     dict vl
@@ -26,9 +44,22 @@ cdef class CANParser:
     string dbc_name
     uint32_t bus
 
-  def __init__(self, dbc_name, messages, bus=0):
+    # columnar mode
+    bint columnar
+    dict sig_index
+    dict vl_np
+    dict vl_all_np
+    dict ts_nanos_np
+
+    # change tracking mode
+    bint track_changes
+    dict changes
+
+  def __init__(self, dbc_name, messages, bus=0, columnar=False, track_changes=False):
     self.dbc_name = dbc_name
     self.bus = bus
+    self.columnar = columnar
+    self.track_changes = track_changes
     self.dbc = dbc_lookup(dbc_name)
     if not self.dbc:
       raise RuntimeError(f"Can't find DBC: {dbc_name}")
@@ -36,7 +67,13 @@ cdef class CANParser:
     self.vl = {}
     self.vl_all = {}
     self.ts_nanos = {}
+    self.sig_index = {}
+    self.vl_np = {}
+    self.vl_all_np = {}
+    self.ts_nanos_np = {}
+    self.changes = {}
     self.addresses = set()
+    self.msg_names = {}
 
     # Convert message names into addresses and check existence in DBC
     cdef vector[pair[uint32_t, int]] message_v
@@ -52,8 +89,14 @@ cdef class CANParser:
       self.addresses.add(address)
 
       name = m.name.decode("utf8")
+      self.msg_names[address] = name
       signal_names = [sig.name.decode("utf-8") for sig in (<Msg*>m).sigs]
 
+      self.sig_index[address] = {sig_name: j for j, sig_name in enumerate(signal_names)}
+      self.sig_index[name] = self.sig_index[address]
+      if self.columnar:
+        continue
+
       self.vl[address] = {name: 0.0 for name in signal_names}
       self.vl[name] = self.vl[address]
       self.vl_all[address] = defaultdict(list)
@@ -70,6 +113,65 @@ cdef class CANParser:
     with nogil:
       self.can = new cpp_CANParser(cpp_bus, cpp_dbc_name, message_v)
 
+    if self.columnar:
+      self._init_columns()
+    if self.track_changes:
+      self.can.set_track_changes(True)
+
+  cdef _init_columns(self):
+    # The C++ MessageState buffers never move after construction, so the
+    # current values and timestamps are exposed as views instead of copies.
+    cdef MessageState *state
+    cdef cnp.npy_intp dims[1]
+    for address in self.addresses:
+      state = self.can.getMessageState(address)
+      name = self.msg_names[address]
+      dims[0] = state.vals.size()
+      self.vl_np[address] = readonly_view(state.vals.data(), 1, dims, cnp.NPY_FLOAT64, self)
+      self.vl_np[name] = self.vl_np[address]
+      self.ts_nanos_np[address] = readonly_view(&state.last_seen_nanos, 0, dims, cnp.NPY_UINT64, self)
+      self.ts_nanos_np[name] = self.ts_nanos_np[address]
+      self._set_all_vals(address, np.empty((state.vals.size(), 0), dtype=np.float64))
+
+  cdef _set_all_vals(self, uint32_t address, cnp.ndarray all_vals):
+    self.vl_all_np[address] = all_vals
+    self.vl_all_np[self.msg_names[address]] = all_vals
+
+  cdef _update_columns(self, updated_addrs):
+    cdef MessageState *state
+    cdef cnp.ndarray all_vals
+    cdef size_t i, n
+
+    # messages not updated this call have no new values
+    for address in self.addresses:
+      all_vals = self.vl_all_np[address]
+      if all_vals.shape[1] and address not in updated_addrs:
+        self._set_all_vals(address, np.empty((all_vals.shape[0], 0), dtype=np.float64))
+
+    # one row per signal, one column per received frame
+    for address in updated_addrs:
+      state = self.can.getMessageState(address)
+      n = state.all_vals[0].size() if state.all_vals.size() else 0
+      all_vals = np.empty((state.all_vals.size(), n), dtype=np.float64)
+      for i in range(state.all_vals.size()):
+        memcpy(cnp.PyArray_GETPTR2(all_vals, i, 0), state.all_vals[i].data(), n * sizeof(double))
+      self._set_all_vals(address, all_vals)
+
+  cdef _update_changes(self, const vector[uint32_t] *updated):
+    # {address/name: [(signal, old value, new value, nanos), ...]} of the
+    # signals whose value differs from the last update_strings call
+    cdef MessageState *state
+    cdef uint32_t addr
+    cdef int i
+    self.changes.clear()
+    for j in range(updated.size()):
+      addr = updated[0][j]
+      state = self.can.getMessageState(addr)
+      if state.changed_sigs.size():
+        changes = [(<unicode>state.parse_sigs[i].name, state.prev_vals[i], state.vals[i], state.last_seen_nanos)
+                   for i in state.changed_sigs]
+        self.changes[addr] = self.changes[self.msg_names[addr]] = changes
+
   def __dealloc__(self):
     if self.can:
       with nogil:
@@ -79,8 +181,9 @@ cdef class CANParser:
     # input format:
     # [nanos, [[address, data, src], ...]]
     # [[nanos, [[address, data, src], ...], ...]]
-    for address in self.addresses:
-      self.vl_all[address].clear()
+    if not self.columnar:
+      for address in self.addresses:
+        self.vl_all[address].clear()
 
     cdef vector[CanData] can_data_array
 
@@ -98,21 +201,34 @@ cdef class CANParser:
           if source_bus == self.bus:
             frame = &(can_data.frames.emplace_back())
             frame.address = address
-            frame.dat = dat
+            if not isinstance(dat, bytes):
+              dat = bytes(dat)
+            frame.size = len(dat)
+            memcpy(frame.dat, <const char*>dat, min(frame.size, CAN_MAX_DATA_LEN))
             frame.src = source_bus
     except TypeError:
       raise RuntimeError("invalid parameter")
 
+    cdef const vector[uint32_t] *updated
     with nogil:
-      updated_addrs = self.can.update(can_data_array)
+      updated = &self.can.update(can_data_array)
+    updated_addrs = set(updated[0])
+
+    if self.track_changes:
+      self._update_changes(updated)
 
-    for addr in updated_addrs:
+    if self.columnar:
+      self._update_columns(updated_addrs)
+      return updated_addrs
+
+    cdef uint32_t addr
+    for j in range(updated.size()):
+      addr = updated[0][j]
       vl = self.vl[addr]
       vl_all = self.vl_all[addr]
       ts_nanos = self.ts_nanos[addr]
 
-      with nogil:
-        state = self.can.getMessageState(addr)
+      state = self.can.getMessageState(addr)
       for i in range(state.parse_sigs.size()):
         name = <unicode>state.parse_sigs[i].name
         vl[name] = state.vals[i]
@@ -121,6 +237,53 @@ cdef class CANParser:
 
     return updated_addrs
 
+  def decode_log(self, nanos, addresses, buses, data, offsets):
+    # Bulk decode of a whole log, for offline use. Takes flat arrays with one
+    # entry per frame, frame i's data is data[offsets[i]:offsets[i+1]].
+    # Returns {address/name: (nanos, {signal: values})} of the valid frames.
+    # The log is decoded on a copy of the parser's state, vl, vl_all, ts_nanos,
+    # counters and timeouts are left untouched for live updates.
+    data = np.frombuffer(data, dtype=np.uint8)
+    offsets = np.ascontiguousarray(offsets, dtype=np.uint64)
+    cdef const uint64_t[::1] nanos_v = np.ascontiguousarray(nanos, dtype=np.uint64)
+    cdef const uint32_t[::1] addresses_v = np.ascontiguousarray(addresses, dtype=np.uint32)
+    cdef const uint8_t[::1] buses_v = np.ascontiguousarray(buses, dtype=np.uint8)
+    cdef const uint8_t[::1] data_v = data
+    cdef const uint64_t[::1] offsets_v = offsets
+
+    cdef size_t n = nanos_v.shape[0]
+    if addresses_v.shape[0] != n or buses_v.shape[0] != n or offsets_v.shape[0] != n + 1:
+      raise ValueError("nanos, addresses and buses must have one entry per frame, offsets one more")
+    if np.any(offsets[1:] < offsets[:-1]) or offsets[n] > data.size:
+      raise ValueError("offsets must be increasing and within data")
+
+    # frames can all be empty, their data then points at an empty byte
+    cdef uint8_t empty = 0
+    cdef const uint8_t *data_ptr = &data_v[0] if data_v.shape[0] else &empty
+    cdef unordered_map[uint32_t, vector[uint64_t]] timestamps
+    cdef unordered_map[uint32_t, vector[vector[double]]] values
+    with nogil:
+      self.can.decode(n, &nanos_v[0] if n else NULL, &addresses_v[0] if n else NULL, &buses_v[0] if n else NULL,
+                      data_ptr, &offsets_v[0], timestamps, values)
+
+    cdef MessageState *state
+    cdef cnp.ndarray ts, vals
+    cdef size_t i, cnt
+    ret = {}
+    for address in self.addresses:
+      state = self.can.getMessageState(address)
+      cnt = timestamps[address].size()
+      ts = np.empty(cnt, dtype=np.uint64)
+      memcpy(cnp.PyArray_DATA(ts), timestamps[address].data(), cnt * sizeof(uint64_t))
+
+      sigs = {}
+      for i in range(state.parse_sigs.size()):
+        vals = np.empty(cnt, dtype=np.float64)
+        memcpy(cnp.PyArray_DATA(vals), values[address][i].data(), cnt * sizeof(double))
+        sigs[<unicode>state.parse_sigs[i].name] = vals
+      ret[address] = ret[self.msg_names[address]] = (ts, sigs)
+    return ret
+
   @property
   def can_valid(self):
     cdef bint valid
@@ -135,6 +298,16 @@ cdef class CANParser:
       timeout = self.can.bus_timeout
     return timeout
 
+  @property
+  def missing_addresses(self):
+    # checked messages not seen yet, as of the last update
+    return sorted(self.can.missing_addresses)
+
+  @property
+  def timed_out_addresses(self):
+    # checked messages not seen within 10x their expected period, as of the last update
+    return sorted(self.can.timed_out_addresses)
+
 
 cdef class CANDefine():
   cdef:
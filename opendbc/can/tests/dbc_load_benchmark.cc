@@ -0,0 +1,59 @@
+// Reports the parse time of every DBC returned by get_dbc_names(), from text
+// and from the binary cache. The cache is in $DBC_CACHE_DIR, or a new temporary dir.
+#include <stdlib.h>
+
+#include <algorithm>
+#include <chrono>
+#include <cstdio>
+#include <filesystem>
+#include <string>
+#include <tuple>
+#include <vector>
+
+#include "opendbc/can/common.h"
+
+int main(int argc, char **argv) {
+  const int iterations = argc > 1 ? std::stoi(argv[1]) : 10;
+  const char *basedir = std::getenv("BASEDIR");
+  const std::string dbc_path = basedir != nullptr ? std::string(basedir) + "/opendbc/dbc" : DBC_FILE_PATH;
+
+  char cache_dir[] = "/tmp/dbc_cache_XXXXXX";
+  const bool temp_cache_dir = std::getenv("DBC_CACHE_DIR") == nullptr && mkdtemp(cache_dir) != nullptr;
+  if (temp_cache_dir) {
+    setenv("DBC_CACHE_DIR", cache_dir, 1);
+  }
+
+  auto best_time = [&](const std::string &path, bool use_cache) {
+    delete dbc_parse(path, use_cache);  // warm up, and fill the cache
+    double best = 1e9;
+    for (int i = 0; i < iterations; i++) {
+      auto start = std::chrono::steady_clock::now();
+      DBC *dbc = dbc_parse(path, use_cache);
+      auto end = std::chrono::steady_clock::now();
+      delete dbc;
+      best = std::min(best, std::chrono::duration<double, std::milli>(end - start).count());
+    }
+    return best;
+  };
+
+  std::vector<std::tuple<double, double, std::string>> times;
+  double total = 0, total_cached = 0;
+  for (const auto &name : get_dbc_names()) {
+    const std::string path = dbc_path + "/" + name + ".dbc";
+    times.push_back({best_time(path, false), best_time(path, true), name});
+    total += std::get<0>(times.back());
+    total_cached += std::get<1>(times.back());
+  }
+
+  std::sort(times.rbegin(), times.rend());
+  printf("%11s %11s\n", "text", "cached");
+  for (const auto &[ms, ms_cached, name] : times) {
+    printf("%8.3f ms %8.3f ms  %s\n", ms, ms_cached, name.c_str());
+  }
+  printf("%8.3f ms %8.3f ms  total (%zu DBCs, best of %d)\n", total, total_cached, times.size(), iterations);
+
+  if (temp_cache_dir) {
+    std::filesystem::remove_all(cache_dir);
+  }
+  return 0;
+}
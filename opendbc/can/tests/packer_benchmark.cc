@@ -0,0 +1,67 @@
+// Reports the time to pack a message, with all of its signals set, for every
+// DBC returned by get_dbc_names().
+#include <fcntl.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <chrono>
+#include <cstdio>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include "opendbc/can/common.h"
+
+int main(int argc, char **argv) {
+  const int iterations = argc > 1 ? std::stoi(argv[1]) : 1000;
+
+  // some checksum functions log on every pack of a message they don't know
+  fflush(stdout);
+  const int stdout_fd = dup(STDOUT_FILENO);
+  const int null_fd = open("/dev/null", O_WRONLY);
+  dup2(null_fd, STDOUT_FILENO);
+
+  std::vector<std::pair<double, std::string>> times;
+  double total_ns = 0;
+  size_t total_msgs = 0;
+  for (const auto &name : get_dbc_names()) {
+    const DBC *dbc = dbc_lookup(name);
+    CANPacker packer(name);
+
+    std::vector<std::pair<uint32_t, std::vector<SignalPackValue>>> msgs;
+    for (const auto &msg : dbc->msgs) {
+      auto &[address, values] = msgs.emplace_back(msg.address, std::vector<SignalPackValue>{});
+      for (const auto &sig : msg.sigs) {
+        values.push_back({sig.name, sig.offset + sig.factor});
+      }
+    }
+    if (msgs.empty()) continue;
+
+    size_t packed = 0;
+    auto start = std::chrono::steady_clock::now();
+    for (int i = 0; i < iterations; i++) {
+      for (const auto &[address, values] : msgs) {
+        packed += packer.pack(address, values).size();
+      }
+    }
+    auto end = std::chrono::steady_clock::now();
+    if (packed == 0) continue;
+
+    const double ns = std::chrono::duration<double, std::nano>(end - start).count();
+    times.push_back({ns / (iterations * msgs.size()), name});
+    total_ns += ns;
+    total_msgs += iterations * msgs.size();
+  }
+
+  fflush(stdout);
+  dup2(stdout_fd, STDOUT_FILENO);
+  close(null_fd);
+  close(stdout_fd);
+
+  std::sort(times.rbegin(), times.rend());
+  for (const auto &[ns, name] : times) {
+    printf("%8.1f ns/msg  %s\n", ns, name.c_str());
+  }
+  printf("%8.1f ns/msg  overall (%zu DBCs, %d iterations)\n", total_ns / total_msgs, times.size(), iterations);
+  return 0;
+}
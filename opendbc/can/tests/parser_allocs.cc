@@ -0,0 +1,64 @@
+// Counts heap allocations made by CANParser::update once the parser is warmed up.
+// The steady state parse loop shouldn't allocate.
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <new>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include "opendbc/can/common.h"
+
+static size_t allocs = 0;
+
+void *operator new(size_t size) {
+  allocs++;
+  void *p = malloc(size);
+  if (p == nullptr) throw std::bad_alloc();
+  return p;
+}
+void operator delete(void *p) noexcept { free(p); }
+void operator delete(void *p, size_t) noexcept { free(p); }
+
+int check_allocs(const std::string &dbc_name, const std::vector<std::string> &msg_names) {
+  const DBC *dbc = dbc_lookup(dbc_name);
+  CANPacker packer(dbc_name);
+
+  std::vector<std::pair<uint32_t, int>> messages;
+  std::vector<CanData> can_data(10);
+  for (int i = 0; i < can_data.size(); i++) {
+    can_data[i].nanos = (i + 1) * 10000000ULL;
+    for (const auto &name : msg_names) {
+      const Msg *msg = dbc->name_to_msg.at(name);
+      if (i == 0) messages.push_back({msg->address, 0});
+
+      std::vector<uint8_t> dat = packer.pack(msg->address, {});
+      CanFrame &frame = can_data[i].frames.emplace_back();
+      frame.src = 0;
+      frame.address = msg->address;
+      frame.size = dat.size();
+      memcpy(frame.dat, dat.data(), dat.size());
+    }
+  }
+
+  CANParser parser(0, dbc_name, messages);
+  for (int i = 0; i < 10; i++) parser.update(can_data);
+
+  const size_t start = allocs;
+  size_t updated = 0;
+  for (int i = 0; i < 1000; i++) {
+    updated += parser.update(can_data).size();
+  }
+  const size_t n = allocs - start;
+
+  printf("%s: %zu allocations in 1000 updates, %zu messages updated\n", dbc_name.c_str(), n, updated);
+  return (n == 0 && updated == 1000 * msg_names.size()) ? 0 : 1;
+}
+
+int main() {
+  int ret = 0;
+  ret |= check_allocs("toyota_new_mc_pt_generated", {"ACC_CONTROL", "STEER_TORQUE_SENSOR", "WHEEL_SPEEDS"});
+  ret |= check_allocs("hyundai_canfd_generated", {"SCC_CONTROL", "WHEEL_SPEEDS"});
+  return ret;
+}
@@ -28,3 +28,20 @@ class TestCanParserPackerExceptions:
     CANParser(dbc_file, [], 0)
     CANPacker(dbc_file)
     CANDefine(dbc_file)
+
+  @pytest.mark.parametrize("line, error", [
+    ("BO_ 100 MSG 8 XXX", "bad BO"),
+    ("BO_ 100 MSG: 8 XXX extra", "bad BO"),
+    (' SG_ SIG : 7|8@0+ (1,0) [0|255] ""', "bad SG"),
+    (' SG_ SIG : 7|8@2* (1,0) [0|255] "" XXX', "bad SG"),
+    (' SG_ SIG M1 : 7|8@0+ (1,0 [0|255] "" XXX', "bad SG"),
+    (' SG_ SIG : 7|8@0+ (1,0) [0|255] "" XXX\n SG_ SIG : 15|8@0+ (1,0) [0|255] "" XXX', "Duplicate signal name: SIG"),
+    (' SG_ SIG : 511|16@0+ (1,0) [0|255] "" XXX', "Signal out of bounds"),
+    ('VAL_ 100 SIG 0 "" ;', "bad VAL"),
+    ('VAL_ 100 SIG "Off" ;', "bad VAL"),
+  ])
+  def test_bad_lines(self, tmp_path, line, error):
+    dbc_file = tmp_path / "bad.dbc"
+    dbc_file.write_text(f"BO_ 100 MSG: 8 XXX\n{line}\n")
+    with pytest.raises(RuntimeError, match=f"bad.dbc:\\d\\] {error}"):
+      CANDefine(str(dbc_file))
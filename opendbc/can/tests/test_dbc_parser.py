@@ -1,6 +1,66 @@
+import os
+import random
+import re
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+from opendbc import DBC_PATH
 from opendbc.can.parser import CANParser
 from opendbc.can.tests import ALL_DBCS
 
+BO_REGEX = re.compile(r"^BO_ (\w+) (\w+) *: (\w+)")
+SG_REGEX = re.compile(r"^SG_ (\w+)(?: \w+)? *: (\d+)\|(\d+)@(\d)([+-]) \(([0-9.+\-eE]+),([0-9.+\-eE]+)\)")
+CHECKED_SIGNALS = {"CHECKSUM", "COUNTER", "CHECKSUM_PEDAL", "COUNTER_PEDAL"}
+
+# packs and parses a message with a checksum, and dumps the value tables
+CACHE_SCRIPT = """
+from opendbc.can.can_define import CANDefine
+from opendbc.can.packer import CANPacker
+from opendbc.can.parser import CANParser
+packer = CANPacker("honda_civic_touring_2016_can_generated")
+parser = CANParser("honda_civic_touring_2016_can_generated", [("STEERING_CONTROL", 0)], 0)
+parser.update_strings([0, [packer.make_can_msg("STEERING_CONTROL", 0, {"STEER_TORQUE": 42, "COUNTER": 1})]])
+assert parser.can_valid
+print(parser.vl["STEERING_CONTROL"], CANDefine("honda_civic_touring_2016_can_generated").dv)
+"""
+
+
+def read_signals(dbc):
+  msgs = {}
+  with open(os.path.join(DBC_PATH, f"{dbc}.dbc")) as f:
+    for line in f:
+      line = line.strip()
+      if (m := BO_REGEX.match(line)) is not None:
+        sigs = msgs[int(m.group(1))] = (int(m.group(3)), {})
+      elif (m := SG_REGEX.match(line)) is not None:
+        start_bit, size = int(m.group(2)), int(m.group(3))
+        little_endian = m.group(4) == "1"
+        if little_endian:
+          lsb, msb = start_bit, start_bit + size - 1
+        else:
+          # walk big endian bits from the MSB
+          be_bits = [j + i * 8 for i in range(64) for j in range(7, -1, -1)]
+          lsb, msb = be_bits[be_bits.index(start_bit) + size - 1], start_bit
+        sigs[1][m.group(1)] = (lsb, msb, size, little_endian, m.group(5) == "-", float(m.group(6)), float(m.group(7)))
+  return msgs
+
+
+def get_raw_value(dat, lsb, msb, size, little_endian):
+  # reference byte walk, bits past the end of dat are cut off
+  ret = 0
+  i = msb // 8
+  bits = size
+  while 0 <= i < len(dat) and bits > 0:
+    lo = lsb if lsb // 8 == i else i * 8
+    hi = msb if msb // 8 == i else (i + 1) * 8 - 1
+    n = hi - lo + 1
+    ret |= ((dat[i] >> (lo - i * 8)) & ((1 << n) - 1)) << (bits - n)
+    bits -= n
+    i = i - 1 if little_endian else i + 1
+  return ret
+
 
 class TestDBCParser:
   def test_enough_dbcs(self):
@@ -19,3 +79,103 @@ class TestDBCParser:
     for dbc in ALL_DBCS:
       with subtests.test(dbc=dbc):
         CANParser(dbc, [], 0)
+
+  def test_signal_extraction(self, subtests):
+    """
+      Checks the parser's compiled extraction of every signal against a
+      reference byte walk, with full length and truncated frames
+    """
+    random.seed(0)
+    for dbc in ALL_DBCS:
+      with subtests.test(dbc=dbc):
+        msgs = {addr: msg for addr, msg in read_signals(dbc).items() if not (CHECKED_SIGNALS & msg[1].keys())}
+        parser = CANParser(dbc, [(addr, 0) for addr in msgs], 0)
+
+        for addr, (size, sigs) in msgs.items():
+          for length in {size, random.randint(0, size)}:
+            dat = bytes(random.getrandbits(8) for _ in range(length))
+            parser.update_strings([0, [(addr, dat, 0)]])
+
+            for name, (lsb, msb, sig_size, little_endian, signed, factor, offset) in sigs.items():
+              raw = get_raw_value(dat, lsb, msb, sig_size, little_endian)
+              if signed and (raw >> (sig_size - 1)) & 1:
+                raw -= 1 << sig_size
+              elif raw >= 1 << 63:
+                raw -= 1 << 64  # raw values are int64
+              assert parser.vl[addr][name] == raw * factor + offset, (hex(addr), name, dat.hex())
+
+  def test_dbc_cache(self, tmp_path):
+    def run(cache_dir, **env):
+      env = {**os.environ, "DBC_CACHE_DIR": str(cache_dir), **env}
+      return subprocess.check_output([sys.executable, "-c", CACHE_SCRIPT], env=env, encoding="utf-8")
+
+    # an empty DBC_CACHE_DIR disables the cache
+    home = tmp_path / "home"
+    expected = run("", HOME=str(home), XDG_CACHE_HOME=str(home / ".cache"))
+    assert not home.exists()
+
+    # by default, the cache is in $XDG_CACHE_HOME/opendbc/dbc
+    env = {k: v for k, v in os.environ.items() if k != "DBC_CACHE_DIR"} | {"XDG_CACHE_HOME": str(tmp_path / "xdg")}
+    assert subprocess.check_output([sys.executable, "-c", CACHE_SCRIPT], env=env, encoding="utf-8") == expected
+    default_dir = tmp_path / "xdg" / "opendbc" / "dbc"
+    assert default_dir.stat().st_mode & 0o777 == 0o700
+    assert len(list(default_dir.glob("honda_civic_touring_2016_can_generated.*.bin"))) == 1
+
+    cache_dir = tmp_path / "cache"
+    assert run(cache_dir) == expected
+    assert cache_dir.stat().st_mode & 0o777 == 0o700
+    cache_files = list(cache_dir.glob("honda_civic_touring_2016_can_generated.*.bin"))
+    assert len(cache_files) == 1
+    assert run(cache_dir) == expected
+    cache = cache_files[0].read_bytes()
+
+    # header: magic, format hash, hash, DBC name. then the message count, and the first message's
+    # name, address, size, signal count, and its first signal's name, start bit, msb and lsb
+    name_len = struct.unpack_from("I", cache, 20)[0]
+    msg_count_offset = 24 + name_len
+    msg_name_len = struct.unpack_from("I", cache, msg_count_offset + 4)[0]
+    sig_offset = msg_count_offset + 4 + 4 + msg_name_len + 4 + 4 + 4
+    sig_name_len = struct.unpack_from("I", cache, sig_offset)[0]
+    lsb_offset = sig_offset + 4 + sig_name_len + 4 + 4
+
+    # a corrupt cache file falls back to parsing the DBC, and is replaced
+    corrupt_caches = [
+      cache[:100],
+      cache[:msg_count_offset] + struct.pack("I", 0x7fffffff) + cache[msg_count_offset + 4:],
+      cache[:lsb_offset] + struct.pack("i", -1000) + cache[lsb_offset + 4:],
+      cache + b"\0",
+    ]
+    for corrupt in corrupt_caches:
+      cache_files[0].write_bytes(corrupt)
+      assert run(cache_dir) == expected
+      assert cache_files[0].read_bytes() == cache
+
+    # saving a DBC's cache file removes its files for other DBC texts or cache formats
+    stale_file = cache_dir / "honda_civic_touring_2016_can_generated.dbc.0123456789abcdef.bin"
+    other_file = cache_dir / "toyota_nodsu_pt_generated.dbc.0123456789abcdef.bin"
+    stale_file.write_bytes(b"stale")
+    other_file.write_bytes(b"other")
+    cache_files[0].unlink()
+    assert run(cache_dir) == expected
+    assert sorted(cache_dir.iterdir()) == sorted([cache_files[0], other_file])
+
+    # an edited DBC, found by its size and mtime, gets a new cache file
+    dbc_dir = tmp_path / "basedir" / "opendbc" / "dbc"
+    dbc_dir.mkdir(parents=True)
+    dbc_file = dbc_dir / "honda_civic_touring_2016_can_generated.dbc"
+    dbc_file.write_bytes((Path(DBC_PATH) / dbc_file.name).read_bytes())
+    edited_dir = tmp_path / "edited"
+    assert run(edited_dir, BASEDIR=str(tmp_path / "basedir")) == expected
+    old_files = list(edited_dir.iterdir())
+    with dbc_file.open("a") as f:
+      f.write("\n")
+    assert run(edited_dir, BASEDIR=str(tmp_path / "basedir")) == expected
+    new_files = list(edited_dir.iterdir())
+    assert len(old_files) == len(new_files) == 1 and old_files != new_files
+
+    # a cache dir others can access isn't used
+    shared_dir = tmp_path / "shared"
+    shared_dir.mkdir(mode=0o755)
+    shared_dir.chmod(0o755)
+    assert run(shared_dir) == expected
+    assert list(shared_dir.iterdir()) == []
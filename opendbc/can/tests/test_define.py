@@ -24,3 +24,9 @@ class TestCADNDefine:
     for dbc in ALL_DBCS:
       with subtests.test(dbc=dbc):
         CANDefine(dbc)
+
+  def test_val_definitions(self, tmp_path):
+    dbc_file = tmp_path / "vals.dbc"
+    dbc_file.write_text('BO_ 100 MSG: 8 XXX\n SG_ SIG : 7|8@0+ (1,0) [0|255] "" XXX\n' +
+                        'VAL_ 100 SIG 2 "some value"  1 "Off" -1 " on " ;\n')
+    assert CANDefine(str(dbc_file)).dv["MSG"] == {"SIG": {2: "SOME_VALUE", 1: "OFF", -1: "ON"}}
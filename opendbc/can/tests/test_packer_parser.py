@@ -1,5 +1,6 @@
 import pytest
 import random
+from concurrent.futures import ThreadPoolExecutor
 
 from opendbc.can.parser import CANParser
 from opendbc.can.packer import CANPacker
@@ -255,6 +256,52 @@ class TestCanParserPacker:
     send_msg()
     assert not parser.bus_timeout
 
+  def test_missing_timed_out(self):
+    dbc_file = "honda_civic_touring_2016_can_generated"
+    parser = CANParser(dbc_file, [("VSA_STATUS", 100), ("STEER_MOTOR_TORQUE", 0)], 0)
+    packer = CANPacker(dbc_file)
+
+    parser.update_strings([int(1e7), []])
+    assert parser.missing_addresses == [0x1A4]
+    assert parser.timed_out_addresses == []
+
+    parser.update_strings([int(2e7), [packer.make_can_msg("VSA_STATUS", 0, {})]])
+    assert parser.missing_addresses == []
+    assert parser.timed_out_addresses == []
+
+    # not seen for 10x the expected period
+    parser.update_strings([int(2e7 + 1e8 + 1), []])
+    assert parser.missing_addresses == []
+    assert parser.timed_out_addresses == [0x1A4]
+
+  def test_concurrent_parsers(self):
+    """Test parsers on separate threads match parsing on one thread"""
+    dbc_file = "honda_civic_touring_2016_can_generated"
+    msgs = [("VSA_STATUS", 50), ("POWERTRAIN_DATA", 100)]
+    buses = range(4)
+    packers = {bus: CANPacker(dbc_file) for bus in buses}
+
+    can_strings = []
+    for i in range(1000):
+      frames = []
+      for bus in buses:
+        frames.append(packers[bus].make_can_msg("VSA_STATUS", bus, {"USER_BRAKE": random.randrange(100)}))
+        frames.append(packers[bus].make_can_msg("POWERTRAIN_DATA", bus, {"PEDAL_GAS": random.randrange(100)}))
+      can_strings.append([int(i * 1e7), frames])
+
+    def run(parser):
+      ret = []
+      for j in range(0, len(can_strings), 10):
+        parser.update_strings(can_strings[j:j + 10])
+        ret.append((parser.can_valid, {addr: dict(vl) for addr, vl in parser.vl_all.items()}))
+      return ret
+
+    expected = [run(CANParser(dbc_file, msgs, bus)) for bus in buses]
+    with ThreadPoolExecutor(max_workers=len(buses)) as executor:
+      for _ in range(3):
+        results = list(executor.map(run, [CANParser(dbc_file, msgs, bus) for bus in buses]))
+        assert results == expected
+
   def test_updated(self):
     """Test updated value dict"""
     dbc_file = "honda_civic_touring_2016_can_generated"
@@ -319,6 +366,178 @@ class TestCanParserPacker:
       ts_nanos = parser.ts_nanos["POWERTRAIN_DATA"].values()
       assert set(ts_nanos) == {0}
 
+  def test_columnar(self):
+    """Test columnar numpy output matches the dict output"""
+    dbc_file = "honda_civic_touring_2016_can_generated"
+    msgs = [("VSA_STATUS", 50), ("POWERTRAIN_DATA", 100)]
+    parser = CANParser(dbc_file, msgs, 0)
+    parser_np = CANParser(dbc_file, msgs, 0, columnar=True)
+    packer = CANPacker(dbc_file)
+
+    assert parser_np.vl == {}
+    idx = parser_np.sig_index["VSA_STATUS"]
+    assert list(idx) == list(parser.vl["VSA_STATUS"])
+    assert parser_np.sig_index[0x1A4] is idx
+
+    # views are created once and track the parser state
+    vl = parser_np.vl_np["VSA_STATUS"]
+    ts_nanos = parser_np.ts_nanos_np["VSA_STATUS"]
+    assert not vl.flags.writeable
+    assert not vl.any() and ts_nanos == 0
+    assert parser_np.vl_all_np["VSA_STATUS"].shape == (len(idx), 0)
+
+    for i in range(1, 10):
+      user_brake_vals = [random.randrange(100) for _ in range(random.randrange(1, 5))]
+      can_strings = [(int(i * 1e8) + j, [packer.make_can_msg("VSA_STATUS", 0, {"USER_BRAKE": v})]) for j, v in enumerate(user_brake_vals)]
+      assert parser.update_strings(can_strings) == parser_np.update_strings(can_strings) == {0x1A4}
+
+      assert parser_np.vl_np["VSA_STATUS"] is vl
+      assert vl[idx["USER_BRAKE"]] == user_brake_vals[-1]
+      assert ts_nanos == can_strings[-1][0]
+      assert parser_np.vl_all_np["VSA_STATUS"][idx["USER_BRAKE"]].tolist() == user_brake_vals
+      for sig, col in idx.items():
+        assert vl[col] == parser.vl["VSA_STATUS"][sig]
+        assert parser_np.vl_all_np[0x1A4][col].tolist() == parser.vl_all["VSA_STATUS"][sig]
+      assert parser_np.vl_all_np["POWERTRAIN_DATA"].shape[1] == 0
+
+    # no values after an empty update
+    parser_np.update_strings([0, []])
+    assert parser_np.vl_all_np["VSA_STATUS"].shape == (len(idx), 0)
+    assert vl[idx["USER_BRAKE"]] == user_brake_vals[-1]
+
+  def test_track_changes(self):
+    dbc_file = "honda_civic_touring_2016_can_generated"
+    msgs = [("VSA_STATUS", 50), ("POWERTRAIN_DATA", 100)]
+    parser = CANParser(dbc_file, msgs, 0, track_changes=True)
+    packer = CANPacker(dbc_file)
+    assert parser.changes == {}
+
+    # first frame, only signals that differ from the initial 0 are reported
+    msg = packer.make_can_msg("VSA_STATUS", 0, {"USER_BRAKE": 10})
+    assert parser.update_strings([int(1e9), [msg]]) == {0x1A4}
+    changed = {name: (old, new, nanos) for name, old, new, nanos in parser.changes["VSA_STATUS"]}
+    assert changed.pop("USER_BRAKE") == (0, 10, int(1e9))
+    assert changed.keys() <= {"COUNTER", "CHECKSUM"}
+    assert parser.changes["VSA_STATUS"] is parser.changes[0x1A4]
+    assert 0x17C not in parser.changes
+
+    # several frames in one update report the change across the whole update
+    msgs = [packer.make_can_msg("VSA_STATUS", 0, {"USER_BRAKE": v}) for v in (20, 10)]
+    parser.update_strings([[int(2e9), [msgs[0]]], [int(3e9), [msgs[1]]]])
+    assert "USER_BRAKE" not in {c[0] for c in parser.changes["VSA_STATUS"]}
+
+    # updates with no changed signals clear the previous changes
+    parser.update_strings([int(4e9), [packer.make_can_msg("POWERTRAIN_DATA", 0, {})]])
+    assert 0x1A4 not in parser.changes
+    assert parser.vl["VSA_STATUS"]["USER_BRAKE"] == 10
+
+  def test_decode_log(self):
+    """Test bulk log decoding matches update_strings"""
+    dbc_file = "honda_civic_touring_2016_can_generated"
+    msgs = [("VSA_STATUS", 50), ("POWERTRAIN_DATA", 100), ("STEERING_CONTROL", 0)]
+    parser = CANParser(dbc_file, msgs, 0)
+    parser_bulk = CANParser(dbc_file, msgs, 0)
+    packer = CANPacker(dbc_file)
+    packer_bus1 = CANPacker(dbc_file)
+
+    frames = []
+    for i in range(500):
+      t = int(i * 1e7)
+      frames.append((t, packer.make_can_msg("VSA_STATUS", 0, {"USER_BRAKE": random.randrange(100)})))
+      frames.append((t, packer_bus1.make_can_msg("VSA_STATUS", 1, {"USER_BRAKE": random.randrange(100)})))
+      if i % 2:
+        frames.append((t, packer.make_can_msg("POWERTRAIN_DATA", 0, {"PEDAL_GAS": random.randrange(100)})))
+      if i % 7 == 0:
+        frames.append((t, packer.make_can_msg("ACC_HUD", 0, {})))
+
+    expected = {0x1A4: [], 0x17C: []}
+    for t, frame in frames:
+      for addr in parser.update_strings([t, [frame]]):
+        expected[addr].append((t, dict(parser.vl[addr])))
+
+    nanos = [t for t, _ in frames]
+    addresses = [f[0] for _, f in frames]
+    buses = [f[2] for _, f in frames]
+    data = b"".join(f[1] for _, f in frames)
+    offsets = [0]
+    for _, f in frames:
+      offsets.append(offsets[-1] + len(f[1]))
+    ret = parser_bulk.decode_log(nanos, addresses, buses, data, offsets)
+
+    for msg, exp in expected.items():
+      ts, sigs = ret[msg]
+      assert ts.tolist() == [t for t, _ in exp]
+      for sig, vals in sigs.items():
+        assert vals.tolist() == [v[sig] for _, v in exp]
+    assert ret["VSA_STATUS"] is ret[0x1A4]
+    assert len(ret[0x1A4][0]) == 500
+    assert len(ret["STEERING_CONTROL"][0]) == 0
+
+    # decoding a log doesn't change the state of live updates
+    parser_live = CANParser(dbc_file, msgs, 0, columnar=True)
+    parser_ref = CANParser(dbc_file, msgs, 0, columnar=True)
+    log_t = int(1e12)
+    for i, (t, frame) in enumerate(frames):
+      if i == len(frames) // 2:
+        parser_live.decode_log([n + log_t for n in nanos], addresses, buses, data, offsets)
+        for msg in expected:
+          assert parser_live.ts_nanos_np[msg] == parser_ref.ts_nanos_np[msg]
+          assert parser_live.vl_np[msg].tolist() == parser_ref.vl_np[msg].tolist()
+      updated = parser_live.update_strings([t, [frame]])
+      assert updated == parser_ref.update_strings([t, [frame]])
+      assert parser_live.vl == parser_ref.vl
+      assert parser_live.ts_nanos == parser_ref.ts_nanos
+      assert parser_live.can_valid == parser_ref.can_valid
+    assert parser_live.can_valid
+
+    # the live counter checks don't affect decoding: repeating a counter value fails them
+    for _ in range(10):
+      parser_bulk.update_strings([0, [frames[0][1]]])
+    assert not parser_bulk.can_valid
+    ret_again = parser_bulk.decode_log(nanos, addresses, buses, data, offsets)
+    for msg in expected:
+      assert ret_again[msg][0].tolist() == ret[msg][0].tolist()
+
+    with pytest.raises(ValueError):
+      parser_bulk.decode_log(nanos, addresses, buses, data, offsets[:-1])
+    with pytest.raises(ValueError):
+      parser_bulk.decode_log(nanos, addresses, buses, data[:-1], offsets)
+    with pytest.raises(ValueError):
+      parser_bulk.decode_log([0], [0x1A4], [0], b"", [0, 1])
+    assert len(parser_bulk.decode_log([0], [0x1A4], [0], b"", [0, 0])[0x1A4][0]) == 0
+
+  def test_make_can_msgs(self):
+    """Test batch packing matches make_can_msg"""
+    dbc_file = "honda_civic_touring_2016_can_generated"
+    packer = CANPacker(dbc_file)
+    packer_batch = CANPacker(dbc_file)
+    steer = packer_batch.make_template("STEERING_CONTROL", ["STEER_TORQUE", "STEER_TORQUE_REQUEST"])
+    assert steer.address == 0xE4 and steer.name == "STEERING_CONTROL"
+
+    for _ in range(100):
+      torque, req, brake = random.randrange(-1000, 1000), random.randrange(2), random.randrange(100)
+      msgs = [
+        ("STEERING_CONTROL", 0, {"STEER_TORQUE": torque, "STEER_TORQUE_REQUEST": req}),
+        (0x1A4, 1, {"USER_BRAKE": brake, "NOT_A_SIGNAL": 1}),
+        ("ACC_HUD", 2, {}),
+        ("NOT_A_MESSAGE", 0, {}),
+      ]
+      expected = [packer.make_can_msg(*msg) for msg in msgs]
+      assert packer_batch.make_can_msgs([(steer, 0, (torque, req))] + msgs[1:]) == expected
+    assert packer_batch.make_can_msgs([]) == []
+
+  def test_make_can_msgs_invalid(self):
+    packer = CANPacker(TEST_DBC)
+    tmpl = packer.make_template("CAN_FD_MESSAGE", ["COUNTER"])
+    with pytest.raises(ValueError):
+      packer.make_can_msgs([(tmpl, 0, (1, 2))])
+    with pytest.raises(ValueError):
+      CANPacker("honda_civic_touring_2016_can_generated").make_can_msgs([(tmpl, 0, (1,))])
+    with pytest.raises(RuntimeError):
+      packer.make_template("NOT_A_MESSAGE", [])
+    with pytest.raises(RuntimeError):
+      packer.make_template("CAN_FD_MESSAGE", ["NOT_A_SIGNAL"])
+
   def test_nonexistent_messages(self):
     # Ensure we don't allow messages not in the DBC
     existing_messages = ("STEERING_CONTROL", 228, "CAN_FD_MESSAGE", 245)
@@ -0,0 +1,7 @@
+import os
+import subprocess
+
+
+def test_parser_no_allocations():
+  # built by SConscript with the test extras
+  subprocess.run([os.path.join(os.path.dirname(__file__), "parser_allocs")], check=True)
@@ -43,6 +43,33 @@ class TestParser:
     assert avg_nanos < maxx
     assert avg_nanos > minn, "Performance seems to have improved, update test thresholds."
 
+  def _benchmark_bulk(self, checks, thresholds):
+    # C++ parse loop only, without the update_strings overhead
+    parser = CANParser('toyota_new_mc_pt_generated', checks, 0)
+    packer = CANPacker('toyota_new_mc_pt_generated')
+
+    frames = [packer.make_can_msg("ACC_CONTROL", 0, {"ACC_TYPE": 1, "ALLOW_LONG_PRESS": 3}) for _ in range(50000)]
+    nanos = [int(0.01 * i * 1e9) for i in range(len(frames))]
+    addresses = [f[0] for f in frames]
+    buses = [f[2] for f in frames]
+    data = b"".join(f[1] for f in frames)
+    offsets = [8 * i for i in range(len(frames) + 1)]
+
+    ets = []
+    for _ in range(25):
+      t1 = time.process_time_ns()
+      parser.decode_log(nanos, addresses, buses, data, offsets)
+      t2 = time.process_time_ns()
+      ets.append(t2 - t1)
+
+    avg_nanos = sum(ets) / len(ets) / len(frames)
+    print('%s: [bulk] avg: %dns' % (self._testMethodName, avg_nanos))
+
+    minn, maxx = thresholds
+    assert avg_nanos < maxx
+    assert avg_nanos > minn, "Performance seems to have improved, update test thresholds."
+
   def test_performance_all_signals(self):
     self._benchmark([('ACC_CONTROL', 10)], (10000, 19000), 1)
     self._benchmark([('ACC_CONTROL', 10)], (1300, 5000), 10)
+    self._benchmark_bulk([('ACC_CONTROL', 10)], (50, 400))
@@ -1,14 +1,18 @@
 import os
 import time
+from collections.abc import Mapping
 
 from opendbc.car import gen_empty_fingerprint
 from opendbc.car.can_definitions import CanRecvCallable, CanSendCallable
 from opendbc.car.carlog import carlog
 from opendbc.car.structs import CarParams, CarParamsT
-from opendbc.car.fingerprints import eliminate_incompatible_cars, all_legacy_fingerprint_cars
-from opendbc.car.fw_versions import ObdCallback, get_fw_versions_ordered, get_present_ecus, match_fw_to_car
+from opendbc.car.fingerprints import eliminate_incompatible_cars_mask, all_legacy_fingerprint_cars_mask, mask_to_cars
+from opendbc.car.ecu_addrs import EcuSweepStats
+from opendbc.car.fw_cache import FwCache, get_fw_versions_cached
+from opendbc.car.fw_versions import ObdCallback, get_present_ecus, match_fw_to_car
+from opendbc.car.interfaces import CarInterfaceBase
+from opendbc.car.manifest import get_brands
 from opendbc.car.mock.values import CAR as MOCK
-from opendbc.car.values import BRANDS
 from opendbc.car.vin import get_vin, is_valid_vin, VIN_UNKNOWN
 
 from common.params import Params
@@ -27,24 +31,42 @@ def load_interfaces(brand_names):
   return ret
 
 
+class LazyInterfaces(Mapping[str, type[CarInterfaceBase]]):
+  """Maps each car model to its CarInterface, a brand's interface is only imported once one of its models is looked up"""
+  def __init__(self, brand_names: dict[str, list[str]]):
+    self.brand_names = brand_names
+    self.model_brands = {model_name: brand_name for brand_name, model_names in brand_names.items() for model_name in model_names}
+    self.loaded: dict[str, type[CarInterfaceBase]] = {}
+
+  def __getitem__(self, model_name: str) -> type[CarInterfaceBase]:
+    if model_name not in self.loaded:
+      brand_name = self.model_brands[model_name]
+      self.loaded.update(load_interfaces({brand_name: self.brand_names[brand_name]}))
+    return self.loaded[model_name]
+
+  def __iter__(self):
+    return iter(self.model_brands)
+
+  def __len__(self):
+    return len(self.model_brands)
+
+  def __contains__(self, model_name):
+    return model_name in self.model_brands
+
+
 def _get_interface_names() -> dict[str, list[str]]:
   # returns a dict of brand name and its respective models
-  brand_names = {}
-  for brand in BRANDS:
-    brand_name = brand.__module__.split('.')[-2]
-    brand_names[brand_name] = [model.value for model in brand]
-
-  return brand_names
+  return get_brands()
 
 
 # imports from directory opendbc/car/<name>/
 interface_names = _get_interface_names()
-interfaces = load_interfaces(interface_names)
+interfaces = LazyInterfaces(interface_names)
 
 
 def can_fingerprint(can_recv: CanRecvCallable) -> tuple[str | None, dict[int, dict]]:
   finger = gen_empty_fingerprint()
-  candidate_cars = {i: all_legacy_fingerprint_cars() for i in [0, 1]}  # attempt fingerprint on both bus 0 and 1
+  candidate_cars = {i: all_legacy_fingerprint_cars_mask() for i in [0, 1]}  # attempt fingerprint on both bus 0 and 1
   frame = 0
   car_fingerprint = None
   done = False
@@ -64,17 +86,18 @@ def can_fingerprint(can_recv: CanRecvCallable) -> tuple[str | None, dict[int, di
         for b in candidate_cars:
           # Ignore extended messages and VIN query response.
           if can.src == b and can.address < 0x800 and can.address not in (0x7df, 0x7e0, 0x7e8):
-            candidate_cars[b] = eliminate_incompatible_cars(can, candidate_cars[b])
+            candidate_cars[b] = eliminate_incompatible_cars_mask(can, candidate_cars[b])
 
       # if we only have one car choice and the time since we got our first
       # message has elapsed, exit
       for b in candidate_cars:
-        if len(candidate_cars[b]) == 1 and frame > FRAME_FINGERPRINT:
+        cc = candidate_cars[b]
+        if cc and cc & (cc - 1) == 0 and frame > FRAME_FINGERPRINT:
           # fingerprint done
-          car_fingerprint = candidate_cars[b][0]
+          car_fingerprint = mask_to_cars(cc)[0]
 
       # bail if no cars left or we've been waiting for more than 2s
-      failed = (all(len(cc) == 0 for cc in candidate_cars.values()) and frame > FRAME_FINGERPRINT) or frame > 200
+      failed = (all(cc == 0 for cc in candidate_cars.values()) and frame > FRAME_FINGERPRINT) or frame > 200
       succeeded = car_fingerprint is not None
       done = failed or succeeded
 
@@ -85,11 +108,19 @@ def can_fingerprint(can_recv: CanRecvCallable) -> tuple[str | None, dict[int, di
 
 # **** for use live only ****
 def fingerprint(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_multiplexing: ObdCallback, num_pandas: int,
-                cached_params: CarParamsT | None) -> tuple[str | None, dict, str, list[CarParams.CarFw], CarParams.FingerprintSource, bool]:
+                cached_params: CarParamsT | None, fw_cache: FwCache | None = None) -> tuple[str | None, dict, str, list[CarParams.CarFw],
+                                                                                           CarParams.FingerprintSource, bool]:
   fixed_fingerprint = os.environ.get('FINGERPRINT', "")
   skip_fw_query = os.environ.get('SKIP_FW_QUERY', False)
   disable_fw_cache = os.environ.get('DISABLE_FW_CACHE', False)
+  fw_cache_path = os.environ.get('FW_CACHE_PATH', "")
   ecu_rx_addrs = set()
+  ecu_sweep_stats = EcuSweepStats()
+
+  if disable_fw_cache:
+    fw_cache = None
+  elif fw_cache is None and fw_cache_path:
+    fw_cache = FwCache(fw_cache_path)
 
   start_time = time.monotonic()
   if not skip_fw_query:
@@ -98,6 +129,7 @@ def fingerprint(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_mu
       carlog.warning("Using cached CarParams")
       vin_rx_addr, vin_rx_bus, vin = -1, -1, cached_params.carVin
       car_fw = list(cached_params.carFw)
+      exact_fw_match, fw_candidates = match_fw_to_car(car_fw, vin)
       cached = True
     else:
       carlog.warning("Getting VIN & FW versions")
@@ -106,11 +138,10 @@ def fingerprint(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_mu
       set_obd_multiplexing(True)
       # VIN query only reliably works through OBDII
       vin_rx_addr, vin_rx_bus, vin = get_vin(can_recv, can_send, (0, 1))
-      ecu_rx_addrs = get_present_ecus(can_recv, can_send, set_obd_multiplexing, num_pandas=num_pandas)
-      car_fw = get_fw_versions_ordered(can_recv, can_send, set_obd_multiplexing, vin, ecu_rx_addrs, num_pandas=num_pandas)
-      cached = False
-
-    exact_fw_match, fw_candidates = match_fw_to_car(car_fw, vin)
+      ecu_rx_addrs = get_present_ecus(can_recv, can_send, set_obd_multiplexing, num_pandas=num_pandas, stats=ecu_sweep_stats)
+      # the persistent FW cache skips the FW sweep on a vehicle it has seen, after re-reading one ECU
+      car_fw, exact_fw_match, fw_candidates, cached = get_fw_versions_cached(fw_cache, can_recv, can_send, set_obd_multiplexing,
+                                                                             vin, ecu_rx_addrs, num_pandas=num_pandas)
   else:
     vin_rx_addr, vin_rx_bus, vin = -1, -1, VIN_UNKNOWN
     exact_fw_match, fw_candidates, car_fw = True, set(), []
@@ -146,14 +177,17 @@ def fingerprint(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_mu
 
   carlog.error({"event": "fingerprinted", "car_fingerprint": str(car_fingerprint), "source": source, "fuzzy": not exact_match,
                 "cached": cached, "fw_count": len(car_fw), "ecu_responses": list(ecu_rx_addrs), "vin_rx_addr": vin_rx_addr,
-                "vin_rx_bus": vin_rx_bus, "fingerprints": repr(finger), "fw_query_time": fw_query_time})
+                "vin_rx_bus": vin_rx_bus, "fingerprints": repr(finger), "fw_query_time": fw_query_time,
+                "present_ecu_time": ecu_sweep_stats.sweep_time,
+                "ecu_response_times": [[*ecu, t] for ecu, t in ecu_sweep_stats.response_times.items()]})
 
   return car_fingerprint, finger, vin, car_fw, source, exact_match
 
 
 def get_car(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_multiplexing: ObdCallback, alpha_long_allowed: bool,
-            num_pandas: int = 1, cached_params: CarParamsT | None = None):
-  candidate, fingerprints, vin, car_fw, source, exact_match = fingerprint(can_recv, can_send, set_obd_multiplexing, num_pandas, cached_params)
+            num_pandas: int = 1, cached_params: CarParamsT | None = None, fw_cache: FwCache | None = None):
+  candidate, fingerprints, vin, car_fw, source, exact_match = fingerprint(can_recv, can_send, set_obd_multiplexing, num_pandas, cached_params,
+                                                                          fw_cache)
 
   if candidate is None:
     carlog.error({"event": "car doesn't match any fingerprints", "fingerprints": repr(fingerprints)})
@@ -192,6 +226,7 @@ def get_car(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_multip
     if found_car is not None:
       candidate = found_car
 
+  assert candidate is not None
   print(f"SelectedCar = {candidate}")
   Params().put("CarName", candidate)
 
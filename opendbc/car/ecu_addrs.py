@@ -1,4 +1,6 @@
 import time
+from collections.abc import Collection
+from dataclasses import dataclass, field
 
 from opendbc.car import make_tester_present_msg, uds
 from opendbc.car.can_definitions import CanData, CanRecvCallable, CanSendCallable
@@ -6,6 +8,15 @@ from opendbc.car.carlog import carlog
 from opendbc.car.fw_query_definitions import EcuAddrBusType
 
 
+@dataclass
+class EcuSweepStats:
+  """Instrumentation for a present ECU sweep"""
+  sweep_time: float = 0.
+  num_rounds: int = 0
+  # time from sending the tester present query to the ECU's response
+  response_times: dict[EcuAddrBusType, float] = field(default_factory=dict)
+
+
 def _is_tester_present_response(msg: CanData, subaddr: int = None) -> bool:
   # ISO-TP messages are always padded to 8 bytes
   # tester present response is always a single frame
@@ -27,9 +38,15 @@ def get_all_ecu_addrs(can_recv: CanRecvCallable, can_send: CanSendCallable, bus:
   return get_ecu_addrs(can_recv, can_send, queries, responses, timeout=timeout)
 
 
-def get_ecu_addrs(can_recv: CanRecvCallable, can_send: CanSendCallable, queries: set[EcuAddrBusType],
-                  responses: set[EcuAddrBusType], timeout: float = 1) -> set[EcuAddrBusType]:
+def get_ecu_addrs(can_recv: CanRecvCallable, can_send: CanSendCallable, queries: Collection[EcuAddrBusType],
+                  responses: set[EcuAddrBusType], timeout: float = 1, response_times: dict[EcuAddrBusType, float] = None) -> set[EcuAddrBusType]:
   ecu_responses: set[EcuAddrBusType] = set()  # set((addr, subaddr, bus),)
+
+  # expected sub-addresses by response address and bus, so most frames are rejected with one lookup
+  expected_responses: dict[tuple[int, int], set[int | None]] = {}
+  for addr, subaddr, bus in responses:
+    expected_responses.setdefault((addr, bus), set()).add(subaddr)
+
   try:
     msgs = [make_tester_present_msg(addr, bus, subaddr) for addr, subaddr, bus in queries]
 
@@ -40,16 +57,23 @@ def get_ecu_addrs(can_recv: CanRecvCallable, can_send: CanSendCallable, queries:
       can_packets = can_recv(wait_for_one=True)
       for packet in can_packets:
         for msg in packet:
+          subaddrs = expected_responses.get((msg.address, msg.src))
+          if subaddrs is None:
+            continue
+
           if not len(msg.dat):
             carlog.warning("ECU addr scan: skipping empty remote frame")
             continue
 
-          subaddr = None if (msg.address, None, msg.src) in responses else msg.dat[0]
-          if (msg.address, subaddr, msg.src) in responses and _is_tester_present_response(msg, subaddr):
+          subaddr = None if None in subaddrs else msg.dat[0]
+          if subaddr in subaddrs and _is_tester_present_response(msg, subaddr):
             carlog.debug(f"CAN-RX: {hex(msg.address)} - 0x{bytes.hex(msg.dat)}")
-            if (msg.address, subaddr, msg.src) in ecu_responses:
+            ecu = (msg.address, subaddr, msg.src)
+            if ecu in ecu_responses:
               carlog.debug(f"Duplicate ECU address: {hex(msg.address)}")
-            ecu_responses.add((msg.address, subaddr, msg.src))
+            elif response_times is not None:
+              response_times[ecu] = time.monotonic() - start_time
+            ecu_responses.add(ecu)
   except Exception:
     carlog.exception("ECU addr scan exception")
   return ecu_responses
@@ -0,0 +1,167 @@
+import base64
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from functools import cache
+
+from opendbc.car.can_definitions import CanRecvCallable, CanSendCallable
+from opendbc.car.carlog import carlog
+from opendbc.car.fw_query_definitions import ESSENTIAL_ECUS, EcuAddrBusType
+from opendbc.car.fw_versions import ObdCallback, get_brand_fw_versions, get_fw_query_configs, get_fw_versions_ordered, match_fw_to_car
+from opendbc.car.isotp_parallel_query import IsoTpParallelQuery
+from opendbc.car.structs import CarParams
+from opendbc.car.vin import VIN_UNKNOWN, is_valid_vin
+
+# On-disk cache of FW query results, so repeat starts on a known vehicle skip the full FW sweep.
+# Entries are keyed by VIN and the set of ECUs that answered get_present_ecus, and hold the car_fw
+# (as packed capnp) and match result. A cached entry is only used after one of its ECUs is re-read.
+
+CACHE_VERSION = 1
+MAX_ENTRIES = 64
+
+
+@cache
+def get_fw_database_hash() -> str:
+  # match results depend on the FW database, they are recomputed if it changes
+  versions = get_brand_fw_versions()
+  return hashlib.sha1(repr(sorted((brand, repr(versions[brand])) for brand in versions)).encode()).hexdigest()[:16]
+
+
+def get_cache_key(vin: str, ecu_rx_addrs: set[EcuAddrBusType]) -> str:
+  ecus = sorted((addr, -1 if sub_addr is None else sub_addr, bus) for addr, sub_addr, bus in ecu_rx_addrs)
+  return f"{vin}:{hashlib.sha1(repr(ecus).encode()).hexdigest()[:16]}"
+
+
+@dataclass
+class FwCacheEntry:
+  car_fw: list[CarParams.CarFw]
+  exact_match: bool
+  candidates: set[str]
+  database_hash: str
+
+  def to_json(self) -> dict:
+    car_fw = CarParams.new_message(carFw=self.car_fw).to_bytes_packed()
+    return {"car_fw": base64.b64encode(car_fw).decode(), "exact_match": self.exact_match,
+            "candidates": sorted(self.candidates), "database_hash": self.database_hash}
+
+  @classmethod
+  def from_json(cls, entry: dict) -> 'FwCacheEntry':
+    car_fw = [fw.as_builder() for fw in CarParams.from_bytes_packed(base64.b64decode(entry["car_fw"])).carFw]
+    return cls(car_fw, entry["exact_match"], set(entry["candidates"]), entry["database_hash"])
+
+
+class FwCache:
+  """File-backed cache of FW versions and match results, keyed by VIN and present ECUs"""
+
+  def __init__(self, path: str, max_entries: int = MAX_ENTRIES):
+    self.path = path
+    self.max_entries = max_entries
+    self.entries: dict[str, dict] = {}
+    self.load()
+
+  def load(self) -> None:
+    try:
+      with open(self.path) as f:
+        data = json.load(f)
+      if data.get("version") == CACHE_VERSION:
+        self.entries = data["entries"]
+    except FileNotFoundError:
+      pass
+    except Exception:
+      carlog.exception("Failed to load FW cache")
+
+  def save(self) -> None:
+    # write to a temporary file and rename, so a crash can't leave a partial cache
+    directory = os.path.dirname(os.path.abspath(self.path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as f:
+      json.dump({"version": CACHE_VERSION, "entries": self.entries}, f, separators=(",", ":"))
+    os.replace(f.name, self.path)
+
+  def get(self, vin: str, ecu_rx_addrs: set[EcuAddrBusType]) -> FwCacheEntry | None:
+    key = get_cache_key(vin, ecu_rx_addrs)
+    if key not in self.entries:
+      return None
+
+    try:
+      return FwCacheEntry.from_json(self.entries[key])
+    except Exception:
+      carlog.exception("Failed to read FW cache entry")
+      return None
+
+  def put(self, vin: str, ecu_rx_addrs: set[EcuAddrBusType], entry: FwCacheEntry) -> None:
+    key = get_cache_key(vin, ecu_rx_addrs)
+    # most recently used entries last, the oldest are evicted first
+    self.entries.pop(key, None)
+    self.entries[key] = entry.to_json()
+    while len(self.entries) > self.max_entries:
+      del self.entries[next(iter(self.entries))]
+
+    try:
+      self.save()
+    except Exception:
+      carlog.exception("Failed to save FW cache")
+
+
+def get_validation_fw(car_fw: list[CarParams.CarFw]) -> 'CarParams.CarFw | None':
+  """Picks the FW version re-read to validate a cached entry, preferring ECUs used for fingerprinting"""
+  fw_versions = [fw for fw in car_fw if not fw.logging and fw.brand in get_fw_query_configs()]
+  return next((fw for fw in fw_versions if fw.ecu in ESSENTIAL_ECUS), next(iter(fw_versions), None))
+
+
+def validate_car_fw(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_multiplexing: ObdCallback,
+                    car_fw: list[CarParams.CarFw], timeout: float = 0.1) -> bool:
+  """Re-reads one ECU's FW version and checks that it matches car_fw"""
+  fw = get_validation_fw(car_fw)
+  if fw is None:
+    return False
+
+  for r in get_fw_query_configs()[fw.brand].requests:
+    if r.request != list(fw.request) or r.bus != fw.bus or r.obd_multiplexing != fw.obdMultiplexing:
+      continue
+
+    if r.bus % 4 == 1:
+      set_obd_multiplexing(r.obd_multiplexing)
+
+    sub_addr = fw.subAddress if fw.subAddress != 0 else None
+    try:
+      query = IsoTpParallelQuery(can_send, can_recv, r.bus, [(fw.address, sub_addr)], r.request, r.response, r.rx_offset)
+      return bool(query.get_data(timeout).get((fw.address, sub_addr)) == fw.fwVersion)
+    except Exception:
+      carlog.exception("FW cache validation exception")
+      return False
+
+  return False
+
+
+def get_fw_versions_cached(fw_cache: FwCache | None, can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_multiplexing: ObdCallback,
+                           vin: str, ecu_rx_addrs: set[EcuAddrBusType], num_pandas: int = 1,
+                           concurrent: bool = False) -> tuple[list[CarParams.CarFw], bool, set[str], bool]:
+  """Returns the FW versions, match result and whether they came from the cache. Only falls back to
+  get_fw_versions_ordered if there is no entry for the VIN and present ECUs, or it fails validation"""
+  # without a VIN, FW versions can't be tied to a vehicle
+  if vin == VIN_UNKNOWN or not is_valid_vin(vin):
+    fw_cache = None
+
+  if fw_cache is not None:
+    entry = fw_cache.get(vin, ecu_rx_addrs)
+    if entry is not None:
+      if validate_car_fw(can_recv, can_send, set_obd_multiplexing, entry.car_fw):
+        carlog.warning("Using cached FW versions")
+        if entry.database_hash != get_fw_database_hash():
+          entry.exact_match, entry.candidates = match_fw_to_car(entry.car_fw, vin)
+          entry.database_hash = get_fw_database_hash()
+        # saved on every hit, so the entry becomes the most recently used on disk too
+        fw_cache.put(vin, ecu_rx_addrs, entry)
+        return entry.car_fw, entry.exact_match, entry.candidates, True
+      carlog.warning("Cached FW versions failed validation")
+
+  car_fw = get_fw_versions_ordered(can_recv, can_send, set_obd_multiplexing, vin, ecu_rx_addrs, num_pandas=num_pandas, concurrent=concurrent)
+  exact_match, candidates = match_fw_to_car(car_fw, vin)
+
+  if fw_cache is not None and len(car_fw) > 0:
+    fw_cache.put(vin, ecu_rx_addrs, FwCacheEntry(car_fw, exact_match, candidates, get_fw_database_hash()))
+
+  return car_fw, exact_match, candidates, False
@@ -1,30 +1,62 @@
+import time
 from collections import defaultdict
 from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from functools import cache
 from typing import Protocol, TypeVar
 
 from tqdm import tqdm
 
-from opendbc.car import uds
+from opendbc.car import fingerprints, uds
 from opendbc.car.can_definitions import CanRecvCallable, CanSendCallable
 from opendbc.car.carlog import carlog
 from opendbc.car.structs import CarParams
-from opendbc.car.ecu_addrs import get_ecu_addrs
-from opendbc.car.fingerprints import FW_VERSIONS
-from opendbc.car.fw_query_definitions import ESSENTIAL_ECUS, AddrType, EcuAddrBusType, FwQueryConfig, LiveFwVersions, OfflineFwVersions
+from opendbc.car.ecu_addrs import EcuSweepStats, get_ecu_addrs
+from opendbc.car.fw_query_definitions import ESSENTIAL_ECUS, AddrType, EcuAddrBusType, EcuAddrSubAddr, FwQueryConfig, LiveFwVersions, OfflineFwVersions, Request
 from opendbc.car.interfaces import get_interface_attr
 from opendbc.car.isotp_parallel_query import IsoTpParallelQuery
 
 Ecu = CarParams.Ecu
 FUZZY_EXCLUDE_ECUS = [Ecu.fwdCamera, Ecu.fwdRadar, Ecu.eps, Ecu.debug]
 
-FW_QUERY_CONFIGS: dict[str, FwQueryConfig] = get_interface_attr('FW_QUERY_CONFIG', ignore_none=True)
-VERSIONS = get_interface_attr('FW_VERSIONS', ignore_none=True)
-
-MODEL_TO_BRAND = {c: b for b, e in VERSIONS.items() for c in e}
-REQUESTS = [(brand, config, r) for brand, config in FW_QUERY_CONFIGS.items() for r in config.requests]
-
 T = TypeVar('T')
 ObdCallback = Callable[[bool], None]
+BrandEcuTypes = dict[tuple[str, int, int | None], CarParams.Ecu]
+
+
+@cache
+def get_fw_query_configs() -> dict[str, FwQueryConfig]:
+  """Returns the FW query config of each brand, importing every brand's values on the first call"""
+  return get_interface_attr('FW_QUERY_CONFIG', ignore_none=True)
+
+
+@cache
+def get_requests() -> list[tuple[str, FwQueryConfig, Request]]:
+  return [(brand, config, r) for brand, config in get_fw_query_configs().items() for r in config.requests]
+
+
+@cache
+def get_brand_fw_versions() -> dict[str, OfflineFwVersions]:
+  """Returns the FW versions of each brand, importing every brand's fingerprints on the first call"""
+  return get_interface_attr('FW_VERSIONS', ignore_none=True)
+
+
+@cache
+def get_model_to_brand() -> dict[str, str]:
+  return {c: b for b, e in get_brand_fw_versions().items() for c in e}
+
+
+def __getattr__(name):
+  # these are only built once needed, so importing this module doesn't import every brand
+  if name == "FW_QUERY_CONFIGS":
+    return get_fw_query_configs()
+  if name == "REQUESTS":
+    return get_requests()
+  if name == "VERSIONS":
+    return get_brand_fw_versions()
+  if name == "MODEL_TO_BRAND":
+    return get_model_to_brand()
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def chunks(l: list[T], n: int = 128) -> Iterator[list[T]]:
@@ -37,6 +69,12 @@ def is_brand(brand: str, filter_brand: str | None) -> bool:
   return filter_brand is None or brand == filter_brand
 
 
+def sort_ecus(ecus: set[EcuAddrSubAddr]) -> list[EcuAddrSubAddr]:
+  # sets of ECUs without a sub-address iterate in a different order each run, since hash(None) varies.
+  # query them in a fixed order
+  return sorted(ecus, key=lambda ecu: (ecu[1], -1 if ecu[2] is None else ecu[2], ecu[0]))
+
+
 def build_fw_dict(fw_versions: list[CarParams.CarFw], filter_brand: str = None) -> dict[AddrType, set[bytes]]:
   fw_versions_dict: defaultdict[AddrType, set[bytes]] = defaultdict(set)
   for fw in fw_versions:
@@ -51,52 +89,104 @@ class MatchFwToCar(Protocol):
     ...
 
 
-def match_fw_to_car_fuzzy(live_fw_versions: LiveFwVersions, match_brand: str = None, log: bool = True, exclude: str = None) -> set[str]:
-  """Do a fuzzy FW match. This function will return a match, and the number of firmware version
-  that were matched uniquely to that specific car. If multiple ECUs uniquely match to different cars
-  the match is rejected."""
-
-  # Build lookup table from (addr, sub_addr, fw) to list of candidate cars
-  all_fw_versions = defaultdict(list)
-  for candidate, fw_by_addr in FW_VERSIONS.items():
-    if not is_brand(MODEL_TO_BRAND[candidate], match_brand):
-      continue
+@dataclass(frozen=True)
+class FwMatchIndex:
+  """Lookup tables over FW_VERSIONS for exact and fuzzy matching, so that matching
+  scales with the live responses rather than the database. Candidate sets are bitmasks,
+  bit i being the i-th car in FW_VERSIONS."""
+  cars: list[str]
+  car_bits: dict[str, int]
+  brand_masks: dict[str, int]
+  # exact matching: cars with each ECU, cars with each FW version on an ECU, and
+  # cars that fail to match if an ECU is missing
+  ecu_cars: dict[AddrType, int]
+  fw_cars: dict[tuple[AddrType, bytes], int]
+  required_ecu_cars: dict[AddrType, int]
+  # fuzzy matching: cars with each FW version, ignoring ECUs in FUZZY_EXCLUDE_ECUS
+  fuzzy_fw_cars: dict[tuple[int, int | None, bytes], int]
+
+  def mask_to_cars(self, mask: int) -> set[str]:
+    cars = set()
+    while mask:
+      bit = mask & -mask
+      cars.add(self.cars[bit.bit_length() - 1])
+      mask ^= bit
+    return cars
+
+
+@cache
+def get_fw_match_index() -> FwMatchIndex:
+  fw_versions = fingerprints.FW_VERSIONS
+  model_to_brand = get_model_to_brand()
+  cars = list(fw_versions.keys())
+  car_bits = {car: 1 << i for i, car in enumerate(cars)}
+  brand_masks: defaultdict[str, int] = defaultdict(int)
+  ecu_cars: defaultdict[AddrType, int] = defaultdict(int)
+  fw_cars: defaultdict[tuple[AddrType, bytes], int] = defaultdict(int)
+  required_ecu_cars: defaultdict[AddrType, int] = defaultdict(int)
+  fuzzy_fw_cars: defaultdict[tuple[int, int | None, bytes], int] = defaultdict(int)
+
+  for car, fw_by_ecu in fw_versions.items():
+    bit = car_bits[car]
+    config = get_fw_query_configs()[model_to_brand[car]]
+    brand_masks[model_to_brand[car]] |= bit
+
+    for (ecu_type, addr, sub_addr), fws in fw_by_ecu.items():
+      # Virtual debug ecu doesn't need to match the database
+      if ecu_type != Ecu.debug:
+        ecu_cars[(addr, sub_addr)] |= bit
+        for fw in fws:
+          fw_cars[((addr, sub_addr), fw)] |= bit
 
-    if candidate == exclude:
-      continue
+        # Some models can sometimes miss an ecu, or show on two different addresses, and non
+        # essential ecus can be missing
+        if ecu_type in ESSENTIAL_ECUS and car not in config.non_essential_ecus.get(ecu_type, []):
+          required_ecu_cars[(addr, sub_addr)] |= bit
 
-    for addr, fws in fw_by_addr.items():
       # These ECUs are known to be shared between models (EPS only between hybrid/ICE version)
       # Getting this exactly right isn't crucial, but excluding camera and radar makes it almost
       # impossible to get 3 matching versions, even if two models with shared parts are released at the same
       # time and only one is in our database.
-      if addr[0] in FUZZY_EXCLUDE_ECUS:
-        continue
-      for f in fws:
-        all_fw_versions[(addr[1], addr[2], f)].append(candidate)
+      if ecu_type not in FUZZY_EXCLUDE_ECUS:
+        for fw in fws:
+          fuzzy_fw_cars[(addr, sub_addr, fw)] |= bit
+
+  return FwMatchIndex(cars, car_bits, dict(brand_masks), dict(ecu_cars), dict(fw_cars), dict(required_ecu_cars), dict(fuzzy_fw_cars))
+
+
+def match_fw_to_car_fuzzy(live_fw_versions: LiveFwVersions, match_brand: str = None, log: bool = True, exclude: str = None) -> set[str]:
+  """Do a fuzzy FW match. This function will return a match, and the number of firmware version
+  that were matched uniquely to that specific car. If multiple ECUs uniquely match to different cars
+  the match is rejected."""
+
+  index = get_fw_match_index()
+  candidate_mask = index.brand_masks.get(match_brand, 0) if match_brand is not None else (1 << len(index.cars)) - 1
+  if exclude is not None:
+    candidate_mask &= ~index.car_bits.get(exclude, 0)
 
   matched_ecus = set()
-  match: str | None = None
+  match: int = 0
   for addr, versions in live_fw_versions.items():
     ecu_key = (addr[0], addr[1])
     for version in versions:
       # All cars that have this FW response on the specified address
-      candidates = all_fw_versions[(*ecu_key, version)]
+      candidates = index.fuzzy_fw_cars.get((*ecu_key, version), 0) & candidate_mask
 
-      if len(candidates) == 1:
+      if candidates and candidates & (candidates - 1) == 0:
         matched_ecus.add(ecu_key)
-        if match is None:
-          match = candidates[0]
+        if not match:
+          match = candidates
         # We uniquely matched two different cars. No fuzzy match possible
-        elif match != candidates[0]:
+        elif match != candidates:
           return set()
 
   # Note that it is possible to match to a candidate without all its ECUs being present
   # if there are enough matches. FIXME: parameterize this or require all ECUs to exist like exact matching
   if match and len(matched_ecus) >= 2:
+    matched_car = index.mask_to_cars(match).pop()
     if log:
-      carlog.error(f"Fingerprinted {match} using fuzzy match. {len(matched_ecus)} matching ECUs")
-    return {match}
+      carlog.error(f"Fingerprinted {matched_car} using fuzzy match. {len(matched_ecus)} matching ECUs")
+    return {matched_car}
   else:
     return set()
 
@@ -106,40 +196,28 @@ def match_fw_to_car_exact(live_fw_versions: LiveFwVersions, match_brand: str = N
   FW versions for a list of "essential" ECUs. If an ECU is not considered
   essential the FW version can be missing to get a fingerprint, but if it's present it
   needs to match the database."""
-  if extra_fw_versions is None:
-    extra_fw_versions = {}
-
-  invalid = set()
-  candidates = {c: f for c, f in FW_VERSIONS.items() if
-                is_brand(MODEL_TO_BRAND[c], match_brand)}
-
-  for candidate, fws in candidates.items():
-    config = FW_QUERY_CONFIGS[MODEL_TO_BRAND[candidate]]
-    for ecu, expected_versions in fws.items():
-      expected_versions = expected_versions + extra_fw_versions.get(candidate, {}).get(ecu, [])
-      ecu_type = ecu[0]
-      addr = ecu[1:]
-
-      found_versions = live_fw_versions.get(addr, set())
-      if not len(found_versions):
-        # Some models can sometimes miss an ecu, or show on two different addresses
-        # FIXME: this logic can be improved to be more specific, should require one of the two addresses
-        if candidate in config.non_essential_ecus.get(ecu_type, []):
-          continue
+  index = get_fw_match_index()
+  valid = index.brand_masks.get(match_brand, 0) if match_brand is not None else (1 << len(index.cars)) - 1
 
-        # Ignore non essential ecus
-        if ecu_type not in ESSENTIAL_ECUS:
-          continue
+  # cars matching a live FW version on each ECU
+  matched: defaultdict[AddrType, int] = defaultdict(int)
+  for addr, found_versions in live_fw_versions.items():
+    for found_version in found_versions:
+      matched[addr] |= index.fw_cars.get((addr, found_version), 0)
 
-      # Virtual debug ecu doesn't need to match the database
-      if ecu_type == Ecu.debug:
-        continue
+  if extra_fw_versions is not None:
+    for candidate, fws in extra_fw_versions.items():
+      for ecu, versions in fws.items():
+        if candidate in index.car_bits and any(v in live_fw_versions.get(ecu[1:], set()) for v in versions):
+          matched[ecu[1:]] |= index.car_bits[candidate]
 
-      if not any(found_version in expected_versions for found_version in found_versions):
-        invalid.add(candidate)
-        break
+  for addr, ecu_mask in index.ecu_cars.items():
+    if len(live_fw_versions.get(addr, set())):
+      valid &= ~(ecu_mask & ~matched[addr])
+    else:
+      valid &= ~index.required_ecu_cars.get(addr, 0)
 
-  return set(candidates.keys()) - invalid
+  return index.mask_to_cars(valid)
 
 
 def match_fw_to_car(fw_versions: list[CarParams.CarFw], vin: str, allow_exact: bool = True,
@@ -151,17 +229,23 @@ def match_fw_to_car(fw_versions: list[CarParams.CarFw], vin: str, allow_exact: b
   if allow_fuzzy:
     exact_matches.append((False, match_fw_to_car_fuzzy))
 
+  # Partition the FW by brand once, for all match functions
+  fw_versions_by_brand: defaultdict[str, list[CarParams.CarFw]] = defaultdict(list)
+  for fw in fw_versions:
+    fw_versions_by_brand[fw.brand].append(fw)
+  fw_versions_dicts = {brand: build_fw_dict(fws) for brand, fws in fw_versions_by_brand.items()}
+
   for exact_match, match_func in exact_matches:
     # For each brand, attempt to fingerprint using all FW returned from its queries
     matches: set[str] = set()
-    for brand in VERSIONS.keys():
-      fw_versions_dict = build_fw_dict(fw_versions, filter_brand=brand)
+    for brand, brand_versions in get_brand_fw_versions().items():
+      fw_versions_dict = fw_versions_dicts.get(brand, {})
       matches |= match_func(fw_versions_dict, match_brand=brand, log=log)
 
       # If specified and no matches so far, fall back to brand's fuzzy fingerprinting function
-      config = FW_QUERY_CONFIGS[brand]
+      config = get_fw_query_configs()[brand]
       if not exact_match and not len(matches) and config.match_fw_to_car_fuzzy is not None:
-        matches |= config.match_fw_to_car_fuzzy(fw_versions_dict, vin, VERSIONS[brand])
+        matches |= config.match_fw_to_car_fuzzy(fw_versions_dict, vin, brand_versions)
 
     if len(matches):
       return exact_match, matches
@@ -169,53 +253,69 @@ def match_fw_to_car(fw_versions: list[CarParams.CarFw], vin: str, allow_exact: b
   return True, set()
 
 
-def get_present_ecus(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_multiplexing: ObdCallback, num_pandas: int = 1) -> set[EcuAddrBusType]:
-  # queries are split by OBD multiplexing mode
-  queries: dict[bool, list[list[EcuAddrBusType]]] = {True: [], False: []}
-  parallel_queries: dict[bool, list[EcuAddrBusType]] = {True: [], False: []}
+def get_present_ecus(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_multiplexing: ObdCallback, num_pandas: int = 1,
+                     stats: EcuSweepStats = None) -> set[EcuAddrBusType]:
+  # queries on the OBD port's bus are split by OBD multiplexing mode, the rest are sent in the first mode (None)
+  queries: dict[bool | None, list[EcuAddrBusType]] = {True: [], False: [], None: []}
   responses: set[EcuAddrBusType] = set()
 
-  for brand, config, r in REQUESTS:
+  for brand, config, r in get_requests():
     # Skip query if no panda available
     if r.bus > num_pandas * 4 - 1:
       continue
 
-    for ecu_type, addr, sub_addr in config.get_all_ecus(VERSIONS[brand]):
+    obd_multiplexing = r.obd_multiplexing if r.bus % 4 == 1 else None
+    for ecu_type, addr, sub_addr in sort_ecus(config.get_all_ecus(get_brand_fw_versions()[brand])):
       # Only query ecus in whitelist if whitelist is not empty
       if len(r.whitelist_ecus) == 0 or ecu_type in r.whitelist_ecus:
         a = (addr, sub_addr, r.bus)
         # Build set of queries
-        if sub_addr is None:
-          if a not in parallel_queries[r.obd_multiplexing]:
-            parallel_queries[r.obd_multiplexing].append(a)
-        else:  # subaddresses must be queried one by one
-          if [a] not in queries[r.obd_multiplexing]:
-            queries[r.obd_multiplexing].append([a])
+        if a not in queries[obd_multiplexing]:
+          queries[obd_multiplexing].append(a)
 
         # Build set of expected responses to filter
         response_addr = uds.get_rx_addr_for_tx_addr(addr, r.rx_offset)
         responses.add((response_addr, sub_addr, r.bus))
 
-  for obd_multiplexing in queries:
-    queries[obd_multiplexing].insert(0, parallel_queries[obd_multiplexing])
+  # queries without a mode are sent along with the multiplexed ones
+  mode_queries: dict[bool, list[EcuAddrBusType]] = {True: queries[True] + queries[None], False: queries[False]}
+
+  if stats is None:
+    stats = EcuSweepStats()
+  start_time = time.monotonic()
 
   ecu_responses = set()
-  for obd_multiplexing in queries:
-    set_obd_multiplexing(obd_multiplexing)
-    for query in queries[obd_multiplexing]:
-      ecu_responses.update(get_ecu_addrs(can_recv, can_send, set(query), responses, timeout=0.1))
+  for obd_multiplexing in mode_queries:
+    # ECUs behind the same address are queried one subaddress at a time, ECUs on distinct (addr, bus) share rounds
+    rounds: list[list[EcuAddrBusType]] = []
+    round_addrs: list[set[tuple[int, int]]] = []
+    for addr, sub_addr, bus in mode_queries[obd_multiplexing]:
+      idx = next((i for i, used in enumerate(round_addrs) if (addr, bus) not in used), len(rounds))
+      if idx == len(rounds):
+        rounds.append([])
+        round_addrs.append(set())
+      rounds[idx].append((addr, sub_addr, bus))
+      round_addrs[idx].add((addr, bus))
+
+    if len(rounds):
+      set_obd_multiplexing(obd_multiplexing)
+    for query in rounds:
+      ecu_responses.update(get_ecu_addrs(can_recv, can_send, query, responses, timeout=0.1, response_times=stats.response_times))
+    stats.num_rounds += len(rounds)
+
+  stats.sweep_time = time.monotonic() - start_time
   return ecu_responses
 
 
 def get_brand_ecu_matches(ecu_rx_addrs: set[EcuAddrBusType]) -> dict[str, list[bool]]:
   """Returns dictionary of brands and matches with ECUs in their FW versions"""
 
-  brand_rx_addrs = {brand: set() for brand in FW_QUERY_CONFIGS}
-  brand_matches = {brand: [] for brand, _, _ in REQUESTS}
+  brand_rx_addrs = {brand: set() for brand in get_fw_query_configs()}
+  brand_matches = {brand: [] for brand, _, _ in get_requests()}
 
   # Since we can't know what request an ecu responded to, add matches for all possible rx offsets
-  for brand, config, r in REQUESTS:
-    for ecu in config.get_all_ecus(VERSIONS[brand]):
+  for brand, config, r in get_requests():
+    for ecu in config.get_all_ecus(get_brand_fw_versions()[brand]):
       if len(r.whitelist_ecus) == 0 or ecu[0] in r.whitelist_ecus:
         brand_rx_addrs[brand].add((uds.get_rx_addr_for_tx_addr(ecu[1], r.rx_offset), ecu[2]))
 
@@ -228,7 +328,8 @@ def get_brand_ecu_matches(ecu_rx_addrs: set[EcuAddrBusType]) -> dict[str, list[b
 
 
 def get_fw_versions_ordered(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_multiplexing: ObdCallback, vin: str,
-                            ecu_rx_addrs: set[EcuAddrBusType], timeout: float = 0.1, num_pandas: int = 1, progress: bool = False) -> list[CarParams.CarFw]:
+                            ecu_rx_addrs: set[EcuAddrBusType], timeout: float = 0.1, num_pandas: int = 1, progress: bool = False,
+                            concurrent: bool = False) -> list[CarParams.CarFw]:
   """Queries for FW versions ordering brands by likelihood, breaks when exact match is found"""
 
   all_car_fw = []
@@ -242,7 +343,8 @@ def get_fw_versions_ordered(can_recv: CanRecvCallable, can_send: CanSendCallable
     if True not in brand_matches[brand]:
       continue
 
-    car_fw = get_fw_versions(can_recv, can_send, set_obd_multiplexing, query_brand=brand, timeout=timeout, num_pandas=num_pandas, progress=progress)
+    car_fw = get_fw_versions(can_recv, can_send, set_obd_multiplexing, query_brand=brand, timeout=timeout, num_pandas=num_pandas, progress=progress,
+                             concurrent=concurrent)
     all_car_fw.extend(car_fw)
 
     # If there is a match using this brand's FW alone, finish querying early
@@ -253,9 +355,56 @@ def get_fw_versions_ordered(can_recv: CanRecvCallable, can_send: CanSendCallable
   return all_car_fw
 
 
+@dataclass(frozen=True)
+class FwQuery:
+  brand: str
+  config: FwQueryConfig
+  request: Request
+  addrs: list[AddrType]
+
+  def bus_addrs(self) -> set[tuple[int, int]]:
+    """Returns the (bus, address) pairs this query sends or receives on"""
+    keys = set()
+    for tx_addr, _ in self.addrs:
+      keys.add((self.request.bus, tx_addr))
+      keys.add((self.request.bus, uds.get_rx_addr_for_tx_addr(tx_addr, self.request.rx_offset)))
+    return keys
+
+
+def get_query_addrs(addr_chunk: list[tuple[str, int, int | None]], ecu_types: BrandEcuTypes,
+                    brand: str, r: Request) -> list[AddrType]:
+  return [(a, s) for (b, a, s) in addr_chunk if b in (brand, 'any') and
+          (len(r.whitelist_ecus) == 0 or ecu_types[(b, a, s)] in r.whitelist_ecus)]
+
+
+def build_car_fw(query: FwQuery, results: dict[AddrType, bytes],
+                 ecu_types: BrandEcuTypes) -> list[CarParams.CarFw]:
+  car_fw = []
+  r = query.request
+  for (tx_addr, sub_addr), version in results.items():
+    f = CarParams.CarFw()
+
+    f.ecu = ecu_types.get((query.brand, tx_addr, sub_addr), Ecu.unknown)
+    f.fwVersion = version
+    f.address = tx_addr
+    f.responseAddress = uds.get_rx_addr_for_tx_addr(tx_addr, r.rx_offset)
+    f.request = r.request
+    f.brand = query.brand
+    f.bus = r.bus
+    f.logging = r.logging or (f.ecu, tx_addr, sub_addr) in query.config.extra_ecus
+    f.obdMultiplexing = r.obd_multiplexing
+
+    if sub_addr is not None:
+      f.subAddress = sub_addr
+
+    car_fw.append(f)
+  return car_fw
+
+
 def get_fw_versions(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_multiplexing: ObdCallback, query_brand: str = None,
-                    extra: OfflineFwVersions = None, timeout: float = 0.1, num_pandas: int = 1, progress: bool = False) -> list[CarParams.CarFw]:
-  versions = VERSIONS.copy()
+                    extra: dict[str, OfflineFwVersions] = None, timeout: float = 0.1, num_pandas: int = 1, progress: bool = False,
+                    concurrent: bool = False) -> list[CarParams.CarFw]:
+  versions = get_brand_fw_versions().copy()
 
   if query_brand is not None:
     versions = {query_brand: versions[query_brand]}
@@ -270,8 +419,8 @@ def get_fw_versions(can_recv: CanRecvCallable, can_send: CanSendCallable, set_ob
   ecu_types = {}
 
   for brand, brand_versions in versions.items():
-    config = FW_QUERY_CONFIGS[brand]
-    for ecu_type, addr, sub_addr in config.get_all_ecus(brand_versions):
+    config = get_fw_query_configs()[brand]
+    for ecu_type, addr, sub_addr in sort_ecus(config.get_all_ecus(brand_versions)):
       a = (brand, addr, sub_addr)
       if a not in ecu_types:
         ecu_types[a] = ecu_type
@@ -285,9 +434,15 @@ def get_fw_versions(can_recv: CanRecvCallable, can_send: CanSendCallable, set_ob
 
   addrs.insert(0, parallel_addrs)
 
+  requests = [(brand, config, r) for brand, config, r in get_requests() if is_brand(brand, query_brand)]
+  if concurrent:
+    queries = [FwQuery(brand, config, r, query_addrs) for addr_group in addrs for addr_chunk in chunks(addr_group)
+               for brand, config, r in requests if r.bus <= num_pandas * 4 - 1
+               if (query_addrs := get_query_addrs(addr_chunk, ecu_types, brand, r))]
+    return run_fw_queries_concurrent(can_recv, can_send, set_obd_multiplexing, queries, ecu_types, timeout)
+
   # Get versions and build capnp list to put into CarParams
   car_fw = []
-  requests = [(brand, config, r) for brand, config, r in REQUESTS if is_brand(brand, query_brand)]
   for addr_group in tqdm(addrs, disable=not progress):  # split by subaddr, if any
     for addr_chunk in chunks(addr_group):
       for brand, config, r in requests:
@@ -300,29 +455,69 @@ def get_fw_versions(can_recv: CanRecvCallable, can_send: CanSendCallable, set_ob
           set_obd_multiplexing(r.obd_multiplexing)
 
         try:
-          query_addrs = [(a, s) for (b, a, s) in addr_chunk if b in (brand, 'any') and
-                         (len(r.whitelist_ecus) == 0 or ecu_types[(b, a, s)] in r.whitelist_ecus)]
+          query_addrs = get_query_addrs(addr_chunk, ecu_types, brand, r)
 
           if query_addrs:
             query = IsoTpParallelQuery(can_send, can_recv, r.bus, query_addrs, r.request, r.response, r.rx_offset)
-            for (tx_addr, sub_addr), version in query.get_data(timeout).items():
-              f = CarParams.CarFw()
-
-              f.ecu = ecu_types.get((brand, tx_addr, sub_addr), Ecu.unknown)
-              f.fwVersion = version
-              f.address = tx_addr
-              f.responseAddress = uds.get_rx_addr_for_tx_addr(tx_addr, r.rx_offset)
-              f.request = r.request
-              f.brand = brand
-              f.bus = r.bus
-              f.logging = r.logging or (f.ecu, tx_addr, sub_addr) in config.extra_ecus
-              f.obdMultiplexing = r.obd_multiplexing
-
-              if sub_addr is not None:
-                f.subAddress = sub_addr
-
-              car_fw.append(f)
+            car_fw.extend(build_car_fw(FwQuery(brand, config, r, query_addrs), query.get_data(timeout), ecu_types))
         except Exception:
           carlog.exception("FW query exception")
 
   return car_fw
+
+
+def run_fw_queries_concurrent(can_recv: CanRecvCallable, can_send: CanSendCallable, set_obd_multiplexing: ObdCallback,
+                              queries: list[FwQuery], ecu_types: BrandEcuTypes,
+                              timeout: float = 0.1) -> list[CarParams.CarFw]:
+  """Runs FW queries concurrently, sharing one receive loop. A query starts as soon as no running or earlier
+  waiting query uses any of its addresses on its bus, so queries to the same ECU keep their order. Queries on
+  OBD multiplexed buses also wait for the others in the opposite mode to finish, toggling the mode only once
+  none of them are running. Each query pipelines its request steps per ECU, so the time is set by the longest
+  chain of queries sharing an ECU rather than the sum of all queries."""
+  car_fw = []
+  pending = list(queries)
+  running: list[tuple[FwQuery, set[tuple[int, int]], IsoTpParallelQuery]] = []
+  obd_multiplexing = None
+
+  can_recv()
+  while pending or running:
+    # Start waiting queries in order
+    blocked: set[tuple[int, int]] = set().union(*(keys for _, keys, _ in running))
+    for fw_query in list(pending):
+      r = fw_query.request
+      keys = fw_query.bus_addrs()
+      obd_conflict = (r.bus % 4 == 1 and r.obd_multiplexing != obd_multiplexing and
+                      any(q.request.bus % 4 == 1 for q, _, _ in running))
+      if keys & blocked or obd_conflict:
+        blocked |= keys
+        continue
+
+      if r.bus % 4 == 1 and r.obd_multiplexing != obd_multiplexing:
+        set_obd_multiplexing(r.obd_multiplexing)
+        obd_multiplexing = r.obd_multiplexing
+
+      pending.remove(fw_query)
+      blocked |= keys
+      try:
+        query = IsoTpParallelQuery(can_send, can_recv, r.bus, fw_query.addrs, r.request, r.response, r.rx_offset)
+        query.start(timeout)
+        running.append((fw_query, keys, query))
+      except Exception:
+        carlog.exception("FW query exception")
+
+    if not running:
+      continue
+
+    can_packets = can_recv(wait_for_one=True)
+    for item in list(running):
+      fw_query, _, query = item
+      try:
+        query.rx_packets(can_packets)
+        if not query.update():
+          continue
+        car_fw.extend(build_car_fw(fw_query, query.results, ecu_types))
+      except Exception:
+        carlog.exception("FW query exception")
+      running.remove(item)
+
+  return car_fw
@@ -18,7 +18,7 @@ from opendbc.car.can_definitions import CanData, CanRecvCallable, CanSendCallabl
 from opendbc.car.common.basedir import BASEDIR
 from opendbc.car.common.conversions import Conversions as CV
 from opendbc.car.common.simple_kalman import KF1D, get_kalman_gain
-from opendbc.car.values import PLATFORMS
+from opendbc.car.manifest import MANIFEST_ATTRS, get_brand_module_attrs, get_brands, get_platform
 from opendbc.can.parser import CANParser
 
 from openpilot.common.params import Params
@@ -246,7 +246,7 @@ class CarInterfaceBase(ABC):
                  alpha_long: bool, docs: bool) -> structs.CarParams:
     ret = CarInterfaceBase.get_std_params(candidate)
 
-    platform = PLATFORMS[candidate]
+    platform = get_platform(candidate)
     ret.mass = platform.config.specs.mass
     ret.wheelbase = platform.config.specs.wheelbase
     ret.steerRatio = platform.config.specs.steerRatio
@@ -515,27 +515,33 @@ INTERFACE_ATTR_FILE = {
 # interface-specific helpers
 
 def get_interface_attr(attr: str, combine_brands: bool = False, ignore_none: bool = False) -> dict[str | StrEnum, Any]:
-  # read all the folders in opendbc/car and return a dict where:
+  # read all the brands in the manifest and return a dict where:
   # - keys are all the car models or brand names
   # - values are attr values from all car folders
+  # only brands whose module defines attr are imported, attrs not in MANIFEST_ATTRS need every brand imported
   result = {}
-  for car_folder in sorted([x[0] for x in os.walk(BASEDIR)]):
-    try:
-      brand_name = car_folder.split('/')[-1]
-      brand_values = __import__(f'opendbc.car.{brand_name}.{INTERFACE_ATTR_FILE.get(attr, "values")}', fromlist=[attr])
-      if hasattr(brand_values, attr) or not ignore_none:
-        attr_data = getattr(brand_values, attr, None)
-      else:
+  module = INTERFACE_ATTR_FILE.get(attr, "values")
+  for brand_name in get_brands():
+    module_attrs = get_brand_module_attrs(brand_name, module)
+    if module_attrs is None:
+      continue
+
+    if attr in module_attrs or attr not in MANIFEST_ATTRS[module]:
+      brand_values = __import__(f'opendbc.car.{brand_name}.{module}', fromlist=[attr])
+      if not hasattr(brand_values, attr) and ignore_none:
         continue
+      attr_data = getattr(brand_values, attr, None)
+    elif ignore_none:
+      continue
+    else:
+      attr_data = None
 
-      if combine_brands:
-        if isinstance(attr_data, dict):
-          for f, v in attr_data.items():
-            result[f] = v
-      else:
-        result[brand_name] = attr_data
-    except (ImportError, OSError):
-      pass
+    if combine_brands:
+      if isinstance(attr_data, dict):
+        for f, v in attr_data.items():
+          result[f] = v
+    else:
+      result[brand_name] = attr_data
 
   return result
 
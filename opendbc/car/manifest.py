@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import importlib
+import json
+import os
+from functools import cache
+from typing import Any, cast
+
+from opendbc.car.common.basedir import BASEDIR
+
+# The brand manifest lists each brand's platforms, which of the attributes looked up with
+# get_interface_attr its values and fingerprints modules define, and all CAN fingerprints. It lets get_interface_attr, CAN fingerprinting and
+# lookups of a single platform run without importing every brand. Regenerate it with
+# `python -m opendbc.car.manifest` after adding a brand or changing its modules.
+
+MANIFEST_PATH = os.path.join(BASEDIR, "manifest.json")
+# the attributes get_interface_attr is called with, by the brand module defining them
+MANIFEST_ATTRS = {
+  "values": ("CAR", "DBC", "FW_QUERY_CONFIG", "Footnote"),
+  "fingerprints": ("FINGERPRINTS", "FW_VERSIONS"),
+}
+
+
+def _import_brand_module(brand: str, module: str):
+  try:
+    return importlib.import_module(f"opendbc.car.{brand}.{module}")
+  except (ImportError, OSError):
+    return None
+
+
+def generate_manifest() -> dict[str, Any]:
+  brands = {}
+  fingerprints = {}
+  for brand in sorted(os.listdir(BASEDIR)):
+    if not os.path.isdir(os.path.join(BASEDIR, brand)):
+      continue
+
+    # a brand is any folder with a values module
+    modules = {name: module for name in MANIFEST_ATTRS if (module := _import_brand_module(brand, name)) is not None}
+    if "values" not in modules:
+      continue
+
+    values = modules["values"]
+    brands[brand] = {
+      "platforms": [str(platform) for platform in getattr(values, "CAR", [])],
+      "modules": {name: [attr for attr in MANIFEST_ATTRS[name] if hasattr(module, attr)] for name, module in modules.items()},
+    }
+
+    for platform, car_fingerprints in (getattr(modules.get("fingerprints"), "FINGERPRINTS", None) or {}).items():
+      fingerprints[str(platform)] = [{str(addr): length for addr, length in fingerprint.items()} for fingerprint in car_fingerprints]
+
+  return {"brands": brands, "fingerprints": fingerprints}
+
+
+@cache
+def get_manifest() -> dict[str, Any]:
+  with open(MANIFEST_PATH) as f:
+    return cast(dict[str, Any], json.load(f))
+
+
+def get_brands() -> dict[str, list[str]]:
+  """Returns a dict of brand name and its platforms"""
+  return {brand: info["platforms"] for brand, info in get_manifest()["brands"].items()}
+
+
+def get_brand_module_attrs(brand: str, module: str) -> list[str] | None:
+  """Returns the MANIFEST_ATTRS a brand's module defines, None if the brand doesn't have the module"""
+  return cast(list[str] | None, get_manifest()["brands"][brand]["modules"].get(module))
+
+
+@cache
+def get_platform_brands() -> dict[str, str]:
+  return {platform: brand for brand, platforms in get_brands().items() for platform in platforms}
+
+
+def get_platform(platform: str):
+  """Returns the platform's enum member, importing only its brand's values module"""
+  brand = get_platform_brands()[platform]
+  return importlib.import_module(f"opendbc.car.{brand}.values").CAR(platform)
+
+
+@cache
+def get_fingerprints() -> dict[str, list[dict[int, int]]]:
+  """Returns the CAN fingerprints of all platforms"""
+  return {platform: [{int(addr): length for addr, length in fingerprint.items()} for fingerprint in car_fingerprints]
+          for platform, car_fingerprints in get_manifest()["fingerprints"].items()}
+
+
+if __name__ == "__main__":
+  with open(MANIFEST_PATH, "w") as f:
+    json.dump(generate_manifest(), f, indent=1)
+    f.write("\n")
+  print(f"Generated and written to {MANIFEST_PATH}")
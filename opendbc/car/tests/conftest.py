@@ -0,0 +1,13 @@
+import pytest
+
+from opendbc.car.tests.virtual_ecus import VirtualCanBus
+
+
+@pytest.fixture
+def make_bus(mocker):
+  """Creates a VirtualCanBus, time.monotonic follows its simulated time"""
+  def _make_bus(ecus, **kwargs) -> VirtualCanBus:
+    bus = VirtualCanBus(ecus, **kwargs)
+    mocker.patch("time.monotonic", bus.monotonic)
+    return bus
+  return _make_bus
@@ -1,7 +1,10 @@
 import pytest
+import random
+import time
 from opendbc.car.can_definitions import CanData
 from opendbc.car.car_helpers import FRAME_FINGERPRINT, can_fingerprint
-from opendbc.car.fingerprints import _FINGERPRINTS as FINGERPRINTS
+from opendbc.car.fingerprints import _FINGERPRINTS as FINGERPRINTS, all_legacy_fingerprint_cars, eliminate_incompatible_cars, \
+                                     is_valid_for_fingerprint
 
 
 class TestCanFingerprint:
@@ -53,3 +56,50 @@ class TestCanFingerprint:
         car_fingerprint, _ = can_fingerprint(can_recv)
         assert car_fingerprint == car_model
         assert frames == expected_frames + 2  # TODO: fix extra frames
+
+  def test_eliminate_incompatible_cars(self):
+    # reference: a car is compatible if any of its fingerprints could have sent msg
+    random.seed(0)
+    addresses = list({address for fingerprints in FINGERPRINTS.values() for fp in fingerprints for address in fp})
+    candidate_cars = all_legacy_fingerprint_cars()
+    for _ in range(1000):
+      msg = CanData(address=random.choice(addresses + [1880, 0x800, 0x7df, 1]), dat=b'\x00' * random.randint(0, 8), src=0)
+      expected = [car for car in candidate_cars if any(is_valid_for_fingerprint(msg, fp | {1880: 8}) for fp in FINGERPRINTS[car])]
+      assert eliminate_incompatible_cars(msg, candidate_cars) == expected
+      if expected and random.random() < 0.1:
+        candidate_cars = expected
+
+  def test_fingerprint_benchmark(self):
+    """Replays a 2s fingerprinting window for every platform"""
+    total_time, n = 0., 0
+    for fingerprints in FINGERPRINTS.values():
+      for fingerprint in fingerprints:
+        can = [CanData(address=address, dat=b'\x00' * length, src=src)
+               for address, length in fingerprint.items() for src in (0, 1)]
+
+        t = time.perf_counter()
+        can_fingerprint(lambda **kwargs: [can])  # noqa: B023
+        total_time += time.perf_counter() - t
+        n += 1
+    print(f'can_fingerprint, {total_time / n * 1e3:.2f} ms per fingerprint')
+
+    # absolute times depend on the machine and its load, so only check the
+    # speedup over checking every fingerprint of every car, timed alongside
+    def eliminate_reference(msg, candidate_cars):
+      return [car for car in candidate_cars if any(is_valid_for_fingerprint(msg, fp | {1880: 8}) for fp in FINGERPRINTS[car])]
+
+    msgs = [CanData(address=address, dat=b'\x00' * length, src=0)
+            for fingerprints in FINGERPRINTS.values() for fp in fingerprints for address, length in fp.items()][::4]
+    candidate_cars = all_legacy_fingerprint_cars()
+    times = {}
+    for eliminate in (eliminate_incompatible_cars, eliminate_reference):
+      best = float('inf')
+      for _ in range(3):
+        t = time.perf_counter()
+        for msg in msgs:
+          eliminate(msg, candidate_cars)
+        best = min(best, time.perf_counter() - t)
+      times[eliminate] = best
+    speedup = times[eliminate_reference] / times[eliminate_incompatible_cars]
+    print(f'eliminate_incompatible_cars, {speedup:.1f}x faster than checking every fingerprint')
+    assert speedup > 2
@@ -0,0 +1,108 @@
+import json
+import pytest
+
+from opendbc.car.fw_cache import FwCache, get_fw_versions_cached
+from opendbc.car.fw_versions import get_present_ecus
+from opendbc.car.tests.test_virtual_ecus import BRAND_CARS
+from opendbc.car.tests.virtual_ecus import DEFAULT_VIN, VirtualCanBus, get_virtual_ecus
+from opendbc.car.vin import VIN_UNKNOWN
+
+
+class TestFwCache:
+  @pytest.fixture(autouse=True)
+  def setup_method(self, tmp_path):
+    self.path = str(tmp_path / "fw_cache.json")
+
+  def fingerprint(self, bus: VirtualCanBus, fw_cache: FwCache | None, vin: str = DEFAULT_VIN):
+    ecu_rx_addrs = get_present_ecus(bus.can_recv, bus.can_send, bus.set_obd_multiplexing, num_pandas=2)
+    start_time, num_sent = bus.time, len(bus.sent)
+    ret = get_fw_versions_cached(fw_cache, bus.can_recv, bus.can_send, bus.set_obd_multiplexing, vin, ecu_rx_addrs, num_pandas=2)
+    return ret, bus.time - start_time, len(bus.sent) - num_sent
+
+  @pytest.mark.parametrize("brand, car_model", BRAND_CARS.items())
+  def test_cache_hit(self, make_bus, subtests, brand, car_model):
+    ecus = get_virtual_ecus(car_model)
+    (car_fw, exact_match, candidates, cached), sweep_time, sweep_sent = self.fingerprint(make_bus(ecus), FwCache(self.path))
+    assert not cached
+    assert len(car_fw)
+
+    # a new cache instance reads the entry back from disk
+    (cached_fw, cached_exact_match, cached_candidates, cached), cached_time, cached_sent = self.fingerprint(make_bus(ecus), FwCache(self.path))
+    assert cached
+    assert [fw.to_dict() for fw in cached_fw] == [fw.to_dict() for fw in car_fw]
+    assert (cached_exact_match, cached_candidates) == (exact_match, candidates)
+    assert cached_time < sweep_time
+    assert cached_sent < sweep_sent
+    print(f'{brand=}, {car_model=}, FW query time={sweep_time:.2f}, cached={cached_time:.2f} seconds')
+
+  def test_validation(self, make_bus):
+    car_model = BRAND_CARS['toyota']
+    self.fingerprint(make_bus(get_virtual_ecus(car_model)), FwCache(self.path))
+
+    # an ECU was replaced: the re-read FW version doesn't match, so the cache is refreshed
+    ecus = get_virtual_ecus(car_model)
+    for ecu in ecus:
+      ecu.responses = {request: response + b'\x00' if len(response) > 2 else response for request, response in ecu.responses.items()}
+    (car_fw, _, _, cached), _, _ = self.fingerprint(make_bus(ecus), FwCache(self.path))
+    assert not cached
+
+    (cached_fw, _, _, cached), _, _ = self.fingerprint(make_bus(ecus), FwCache(self.path))
+    assert cached
+    assert [fw.fwVersion for fw in cached_fw] == [fw.fwVersion for fw in car_fw]
+
+  def test_cache_key(self, make_bus):
+    car_model = BRAND_CARS['hyundai']
+    fw_cache = FwCache(self.path)
+    self.fingerprint(make_bus(get_virtual_ecus(car_model)), fw_cache)
+    assert len(fw_cache.entries) == 1
+
+    # another VIN or set of present ECUs is a different vehicle
+    (_, _, _, cached), _, _ = self.fingerprint(make_bus(get_virtual_ecus(car_model)), fw_cache, vin="2" * 17)
+    assert not cached
+    (_, _, _, cached), _, _ = self.fingerprint(make_bus([ecu for ecu in get_virtual_ecus(car_model) if ecu.addr != 0x7c4]), fw_cache)
+    assert not cached
+    assert len(fw_cache.entries) == 3
+
+    # VIN unknown is never cached
+    (_, _, _, cached), _, _ = self.fingerprint(make_bus(get_virtual_ecus(car_model)), fw_cache, vin=VIN_UNKNOWN)
+    assert not cached
+    assert len(fw_cache.entries) == 3
+
+  def test_database_change(self, make_bus):
+    car_model = BRAND_CARS['honda']
+    self.fingerprint(make_bus(get_virtual_ecus(car_model)), FwCache(self.path))
+
+    with open(self.path) as f:
+      data = json.load(f)
+    for entry in data["entries"].values():
+      entry["candidates"], entry["database_hash"] = [], "outdated"
+    with open(self.path, "w") as f:
+      json.dump(data, f)
+
+    # the match result is recomputed, without another FW sweep
+    (_, _, candidates, cached), _, _ = self.fingerprint(make_bus(get_virtual_ecus(car_model)), FwCache(self.path))
+    assert cached
+    assert candidates == {car_model}
+
+  def test_max_entries(self, make_bus):
+    car_model = BRAND_CARS['mazda']
+    fw_cache = FwCache(self.path, max_entries=2)
+    for vin in ("1" * 17, "2" * 17, "3" * 17):
+      self.fingerprint(make_bus(get_virtual_ecus(car_model, vin=vin)), fw_cache, vin=vin)
+    assert len(fw_cache.entries) == 2
+    assert not any(key.startswith("1" * 17) for key in FwCache(self.path).entries)
+
+  def test_lru(self, make_bus):
+    # a cache hit keeps the entry from being evicted before less recently used ones
+    # each start reloads the cache from disk, so the order must be saved
+    car_model = BRAND_CARS['mazda']
+    for vin in ("1" * 17, "2" * 17, "1" * 17, "3" * 17):
+      self.fingerprint(make_bus(get_virtual_ecus(car_model, vin=vin)), FwCache(self.path, max_entries=2), vin=vin)
+    assert [key[:17] for key in FwCache(self.path).entries] == ["1" * 17, "3" * 17]
+
+  def test_corrupt_file(self, make_bus):
+    with open(self.path, "w") as f:
+      f.write("{")
+    (_, _, _, cached), _, _ = self.fingerprint(make_bus(get_virtual_ecus(BRAND_CARS['subaru'])), FwCache(self.path))
+    assert not cached
+    assert len(FwCache(self.path).entries) == 1
@@ -7,8 +7,8 @@ from opendbc.car.can_definitions import CanData
 from opendbc.car.car_helpers import interfaces
 from opendbc.car.structs import CarParams
 from opendbc.car.fingerprints import FW_VERSIONS
-from opendbc.car.fw_versions import FW_QUERY_CONFIGS, FUZZY_EXCLUDE_ECUS, VERSIONS, build_fw_dict, \
-                                    match_fw_to_car, get_brand_ecu_matches, get_fw_versions, get_present_ecus
+from opendbc.car.fw_versions import FW_QUERY_CONFIGS, FUZZY_EXCLUDE_ECUS, VERSIONS, build_fw_dict, match_fw_to_car, \
+                                    match_fw_to_car_exact, match_fw_to_car_fuzzy, get_brand_ecu_matches, get_fw_versions, get_present_ecus
 from opendbc.car.vin import get_vin
 
 CarFw = CarParams.CarFw
@@ -95,6 +95,23 @@ class TestFwFingerprint:
       elif len(matches):
         self.assertFingerprints(matches, car_model)
 
+  @pytest.mark.parametrize("brand", VERSIONS.keys())
+  def test_match_extra_fw_versions_exclude(self, brand):
+    for car_model, ecus in VERSIONS[brand].items():
+      matched_ecus = [ecu for ecu, fw_versions in ecus.items() if ecu[0] != Ecu.debug and len(fw_versions)]
+      live_fw_versions = {ecu[1:]: {ecus[ecu][0]} for ecu in matched_ecus}
+      if car_model not in match_fw_to_car_exact(live_fw_versions, match_brand=brand):
+        continue
+
+      # an unknown FW version fails to match, unless it's in extra_fw_versions
+      ecu = matched_ecus[0]
+      live_fw_versions[ecu[1:]] = {b'unknown'}
+      assert car_model not in match_fw_to_car_exact(live_fw_versions, match_brand=brand)
+      assert car_model in match_fw_to_car_exact(live_fw_versions, match_brand=brand, extra_fw_versions={car_model: {ecu: [b'unknown']}})
+
+      # an excluded car is never a fuzzy match
+      assert car_model not in match_fw_to_car_fuzzy(live_fw_versions, match_brand=brand, log=False, exclude=car_model)
+
   def test_fw_version_lists(self, subtests):
     for car_model, ecus in FW_VERSIONS.items():
       with subtests.test(car_model=car_model.value):
@@ -236,9 +253,9 @@ class TestFwFingerprintTiming:
   def test_startup_timing(self, subtests, mocker):
     # Tests worse-case VIN query time and typical present ECU query time
     vin_ref_times = {'worst': 1.6, 'best': 0.8}  # best assumes we go through all queries to get a match
-    present_ecu_ref_time = 0.45
+    present_ecu_ref_time = 0.35
 
-    def fake_get_ecu_addrs(*_, timeout):
+    def fake_get_ecu_addrs(*_, timeout, **kwargs):
       self.total_time += timeout
       return set()
 
@@ -327,3 +344,39 @@ class TestFwFingerprintTiming:
     for brand in FW_QUERY_CONFIGS.keys():
       with subtests.test(brand=brand):
         get_fw_versions(self.fake_can_recv, self.fake_can_send, lambda obd: None, brand)
+        get_fw_versions(self.fake_can_recv, self.fake_can_send, lambda obd: None, brand, concurrent=True)
+
+  def test_fw_query_concurrent_timing(self, subtests, mocker):
+    # Runs the real query loops against a simulated clock with no ECUs responding:
+    # each wait for a message takes 10ms, and OBD multiplexing changes take 50ms
+    def fake_monotonic():
+      return self.total_time
+
+    def fake_can_recv(wait_for_one: bool = False) -> list[list[CanData]]:
+      if wait_for_one:
+        self.total_time += 0.01
+      return []
+
+    def fake_can_send(msgs):
+      sent.update((msg.address, msg.dat, msg.src) for msg in msgs)
+
+    mocker.patch("time.monotonic", fake_monotonic)
+    total_times = {False: 0.0, True: 0.0}
+    for brand in FW_QUERY_CONFIGS:
+      with subtests.test(brand=brand):
+        times, sent_msgs = {}, {}
+        for concurrent in (False, True):
+          sent = set()
+          self.total_time = 0.0
+          self.current_obd_multiplexing = True
+          get_fw_versions(fake_can_recv, fake_can_send, self.fake_set_obd_multiplexing, brand, num_pandas=2, concurrent=concurrent)
+          times[concurrent], sent_msgs[concurrent] = self.total_time, sent
+          total_times[concurrent] += self.total_time
+
+        # Same queries are sent, never slower
+        assert sent_msgs[True] == sent_msgs[False]
+        assert times[True] <= times[False] + 1e-6
+        print(f'{brand=}, serial FW query time={times[False]:.2f}, concurrent={times[True]:.2f} seconds')
+
+    print(f'all brands, serial FW query time={total_times[False]:.2f}, concurrent={total_times[True]:.2f} seconds')
+    assert total_times[True] < total_times[False] * 0.75
@@ -0,0 +1,75 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+from opendbc.car.common.basedir import BASEDIR
+from opendbc.car.manifest import MANIFEST_ATTRS, generate_manifest, get_brands, get_manifest
+
+
+def get_imported_modules(statement: str) -> set[str]:
+  """Runs statement in a new interpreter, returns the modules it imported"""
+  code = f"import json, sys; startup = set(sys.modules); {statement}; print(json.dumps(sorted(set(sys.modules) - startup)))"
+  proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+  return set(json.loads(proc.stdout.splitlines()[-1]))
+
+
+def get_import_time(statement: str) -> float:
+  """Runs statement in a new interpreter with -X importtime, returns the cumulative time in
+  seconds of the imports it made"""
+  def run(code: str) -> dict[str, int]:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+      if line.startswith("import time:") and "|" in line:
+        _, cumulative, name = line.split("|")
+        # nested imports are indented, their time is in their parent's cumulative time
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+          times[name.strip()] = int(cumulative)
+    return times
+
+  # modules imported at interpreter startup aren't part of the statement
+  startup = run("pass")
+  return sum(t for name, t in run(statement).items() if name not in startup) / 1e6
+
+
+def imported_brands(modules: set[str]) -> set[str]:
+  return {brand for brand in get_brands() if f"opendbc.car.{brand}" in modules}
+
+
+class TestManifest:
+  def test_manifest_up_to_date(self):
+    assert generate_manifest() == get_manifest(), "Manifest is out of date, run `python -m opendbc.car.manifest`"
+
+    # attrs the manifest doesn't record make get_interface_attr import every brand
+    called_attrs = set()
+    for root, _, files in os.walk(BASEDIR):
+      for fn in files:
+        if fn.endswith(".py") and "tests" not in root.split(os.sep):
+          with open(os.path.join(root, fn)) as f:
+            called_attrs |= set(re.findall(r"get_interface_attr\(['\"](\w+)['\"]", f.read()))
+    assert called_attrs <= {attr for attrs in MANIFEST_ATTRS.values() for attr in attrs}, "Add the attribute to MANIFEST_ATTRS"
+
+  def test_single_brand_import(self):
+    modules = get_imported_modules("import opendbc.car.toyota.interface")
+    assert imported_brands(modules) == {"toyota"}
+
+  def test_fw_versions_import(self):
+    # FW query configs and versions are only imported once FW versions are queried or matched
+    modules = get_imported_modules("import opendbc.car.fw_versions, opendbc.car.fw_cache")
+    assert imported_brands(modules) == set()
+
+  def test_car_helpers_import(self):
+    # car_helpers only imports the mock brand, other brands are imported once fingerprinted
+    modules = get_imported_modules("import opendbc.car.car_helpers")
+    assert imported_brands(modules) <= {"mock"}
+
+  def test_can_parser_import(self):
+    modules = get_imported_modules("import opendbc.can.parser")
+    assert not any(name.startswith("opendbc.car") for name in modules)
+
+  def test_import_times(self):
+    # reported, not asserted: import times depend on the machine and its disk cache
+    for statement in ("import opendbc.car.fw_versions", "import opendbc.car.car_helpers", "import opendbc.can.parser"):
+      print(f"{get_import_time(statement) * 1000:8.1f} ms  {statement}")
@@ -0,0 +1,242 @@
+import io
+import math
+import pytest
+import random
+import struct
+import time
+
+from opendbc.car.can_definitions import CanData
+from opendbc.car.ecu_addrs import EcuSweepStats
+from opendbc.car.fw_query_definitions import StdQueries
+from opendbc.car.fw_versions import VERSIONS, get_fw_versions_ordered, get_present_ecus, match_fw_to_car
+from opendbc.car.isotp_parallel_query import IsoTpParallelQuery
+from opendbc.car.uds import CAN_FD_DATA_LENGTHS, UdsClient
+from opendbc.car.tests.virtual_ecus import DEFAULT_VIN, VirtualCanBus, VirtualEcu, get_virtual_ecus
+from opendbc.car.vin import get_vin
+
+# one car with FW versions for each brand
+BRAND_CARS = {brand: next(c for c, ecus in cars.items() if any(len(fw) for fw in ecus.values()))
+              for brand, cars in VERSIONS.items() if any(len(fw) for ecus in cars.values() for fw in ecus.values())}
+
+
+def simulate_fingerprint(bus: VirtualCanBus, num_pandas: int = 2, concurrent: bool = False):
+  bus.set_obd_multiplexing(True)
+  _, _, vin = get_vin(bus.can_recv, bus.can_send, (0, 1))
+  ecu_rx_addrs = get_present_ecus(bus.can_recv, bus.can_send, bus.set_obd_multiplexing, num_pandas=num_pandas)
+  car_fw = get_fw_versions_ordered(bus.can_recv, bus.can_send, bus.set_obd_multiplexing, vin, ecu_rx_addrs,
+                                   num_pandas=num_pandas, concurrent=concurrent)
+  _, matches = match_fw_to_car(car_fw, vin, log=False)
+  return vin, car_fw, matches
+
+
+class MemoryTransfer:
+  """Handles UDS request download/upload, transfer data and transfer exit on a block of ECU memory.
+  Uploaded blocks are always full, padded past the end of memory"""
+  def __init__(self, memory_address: int, memory_size: int, max_num_bytes: int):
+    self.memory_address = memory_address
+    self.memory = bytearray(memory_size)
+    self.max_num_bytes = max_num_bytes
+    self.offset = 0
+    self.upload = False
+
+  def __call__(self, request: bytes) -> bytes | None:
+    if request[0] in (0x34, 0x35):
+      address_len = request[2] & 0xF
+      address = int.from_bytes(request[3:3 + address_len], "big")
+      self.offset = address - self.memory_address
+      self.upload = request[0] == 0x35
+      return bytes([request[0] + 0x40, 0x20]) + struct.pack("!H", self.max_num_bytes)
+    elif request[0] == 0x36:
+      if self.upload:
+        block = bytes(self.memory[self.offset:self.offset + self.max_num_bytes - 2]).ljust(self.max_num_bytes - 2, b'\xff')
+      else:
+        block = request[2:]
+        self.memory[self.offset:self.offset + len(block)] = block
+      self.offset += len(block)
+      return bytes([0x76, request[1]]) + (block if self.upload else b'')
+    elif request[0] == 0x37:
+      return b'\x77'
+    return None
+
+
+class FakePanda:
+  # panda.can_recv doesn't block, polling it takes a bus with a short receive interval
+  def __init__(self, bus: VirtualCanBus):
+    self.bus = bus
+
+  def can_send(self, addr, dat, bus, timeout=0):
+    self.bus.can_send([CanData(addr, dat, bus)])
+
+  def can_recv(self):
+    return [msg for packet in self.bus.can_recv(wait_for_one=True) for msg in packet]
+
+
+class TestVirtualEcus:
+  @pytest.mark.parametrize("sub_addr", (None, 0x10))
+  @pytest.mark.parametrize("response_pending", (0, 2))
+  def test_isotp_query(self, make_bus, sub_addr, response_pending):
+    long_request = bytes(range(0x22, 0x22 + 12))
+    ecu = VirtualEcu(0, 0x750, 0x758, sub_addr, response_pending=response_pending, responses={
+      StdQueries.TESTER_PRESENT_REQUEST: StdQueries.TESTER_PRESENT_RESPONSE,
+      StdQueries.UDS_VIN_REQUEST: StdQueries.UDS_VIN_RESPONSE + DEFAULT_VIN.encode(),
+      long_request: b'\x62\x01',
+    })
+    bus = make_bus([ecu])
+
+    # single frame, multi-frame response, and a multi-frame request
+    for request, response, expected in ((StdQueries.UDS_VIN_REQUEST, StdQueries.UDS_VIN_RESPONSE, DEFAULT_VIN.encode()),
+                                        (long_request, b'\x62', b'\x01')):
+      query = IsoTpParallelQuery(bus.can_send, bus.can_recv, 0, [(0x750, sub_addr)],
+                                 [StdQueries.TESTER_PRESENT_REQUEST, request],
+                                 [StdQueries.TESTER_PRESENT_RESPONSE, response])
+      assert query.get_data(0.1) == {(0x750, sub_addr): expected}
+
+    # wrong bus and address get no response
+    for bus_num, addr in ((1, 0x750), (0, 0x751)):
+      query = IsoTpParallelQuery(bus.can_send, bus.can_recv, bus_num, [(addr, sub_addr)], [StdQueries.UDS_VIN_REQUEST], [StdQueries.UDS_VIN_RESPONSE])
+      assert query.get_data(0.1) == {}
+
+  @pytest.mark.parametrize("sub_addr", (None, 0x10))
+  def test_isotp_can_fd(self, make_bus, sub_addr):
+    # escaped single frame, multi-frame request and response, and an escaped first frame over 4095 bytes
+    dtc_request = b'\x19\x02' + bytes(100)
+    responses = {b'\x22\xf1\x00': b'\x62\xf1\x00' + bytes(range(40)), dtc_request: b'\x59\x02' + bytes(range(256)) * 2,
+                 b'\x36\x01': b'\x76\x01' + bytes(range(250)) * 20}
+
+    frame_counts = {}
+    for can_fd in (False, True):
+      ecu = VirtualEcu(0, 0x750, 0x758, sub_addr, can_fd=can_fd, responses=responses)
+      bus = make_bus([ecu])
+      received: list[CanData] = []
+
+      def can_recv(wait_for_one: bool = False, bus: VirtualCanBus = bus, received: list[CanData] = received) -> list[list[CanData]]:
+        can_packets = bus.can_recv(wait_for_one)
+        received.extend(msg for packet in can_packets for msg in packet)
+        return can_packets
+
+      for request, response in responses.items():
+        query = IsoTpParallelQuery(bus.can_send, can_recv, 0, [(0x750, sub_addr)], [request], [response[:2]], can_fd=can_fd)
+        assert query.get_data(0.1) == {(0x750, sub_addr): response[2:]}
+
+      assert all(len(msg.dat) in CAN_FD_DATA_LENGTHS for msg in bus.sent + received)
+      assert can_fd or all(len(msg.dat) == 8 for msg in bus.sent + received)
+      frame_counts[can_fd] = len(bus.sent) + len(received)
+
+    assert frame_counts[True] * 7 < frame_counts[False]
+
+  def test_uds_transfer(self, make_bus, subtests):
+    image = random.Random(0).randbytes(0x4000)
+    for can_fd in (False, True):
+      with subtests.test(can_fd=can_fd):
+        memory = MemoryTransfer(0x10000, len(image), max_num_bytes=0x802)
+        bus = make_bus([VirtualEcu(0, 0x7E0, 0x7E8, handler=memory, can_fd=can_fd)], recv_interval=0.001)
+        client = UdsClient(FakePanda(bus), 0x7E0, bus=0, can_fd=can_fd)
+
+        progress = []
+        stats = client.download(0x10000, io.BytesIO(image), progress=progress.append)
+        assert memory.memory == image
+        assert stats.num_bytes == progress[-1] == len(image)
+        assert stats.num_blocks == math.ceil(len(image) / 0x800)
+
+        data, upload_stats = client.upload(0x10000, len(image))
+        assert data == image
+        assert upload_stats.num_blocks == stats.num_blocks
+
+        # a padded last block is cut off at memory_size
+        progress = []
+        data, upload_stats = client.upload(0x10000, 0x900, progress=progress.append)
+        assert data == image[:0x900]
+        assert upload_stats.num_bytes == progress[-1] == 0x900
+        assert upload_stats.num_blocks == 2
+
+        # a short source is an error
+        with pytest.raises(ValueError):
+          client.download(0x10000, image[:0x900], memory_size=len(image))
+
+        print(f'{can_fd=}, download {stats.bytes_per_second / 1e3:.1f} kB/s, upload {upload_stats.bytes_per_second / 1e3:.1f} kB/s')
+
+  def test_isotp_query_benchmark(self, make_bus):
+    # a full chunk of 128 ECUs, half with sub-addresses, on a bus busy with background traffic
+    rng = random.Random(0)
+    addrs = [(0x700 + i, None) for i in range(64)] + [(0x680, i) for i in range(64)]
+    ecus = [VirtualEcu(0, addr, addr + 8, sub_addr, response_delay=rng.uniform(0, 0.05),
+                       responses={StdQueries.UDS_VERSION_REQUEST: StdQueries.UDS_VERSION_RESPONSE + b'fw'})
+            for addr, sub_addr in addrs]
+    bus = make_bus(ecus)
+    background = [CanData(rng.randint(0x100, 0x7FF), bytes(8), rng.choice((0, 1, 2))) for _ in range(1000)]
+
+    def can_recv(wait_for_one: bool = False, bus: VirtualCanBus = bus) -> list[list[CanData]]:
+      return bus.can_recv(wait_for_one) + [background]
+
+    query = IsoTpParallelQuery(bus.can_send, can_recv, 0, addrs, [StdQueries.UDS_VERSION_REQUEST], [StdQueries.UDS_VERSION_RESPONSE])
+    t = time.perf_counter()
+    results = query.get_data(0.1)
+    elapsed = time.perf_counter() - t
+    assert results == {addr: b'fw' for addr in addrs}
+    print(f'IsoTpParallelQuery, 128 ECUs with background traffic: {elapsed * 1e3:.1f} ms')
+
+  def test_dropped_frames(self, make_bus):
+    ecu = VirtualEcu(0, 0x750, 0x758, responses={StdQueries.UDS_VIN_REQUEST: StdQueries.UDS_VIN_RESPONSE + DEFAULT_VIN.encode()})
+    bus = make_bus([ecu], drop_rate=1.)
+    query = IsoTpParallelQuery(bus.can_send, bus.can_recv, 0, [0x750], [StdQueries.UDS_VIN_REQUEST], [StdQueries.UDS_VIN_RESPONSE])
+    assert query.get_data(0.1) == {}
+    assert 0.1 < bus.monotonic() < 0.2
+
+    # some dropped frames still fingerprint, given retries. which frames are dropped is the same every run
+    car_model = "TOYOTA_RAV4_TSS2"
+    car_versions = {fw for versions in VERSIONS["toyota"][car_model].values() for fw in versions}
+    results = []
+    for _ in range(2):
+      bus = make_bus(get_virtual_ecus(car_model), drop_rate=0.05, seed=1)
+      _, car_fw, matches = simulate_fingerprint(bus)
+      results.append(([(fw.address, fw.subAddress, fw.fwVersion) for fw in car_fw], bus.monotonic()))
+      assert len(car_fw)
+      assert {fw.fwVersion for fw in car_fw} <= car_versions
+      assert matches == {car_model}
+    assert results[0] == results[1]
+
+  def test_obd_multiplexing(self, make_bus):
+    ecu = VirtualEcu(1, 0x7E0, 0x7E8, obd_multiplexing=False, responses={StdQueries.OBD_VERSION_REQUEST: StdQueries.OBD_VERSION_RESPONSE + b'1'})
+    bus = make_bus([ecu])
+    for obd_multiplexing, expected in ((True, {}), (False, {(0x7E0, None): b'1'})):
+      bus.set_obd_multiplexing(obd_multiplexing)
+      query = IsoTpParallelQuery(bus.can_send, bus.can_recv, 1, [0x7E0], [StdQueries.OBD_VERSION_REQUEST], [StdQueries.OBD_VERSION_RESPONSE])
+      assert query.get_data(0.1) == expected
+
+  def test_present_ecus(self, make_bus):
+    # sub-addressed ECUs behind one address take a round each, the rest share the first round
+    ecus = [VirtualEcu(0, 0x750, 0x758, sub_addr=0x6d), VirtualEcu(0, 0x750, 0x758, sub_addr=0x0f),
+            VirtualEcu(0, 0x7E0, 0x7E8, response_delay=0.06), VirtualEcu(1, 0x7E0, 0x7E8, obd_multiplexing=False)]
+    bus = make_bus(ecus)
+    stats = EcuSweepStats()
+    ecu_rx_addrs = get_present_ecus(bus.can_recv, bus.can_send, bus.set_obd_multiplexing, num_pandas=1, stats=stats)
+    assert ecu_rx_addrs == {(0x758, 0x6d, 0), (0x758, 0x0f, 0), (0x7E8, None, 0), (0x7E8, None, 1)}
+    assert stats.response_times.keys() == ecu_rx_addrs
+    assert 0.03 < stats.response_times[(0x7E8, None, 0)] < 0.07
+    assert stats.num_rounds == 3
+    assert stats.sweep_time == pytest.approx(bus.monotonic())
+
+  @pytest.mark.parametrize("brand, car_model", BRAND_CARS.items())
+  def test_fingerprint(self, make_bus, brand, car_model):
+    for concurrent in (False, True):
+      bus = make_bus(get_virtual_ecus(car_model))
+      vin, car_fw, matches = simulate_fingerprint(bus, concurrent=concurrent)
+      assert vin == DEFAULT_VIN
+      assert car_model in matches
+      assert brand in {fw.brand for fw in car_fw if not fw.logging}
+
+  def test_fingerprint_benchmark(self, make_bus, subtests):
+    # End-to-end VIN, present ECU and FW query time on the simulated bus, with ECU latency and response pending
+    total_times = {False: 0.0, True: 0.0}
+    for brand, car_model in BRAND_CARS.items():
+      with subtests.test(brand=brand):
+        times = {}
+        for concurrent in (False, True):
+          bus = make_bus(get_virtual_ecus(car_model, response_delay=0.005, response_pending=1))
+          simulate_fingerprint(bus, concurrent=concurrent)
+          times[concurrent] = bus.monotonic()
+          total_times[concurrent] += times[concurrent]
+        print(f'{brand=}, {car_model=}, fingerprint time={times[False]:.2f}, concurrent={times[True]:.2f} seconds')
+
+    print(f'all brands, fingerprint time={total_times[False]:.2f}, concurrent={total_times[True]:.2f} seconds')
+    assert total_times[True] < total_times[False]
@@ -0,0 +1,242 @@
+import heapq
+import random
+import struct
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from opendbc.car import uds
+from opendbc.car.can_definitions import CanData
+from opendbc.car.fw_query_definitions import StdQueries
+from opendbc.car.fw_versions import FW_QUERY_CONFIGS, MODEL_TO_BRAND, VERSIONS
+
+# A simulated vehicle bus for FW query and VIN tests. Virtual ECUs speak ISO-TP (single and
+# multi-frame, flow control, sub-addresses, classic or CAN FD frames) and answer UDS/KWP/OBD
+# requests from a table of request -> response payloads. Time is simulated: patch time.monotonic
+# with VirtualCanBus.monotonic and the bus clock only advances while the tester waits on can_recv.
+
+DEFAULT_VIN = "1" * 17
+NEGATIVE_RESPONSE = 0x7F
+RESPONSE_PENDING = 0x78
+
+
+@dataclass
+class VirtualEcu:
+  bus: int
+  addr: int
+  response_addr: int
+  sub_addr: int | None = None
+  # only reachable with this OBD multiplexing mode, for ECUs on the OBD port's bus
+  obd_multiplexing: bool | None = None
+  responses: dict[bytes, bytes] = field(default_factory=dict)
+  # answers requests not in responses, for stateful services
+  handler: Callable[[bytes], bytes | None] | None = None
+  response_delay: float = 0.002
+  # number of response pending (0x78) negative responses to send before each response
+  response_pending: int = 0
+  response_pending_delay: float = 0.05
+  can_fd: bool = False
+
+  def __post_init__(self):
+    self.sub_addr_len = 0 if self.sub_addr is None else 1
+    self.max_len = (64 if self.can_fd else 8) - self.sub_addr_len
+    self.max_classic_len = 8 - self.sub_addr_len
+    self._rx_dat = b""
+    self._rx_len = 0
+    self._rx_idx = 0
+    self._tx_dat = b""
+    self._tx_idx = 0
+    self._tx_first_len = 0
+
+  def _frame(self, dat: bytes) -> bytes:
+    frame_len = next(n for n in uds.CAN_FD_DATA_LENGTHS if n >= max(len(dat) + self.sub_addr_len, 8))
+    dat = dat.ljust(frame_len - self.sub_addr_len, b"\x00")
+    return dat if self.sub_addr is None else bytes([self.sub_addr]) + dat
+
+  def _response(self, request: bytes) -> bytes | None:
+    if request in self.responses:
+      return self.responses[request]
+    if self.handler is not None and (response := self.handler(request)) is not None:
+      return response
+    if request[:1] == StdQueries.SHORT_TESTER_PRESENT_REQUEST:
+      return StdQueries.SHORT_TESTER_PRESENT_RESPONSE + request[1:2]
+    return None
+
+  def _send(self, dat: bytes, delay: float) -> list[tuple[float, bytes]]:
+    if len(dat) < self.max_classic_len:
+      return [(delay, self._frame(bytes([len(dat)]) + dat))]
+    if len(dat) <= self.max_len - 2:
+      return [(delay, self._frame(bytes([0x00, len(dat)]) + dat))]
+
+    pci = struct.pack("!H", 0x1000 | len(dat)) if len(dat) <= 0xFFF else struct.pack("!HI", 0x1000, len(dat))
+    self._tx_dat = dat
+    self._tx_idx = self._tx_first_len = self.max_len - len(pci)
+    return [(delay, self._frame(pci + dat[:self._tx_first_len]))]
+
+  def _handle_request(self, request: bytes) -> list[tuple[float, bytes]]:
+    response = self._response(request)
+    if response is None:
+      return []
+
+    frames = []
+    for i in range(self.response_pending):
+      pending = bytes([NEGATIVE_RESPONSE, request[0], RESPONSE_PENDING])
+      frames += self._send(pending, self.response_delay + i * self.response_pending_delay)
+    frames += self._send(response, self.response_delay + self.response_pending * self.response_pending_delay)
+    return frames
+
+  def receive(self, dat: bytes) -> list[tuple[float, bytes]]:
+    """Handles a frame sent to this ECU, returns the frames to respond with and their delays"""
+    if self.sub_addr is not None:
+      if not len(dat) or dat[0] != self.sub_addr:
+        return []
+      dat = dat[1:]
+    if not len(dat):
+      return []
+
+    frame_type = dat[0] >> 4
+    if frame_type == uds.ISOTP_FRAME_TYPE.SINGLE:
+      if dat[0] == 0x00 and len(dat) > self.max_classic_len:
+        return self._handle_request(dat[2:2 + dat[1]])
+      return self._handle_request(dat[1:1 + (dat[0] & 0x0F)])
+
+    elif frame_type == uds.ISOTP_FRAME_TYPE.FIRST:
+      self._rx_len = ((dat[0] & 0x0F) << 8) + dat[1]
+      offset = 2
+      if self._rx_len == 0:
+        self._rx_len, offset = struct.unpack("!I", dat[2:6])[0], 6
+      self._rx_dat = dat[offset:]
+      self._rx_idx = 0
+      return [(0., self._frame(b"\x30\x00\x00"))]
+
+    elif frame_type == uds.ISOTP_FRAME_TYPE.CONSECUTIVE:
+      self._rx_idx += 1
+      if self._rx_len == 0 or self._rx_idx & 0xF != dat[0] & 0xF:
+        self._rx_len = 0
+        return []
+      self._rx_dat += dat[1:1 + self._rx_len - len(self._rx_dat)]
+      if len(self._rx_dat) == self._rx_len:
+        self._rx_len = 0
+        return self._handle_request(self._rx_dat)
+
+    elif frame_type == uds.ISOTP_FRAME_TYPE.FLOW and dat[0] == 0x30 and self._tx_dat:
+      block_size, st_min = dat[1], dat[2]
+      separation_time = st_min / 1000. if st_min <= 0x7F else (st_min - 0xF0) / 10000.
+
+      frames: list[tuple[float, bytes]] = []
+      chunk = self.max_len - 1
+      while self._tx_idx < len(self._tx_dat) and (block_size == 0 or len(frames) < block_size):
+        idx = (self._tx_idx - self._tx_first_len) // chunk + 1
+        frames.append((len(frames) * separation_time, self._frame(bytes([0x20 | (idx & 0xF)]) + self._tx_dat[self._tx_idx:self._tx_idx + chunk])))
+        self._tx_idx += chunk
+      if self._tx_idx >= len(self._tx_dat):
+        self._tx_dat = b""
+      return frames
+
+    return []
+
+
+class VirtualCanBus:
+  """Implements CanSendCallable, CanRecvCallable and the OBD multiplexing callback for a set of virtual ECUs"""
+
+  def __init__(self, ecus: list[VirtualEcu], drop_rate: float = 0., recv_interval: float = 0.01,
+               obd_multiplexing_delay: float = 0.05, bitrate: float = 500e3, data_bitrate: float = 2e6, seed: int = 0):
+    self.ecus = ecus
+    self.drop_rate = drop_rate
+    self.bitrate = bitrate
+    self.data_bitrate = data_bitrate
+    self.recv_interval = recv_interval
+    self.obd_multiplexing_delay = obd_multiplexing_delay
+    # frames are dropped by a random generator per ECU, so which frames are dropped doesn't
+    # depend on the order the tester queries ECUs in
+    self.randoms = {id(ecu): random.Random(f"{seed}:{ecu.bus}:{ecu.addr}:{ecu.sub_addr}:{ecu.obd_multiplexing}") for ecu in ecus}
+
+    self.time = 0.
+    self.obd_multiplexing = True
+    self.sent: list[CanData] = []
+    self._queue: list[tuple[float, int, CanData]] = []
+    self._seq = 0
+
+  def monotonic(self) -> float:
+    return self.time
+
+  def set_obd_multiplexing(self, obd_multiplexing: bool) -> None:
+    if obd_multiplexing != self.obd_multiplexing:
+      self.obd_multiplexing = obd_multiplexing
+      self.time += self.obd_multiplexing_delay
+
+  def _frame_time(self, dat: bytes) -> float:
+    """Approximate time on the wire, CAN FD frames switch to the data bit rate after arbitration"""
+    if len(dat) <= 8:
+      return (47 + 8 * len(dat)) / self.bitrate
+    return 29 / self.bitrate + (8 * len(dat) + 28) / self.data_bitrate
+
+  def _reachable(self, ecu: VirtualEcu, msg: CanData) -> bool:
+    if ecu.bus != msg.src:
+      return False
+    if ecu.obd_multiplexing is not None and msg.src % 4 == 1 and ecu.obd_multiplexing != self.obd_multiplexing:
+      return False
+    if msg.address == 0x7DF:
+      return ecu.sub_addr is None and 0x7E0 <= ecu.addr <= 0x7E7
+    if msg.address == 0x18DB33F1:
+      return ecu.sub_addr is None and ecu.addr & 0xFFFF00FF == 0x18DA00F1
+    return ecu.addr == msg.address
+
+  def can_send(self, msgs: list[CanData]) -> None:
+    for msg in msgs:
+      self.sent.append(msg)
+      self.time += self._frame_time(msg.dat)
+
+      for ecu in self.ecus:
+        if self._reachable(ecu, msg) and self.randoms[id(ecu)].random() >= self.drop_rate:
+          # frames sent back to back go out one after the other
+          rx_time = self.time
+          for delay, dat in ecu.receive(msg.dat):
+            rx_time = max(rx_time, self.time + delay) + self._frame_time(dat)
+            if self.randoms[id(ecu)].random() >= self.drop_rate:
+              heapq.heappush(self._queue, (rx_time, self._seq, CanData(ecu.response_addr, dat, ecu.bus)))
+              self._seq += 1
+
+  def can_recv(self, wait_for_one: bool = False) -> list[list[CanData]]:
+    if wait_for_one:
+      # blocks until a message arrives, or the receive timeout
+      next_time = self._queue[0][0] if self._queue else float('inf')
+      self.time = max(self.time, min(next_time, self.time + self.recv_interval))
+
+    msgs = []
+    while self._queue and self._queue[0][0] <= self.time:
+      msgs.append(heapq.heappop(self._queue)[2])
+    return [msgs] if msgs else []
+
+
+def get_virtual_ecus(car_model: str, vin: str = DEFAULT_VIN, **kwargs) -> list[VirtualEcu]:
+  """Builds virtual ECUs answering the FW queries of car_model with its first known FW versions,
+  and an OBD engine ECU answering the standard VIN queries. kwargs are passed to each VirtualEcu"""
+  brand = MODEL_TO_BRAND[car_model]
+  config = FW_QUERY_CONFIGS[brand]
+
+  ecus: dict[tuple[int, int, int | None, int, bool | None], VirtualEcu] = {}
+
+  def get_ecu(bus: int, addr: int, sub_addr: int | None, rx_offset: int, obd_multiplexing: bool | None) -> VirtualEcu:
+    response_addr = uds.get_rx_addr_for_tx_addr(addr, rx_offset)
+    key = (bus, addr, sub_addr, response_addr, obd_multiplexing if bus % 4 == 1 else None)
+    if key not in ecus:
+      ecus[key] = VirtualEcu(bus, addr, response_addr, sub_addr, key[-1], **kwargs)
+    return ecus[key]
+
+  for (ecu_type, addr, sub_addr), fw_versions in VERSIONS[brand][car_model].items():
+    if not len(fw_versions):
+      continue
+
+    for r in config.requests:
+      if r.logging or (len(r.whitelist_ecus) and ecu_type not in r.whitelist_ecus):
+        continue
+
+      ecu = get_ecu(r.bus, addr, sub_addr, r.rx_offset, r.obd_multiplexing)
+      ecu.responses.update(zip(r.request[:-1], r.response[:-1], strict=True))
+      ecu.responses[r.request[-1]] = r.response[-1] + fw_versions[0]
+
+  vin_ecu = get_ecu(1, 0x7E0, None, 0x8, True)
+  vin_ecu.responses[StdQueries.UDS_VIN_REQUEST] = StdQueries.UDS_VIN_RESPONSE + vin.encode()
+  vin_ecu.responses[StdQueries.OBD_VIN_REQUEST] = StdQueries.OBD_VIN_RESPONSE + vin.encode()
+
+  return list(ecus.values())
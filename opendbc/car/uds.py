@@ -1,7 +1,8 @@
+import io
 import time
 import struct
 from collections import deque
-from typing import NamedTuple, cast
+from typing import BinaryIO, NamedTuple, cast
 from collections.abc import Callable, Generator
 from enum import IntEnum
 from functools import partial
@@ -150,6 +151,18 @@ class ISOTP_FRAME_TYPE(IntEnum):
   CONSECUTIVE = 2
   FLOW = 3
 
+# CAN FD frame data lengths, ISO-TP pads frames to the next one
+CAN_FD_DATA_LENGTHS = (8, 12, 16, 20, 24, 32, 48, 64)
+
+class TransferStats(NamedTuple):
+  num_bytes: int
+  num_blocks: int
+  seconds: float
+
+  @property
+  def bytes_per_second(self) -> float:
+    return self.num_bytes / self.seconds if self.seconds > 0 else float('inf')
+
 class DynamicSourceDefinition(NamedTuple):
   data_identifier: int
   position: int
@@ -305,7 +318,8 @@ def get_dtc_status_names(status):
 
 class CanClient:
   def __init__(self, can_send: Callable[[int, bytes, int], None], can_recv: Callable[[], list[tuple[int, bytes, int]]],
-               tx_addr: int, rx_addr: int, bus: int, sub_addr: int | None = None, rx_sub_addr: int | None = None):
+               tx_addr: int, rx_addr: int, bus: int, sub_addr: int | None = None, rx_sub_addr: int | None = None,
+               can_fd: bool = False):
     self.tx = can_send
     self.rx = can_recv
     self.tx_addr = tx_addr
@@ -314,6 +328,9 @@ class CanClient:
     self.sub_addr = sub_addr
     self.rx_sub_addr = rx_sub_addr if rx_sub_addr is not None else sub_addr
     self.bus = bus
+    # CAN FD links carry up to 64 byte frames
+    self.can_fd = can_fd
+    self.max_frame_len = 64 if can_fd else 8
 
   def _recv_filter(self, bus: int, addr: int) -> bool:
     # handle functional addresses (switch to first addr to respond)
@@ -376,7 +393,7 @@ class CanClient:
         msg = bytes([self.sub_addr]) + msg
 
       carlog.debug(f"CAN-TX: {hex(self.tx_addr)} - 0x{bytes.hex(msg)}")
-      assert len(msg) <= 8
+      assert len(msg) <= self.max_frame_len
 
       self.tx(self.tx_addr, msg, self.bus)
       # prevent rx buffer from overflowing on large tx
@@ -388,7 +405,11 @@ class IsoTpMessage:
     self._can_client = can_client
     self.timeout = timeout
     self.single_frame_mode = single_frame_mode
-    self.max_len = 8 if self._can_client.sub_addr is None else 7
+    self.can_fd = self._can_client.can_fd
+    # data bytes per frame, and the most a classic single frame holds
+    self.sub_addr_len = 0 if self._can_client.sub_addr is None else 1
+    self.max_len = self._can_client.max_frame_len - self.sub_addr_len
+    self.max_classic_len = 8 - self.sub_addr_len
 
     # <= 127, separation time in milliseconds
     # 0xF1 to 0xF9 UF, 100 to 900 microseconds
@@ -400,11 +421,16 @@ class IsoTpMessage:
     else:
       raise Exception("Separation time not in range")
 
-    self.flow_control_msg = bytes([
+    self.flow_control_msg = self._pad(bytes([
       0x30,  # flow control
       0x01 if self.single_frame_mode else 0x00,  # block size
       separation_time,
-    ]).ljust(self.max_len, b"\x00")
+    ]))
+
+  def _pad(self, msg: bytes) -> bytes:
+    # classic frames are padded to 8 bytes, CAN FD frames to the next valid data length
+    frame_len = next(n for n in CAN_FD_DATA_LENGTHS if n >= max(len(msg) + self.sub_addr_len, 8))
+    return msg.ljust(frame_len - self.sub_addr_len, b"\x00")
 
   def send(self, dat: bytes, setup_only: bool = False) -> None:
     # throw away any stale data
@@ -413,6 +439,7 @@ class IsoTpMessage:
     self.tx_dat = dat
     self.tx_len = len(dat)
     self.tx_idx = 0
+    self.tx_first_len = 0
     self.tx_done = False
 
     self.rx_dat = b""
@@ -425,17 +452,20 @@ class IsoTpMessage:
     self._tx_first_frame(setup_only=setup_only)
 
   def _tx_first_frame(self, setup_only: bool = False) -> None:
-    if self.tx_len < self.max_len:
-      # single frame (send all bytes)
+    if self.tx_len < self.max_classic_len or (self.can_fd and self.tx_len <= self.max_len - 2):
+      # single frame (send all bytes), CAN FD single frames over 7 bytes escape the length to the second byte
       if not setup_only:
         carlog.debug(f"ISO-TP: TX - single frame - {hex(self._can_client.tx_addr)}")
-      msg = (bytes([self.tx_len]) + self.tx_dat).ljust(self.max_len, b"\x00")
+      pci = bytes([self.tx_len]) if self.tx_len < self.max_classic_len else bytes([0x00, self.tx_len])
+      msg = self._pad(pci + self.tx_dat)
       self.tx_done = True
     else:
-      # first frame (send first 6 bytes)
+      # first frame (send as many bytes as fit), lengths over 4095 escape to a 32 bit length
       if not setup_only:
         carlog.debug(f"ISO-TP: TX - first frame - {hex(self._can_client.tx_addr)}")
-      msg = (struct.pack("!H", 0x1000 | self.tx_len) + self.tx_dat[:self.max_len - 2]).ljust(self.max_len - 2, b"\x00")
+      pci = struct.pack("!H", 0x1000 | self.tx_len) if self.tx_len <= 0xFFF else struct.pack("!HI", 0x1000, self.tx_len)
+      self.tx_first_len = self.max_len - len(pci)
+      msg = pci + self.tx_dat[:self.tx_first_len]
     if not setup_only:
       self._can_client.send([msg])
 
@@ -473,16 +503,14 @@ class IsoTpMessage:
 
       # "if the first byte is 0x00, then it's a CAN-FD SF, and the second byte specifies the size of the data."
       # - https://en.wikipedia.org/wiki/CAN_FD
-      if rx_data[0] & 0x0F == 0 and len(rx_data) > 8:
+      if rx_data[0] & 0x0F == 0 and len(rx_data) > 8 - self.sub_addr_len:
         self.rx_len = rx_data[1]
         offset = 2
-        # TODO: update self.max_len for CAN FD
-        max_len = 62 if self._can_client.sub_addr is None else 61
-        assert self.rx_len <= max_len, f"isotp - rx: invalid single frame length: {self.rx_len}"
+        assert self.rx_len <= len(rx_data) - 2, f"isotp - rx: invalid single frame length: {self.rx_len}"
       else:
         self.rx_len = rx_data[0] & 0x0F
         offset = 1
-        assert self.rx_len < self.max_len, f"isotp - rx: invalid single frame length: {self.rx_len}"
+        assert self.rx_len < self.max_classic_len, f"isotp - rx: invalid single frame length: {self.rx_len}"
 
       self.rx_dat = rx_data[offset:offset + self.rx_len]
       self.rx_idx = 0
@@ -491,13 +519,19 @@ class IsoTpMessage:
       return ISOTP_FRAME_TYPE.SINGLE
 
     elif rx_data[0] >> 4 == ISOTP_FRAME_TYPE.FIRST:
-      # TODO: support CAN FD first frames
       # Once a first frame is received, further frames must be consecutive
       assert self.rx_dat == b"" or self.rx_done, "isotp - rx: first frame with active frame"
       self.rx_len = ((rx_data[0] & 0x0F) << 8) + rx_data[1]
-      assert self.rx_len >= self.max_len, f"isotp - rx: invalid first frame length: {self.rx_len}"
-      assert len(rx_data) == self.max_len, f"isotp - rx: invalid CAN frame length: {len(rx_data)}"
-      self.rx_dat = rx_data[2:]
+      offset = 2
+      if self.rx_len == 0:
+        # escaped 32 bit length, for messages over 4095 bytes
+        self.rx_len = struct.unpack("!I", rx_data[2:6])[0]
+        offset = 6
+      # the sender's frame size sets the size of its first frame, which may be CAN FD
+      assert self.rx_len >= len(rx_data) - offset, f"isotp - rx: invalid first frame length: {self.rx_len}"
+      assert len(rx_data) == self.max_len or (self.can_fd and len(rx_data) >= self.max_classic_len), \
+        f"isotp - rx: invalid CAN frame length: {len(rx_data)}"
+      self.rx_dat = rx_data[offset:]
       self.rx_idx = 0
       self.rx_done = False
       carlog.debug(f"ISO-TP: RX - first frame - {hex(self._can_client.rx_addr)} idx={self.rx_idx} done={self.rx_done}")
@@ -531,16 +565,16 @@ class IsoTpMessage:
         delay_div = 1000. if rx_data[2] & 0x80 == 0 else 10000.
         delay_sec = delay_ts / delay_div
 
-        # first frame = 6 bytes, each consecutive frame = 7 bytes
+        # each consecutive frame holds one byte less than a frame, after the data sent in the first frame
         num_bytes = self.max_len - 1
-        start = self.max_len - 2 + self.tx_idx * num_bytes
+        start = self.tx_first_len + self.tx_idx * num_bytes
         count = rx_data[1]
         end = start + count * num_bytes if count > 0 else self.tx_len
         tx_msgs = []
         for i in range(start, end, num_bytes):
           self.tx_idx += 1
           # consecutive tx messages
-          msg = (bytes([0x20 | (self.tx_idx & 0xF)]) + self.tx_dat[i:i + num_bytes]).ljust(self.max_len, b"\x00")
+          msg = self._pad(bytes([0x20 | (self.tx_idx & 0xF)]) + self.tx_dat[i:i + num_bytes])
           tx_msgs.append(msg)
         # send consecutive tx messages
         self._can_client.send(tx_msgs, delay=delay_sec)
@@ -578,27 +612,35 @@ def get_rx_addr_for_tx_addr(tx_addr, rx_offset=0x8):
 
 class UdsClient:
   def __init__(self, panda, tx_addr: int, rx_addr: int | None = None, bus: int = 0, sub_addr: int | None = None, rx_sub_addr: int | None = None,
-               timeout: float = 1, tx_timeout: float = 1, response_pending_timeout: float = 10):
+               timeout: float = 1, tx_timeout: float = 1, response_pending_timeout: float = 10, can_fd: bool = False):
     self.bus = bus
     self.tx_addr = tx_addr
     self.rx_addr = rx_addr if rx_addr is not None else get_rx_addr_for_tx_addr(tx_addr)
     self.sub_addr = sub_addr
     self.timeout = timeout
     can_send_with_timeout = partial(panda.can_send, timeout=int(tx_timeout*1000))
-    self._can_client = CanClient(can_send_with_timeout, panda.can_recv, self.tx_addr, self.rx_addr, self.bus, self.sub_addr, rx_sub_addr)
+    self._can_client = CanClient(can_send_with_timeout, panda.can_recv, self.tx_addr, self.rx_addr, self.bus, self.sub_addr, rx_sub_addr,
+                                 can_fd=can_fd)
     self.response_pending_timeout = response_pending_timeout
 
   # generic uds request
   def _uds_request(self, service_type: SERVICE_TYPE, subfunction: int | None = None, data: bytes | None = None) -> bytes:
+    isotp_msg = self._uds_send(service_type, subfunction, data)
+    return self._uds_response(isotp_msg, service_type, subfunction)
+
+  def _uds_send(self, service_type: SERVICE_TYPE, subfunction: int | None = None, data: bytes | None = None) -> IsoTpMessage:
     req = bytes([service_type])
     if subfunction is not None:
       req += bytes([subfunction])
     if data is not None:
       req += data
 
-    # send request, wait for response
+    # send request (first frame), the rest is sent while waiting for the response
     isotp_msg = IsoTpMessage(self._can_client, timeout=self.timeout)
     isotp_msg.send(req)
+    return isotp_msg
+
+  def _uds_response(self, isotp_msg: IsoTpMessage, service_type: SERVICE_TYPE, subfunction: int | None = None) -> bytes:
     response_pending = False
     while True:
       timeout = self.response_pending_timeout if response_pending else self.timeout
@@ -939,3 +981,71 @@ class UdsClient:
 
   def request_transfer_exit(self):
     self._uds_request(SERVICE_TYPE.REQUEST_TRANSFER_EXIT, subfunction=None)
+
+  def download(self, memory_address: int, source: bytes | BinaryIO, memory_size: int | None = None, memory_address_bytes: int = 4,
+               memory_size_bytes: int = 4, data_format: int = 0x00, progress: Callable[[int], None] | None = None) -> TransferStats:
+    """Writes source (bytes or a binary file) to ECU memory: request download, then transfer data in blocks of the
+    size the ECU allows, then request transfer exit. Each block is read from source once the first frame of the one
+    before is sent, before waiting for the ECU's response to it"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+      source = io.BytesIO(source)
+    if memory_size is None:
+      position = source.tell()
+      memory_size = source.seek(0, io.SEEK_END) - position
+      source.seek(position)
+
+    # max number of bytes includes the service id and block sequence count
+    max_num_bytes = self.request_download(memory_address, memory_size, memory_address_bytes, memory_size_bytes, data_format)
+    block_len = max_num_bytes - 2
+    if block_len < 1:
+      raise ValueError(f'invalid max_num_bytes: {max_num_bytes}')
+
+    start_time = time.monotonic()
+    num_bytes, num_blocks = 0, 0
+    block_sequence_count = 1
+    block = source.read(min(block_len, memory_size))
+    while len(block):
+      isotp_msg = self._uds_send(SERVICE_TYPE.TRANSFER_DATA, data=bytes([block_sequence_count]) + block)
+      next_block = source.read(min(block_len, memory_size - num_bytes - len(block)))
+
+      resp = self._uds_response(isotp_msg, SERVICE_TYPE.TRANSFER_DATA)
+      resp_id = resp[0] if len(resp) > 0 else None
+      if resp_id != block_sequence_count:
+        raise ValueError(f'invalid block_sequence_count: {resp_id}')
+
+      num_bytes += len(block)
+      num_blocks += 1
+      if progress is not None:
+        progress(num_bytes)
+      block_sequence_count = (block_sequence_count + 1) & 0xFF
+      block = next_block
+
+    if num_bytes != memory_size:
+      raise ValueError(f'source ended after {num_bytes} of {memory_size} bytes')
+
+    self.request_transfer_exit()
+    return TransferStats(num_bytes, num_blocks, time.monotonic() - start_time)
+
+  def upload(self, memory_address: int, memory_size: int, memory_address_bytes: int = 4, memory_size_bytes: int = 4,
+             data_format: int = 0x00, progress: Callable[[int], None] | None = None) -> tuple[bytes, TransferStats]:
+    """Reads ECU memory: request upload, then transfer data until memory_size bytes are received, then request transfer exit.
+    A last block padded past memory_size is truncated"""
+    self.request_upload(memory_address, memory_size, memory_address_bytes, memory_size_bytes, data_format)
+
+    start_time = time.monotonic()
+    data = bytearray()
+    num_blocks = 0
+    block_sequence_count = 1
+    while len(data) < memory_size:
+      block = self.transfer_data(block_sequence_count)
+      if not len(block):
+        raise ValueError(f'empty transfer data block after {len(data)} of {memory_size} bytes')
+
+      data += block[:memory_size - len(data)]
+      num_blocks += 1
+      if progress is not None:
+        progress(len(data))
+      block_sequence_count = (block_sequence_count + 1) & 0xFF
+
+    self.request_transfer_exit()
+    return bytes(data), TransferStats(len(data), num_blocks, time.monotonic() - start_time)
@@ -2,6 +2,7 @@
 #include <stdio.h>
 #include <stdint.h>
 #include <stdlib.h>
+#include <time.h>
 
 #include "utils.h"
 
@@ -16,6 +17,10 @@ void puth(unsigned int i) {
   printf("%u", i);
 }
 
+void putui(uint32_t i) {
+  printf("%u", i);
+}
+
 typedef struct {
   uint32_t CNT;
 } TIM_TypeDef;
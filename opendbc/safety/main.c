@@ -4,9 +4,14 @@
 
 // Ignore misra-c2012-8.7 as these functions are only called from panda and libsafety
 UNUSED(heartbeat_engaged);
+UNUSED(safety_events_dropped);
+UNUSED(safety_addr_counters);
+UNUSED(safety_addr_counters_dropped);
 
 UNUSED(safety_rx_hook);
 UNUSED(safety_tx_hook);
 UNUSED(safety_fwd_hook);
 UNUSED(safety_tick);
 UNUSED(set_safety_hooks);
+UNUSED(safety_events_read);
+UNUSED(safety_events_print);
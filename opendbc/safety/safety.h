@@ -119,19 +119,190 @@ uint16_t current_safety_param = 0;
 static const safety_hooks *current_hooks = &nooutput_hooks;
 safety_config current_safety_config;
 
-static bool is_msg_valid(RxCheck addr_list[], int index) {
-  bool valid = true;
-  if (index != -1) {
-    if (!addr_list[index].status.valid_checksum || !addr_list[index].status.valid_quality_flag || (addr_list[index].status.wrong_counters >= MAX_WRONG_COUNTERS)) {
-      valid = false;
-      controls_allowed = false;
-      print("controls_allowed(msgvalid) = false\n");
+static SafetyLookupTable rx_lookup;
+static SafetyLookupTable tx_lookup;
+
+static uint32_t safety_lookup_hash(int addr, int bus, int len) {
+  // fibonacci hashing, the top bits of the product depend on all bits of the key
+  uint32_t key = (uint32_t)addr ^ ((uint32_t)bus << 29U) ^ ((uint32_t)len << 22U);
+  return (key * 2654435761U) >> (32U - SAFETY_LOOKUP_BITS);
+}
+
+static uint32_t safety_lookup_next(uint32_t slot) {
+  return (slot + 1U) & (SAFETY_LOOKUP_SIZE - 1U);
+}
+
+static void safety_lookup_reset(SafetyLookupTable *table) {
+  for (uint32_t i = 0U; i < SAFETY_LOOKUP_SIZE; i++) {
+    table->entries[i].index = -1;
+  }
+  table->len = 0U;
+  table->valid = true;
+}
+
+static void safety_lookup_insert(SafetyLookupTable *table, int addr, int bus, int len, int index, int msg_index) {
+  // keep the table at most half full so probe sequences stay short
+  table->valid = table->valid && (table->len < (SAFETY_LOOKUP_SIZE / 2U));
+  if (table->valid) {
+    // linear probing: entries with the same key are probed in insertion order
+    uint32_t slot = safety_lookup_hash(addr, bus, len);
+    while (table->entries[slot].index != -1) {
+      slot = safety_lookup_next(slot);
     }
+    table->entries[slot] = (SafetyLookupEntry){addr, bus, len, index, msg_index};
+    table->len += 1U;
   }
-  return valid;
 }
 
-static int get_addr_check_index(const CANPacket_t *to_push, RxCheck addr_list[], const int len) {
+static void safety_lookup_build(const safety_config *cfg) {
+  safety_lookup_reset(&rx_lookup);
+  for (int i = 0; i < cfg->rx_checks_len; i++) {
+    for (int j = 0; (j < (int)MAX_ADDR_CHECK_MSGS) && (cfg->rx_checks[i].msg[j].addr != 0); j++) {
+      const CanMsgCheck *msg = &cfg->rx_checks[i].msg[j];
+      safety_lookup_insert(&rx_lookup, msg->addr, msg->bus, msg->len, i, j);
+    }
+  }
+
+  safety_lookup_reset(&tx_lookup);
+  for (int i = 0; i < cfg->tx_msgs_len; i++) {
+    safety_lookup_insert(&tx_lookup, cfg->tx_msgs[i].addr, cfg->tx_msgs[i].bus, cfg->tx_msgs[i].len, i, 0);
+  }
+}
+
+// events and the head are volatile, so the compiler keeps their accesses in program order:
+// an event is filled in before the head publishes it, and copied before the head is checked again
+static volatile SafetyEvent safety_events[SAFETY_EVENTS_SIZE];
+static volatile uint32_t safety_events_head = 0U;  // events written, only written by the CAN path
+static uint32_t safety_events_tail = 0U;           // events read, only written by the reader
+uint32_t safety_events_dropped = 0U;               // events overwritten before they were read
+SafetyAddrCounter safety_addr_counters[SAFETY_ADDR_COUNTERS_SIZE];
+static uint32_t safety_addr_counters_used = 0U;
+uint32_t safety_addr_counters_dropped = 0U;        // events dropped once the counters were full
+// the same address is usually blocked or invalid many times in a row, only the first one is recorded
+static SafetyEvent safety_event_last_tx_blocked;
+static SafetyEvent safety_event_last_rx_invalid;
+
+static void safety_events_reset_counters(void) {
+  for (uint32_t i = 0U; i < SAFETY_ADDR_COUNTERS_SIZE; i++) {
+    safety_addr_counters[i] = (SafetyAddrCounter){0U, 0U, false, 0U, 0U};
+  }
+  safety_addr_counters_used = 0U;
+  safety_addr_counters_dropped = 0U;
+  safety_event_last_tx_blocked = (SafetyEvent){0U, 0U, 0U, 0U, 0U, 0U};
+  safety_event_last_rx_invalid = (SafetyEvent){0U, 0U, 0U, 0U, 0U, 0U};
+}
+
+static void safety_event_push(uint8_t type, uint8_t reason, const CANPacket_t *msg) {
+  // single producer: fill in the event before publishing it by moving the head.
+  // the oldest events are overwritten when the reader falls behind
+  volatile SafetyEvent *event = &safety_events[safety_events_head & (SAFETY_EVENTS_SIZE - 1U)];
+  event->timestamp = microsecond_timer_get();
+  event->addr = (uint32_t)GET_ADDR(msg);
+  event->bus = (uint8_t)GET_BUS(msg);
+  event->len = (uint8_t)GET_LEN(msg);
+  event->type = type;
+  event->reason = reason;
+  safety_events_head += 1U;
+}
+
+static SafetyAddrCounter *safety_addr_counter(const CANPacket_t *msg) {
+  uint32_t addr = (uint32_t)GET_ADDR(msg);
+  uint8_t bus = (uint8_t)GET_BUS(msg);
+
+  // once the counters are full, events are dropped without scanning them
+  SafetyAddrCounter *counter = NULL;
+  if (safety_addr_counters_used < SAFETY_ADDR_COUNTERS_SIZE) {
+    // linear probing: the address is before the first unused slot, or not in the counters yet.
+    // there's always an unused slot to stop at while they aren't full
+    uint32_t slot = safety_lookup_hash(GET_ADDR(msg), GET_BUS(msg), 0);
+    counter = &safety_addr_counters[slot & (SAFETY_ADDR_COUNTERS_SIZE - 1U)];
+    while (counter->used && ((counter->addr != addr) || (counter->bus != bus))) {
+      slot += 1U;
+      counter = &safety_addr_counters[slot & (SAFETY_ADDR_COUNTERS_SIZE - 1U)];
+    }
+    if (!counter->used) {
+      *counter = (SafetyAddrCounter){addr, bus, true, 0U, 0U};
+      safety_addr_counters_used += 1U;
+    }
+  }
+  safety_addr_counters_dropped += (counter == NULL) ? 1U : 0U;
+  return counter;
+}
+
+static bool safety_event_repeated(SafetyEvent *last, uint8_t reason, const CANPacket_t *msg) {
+  bool repeated = (last->reason == reason) && (last->addr == (uint32_t)GET_ADDR(msg)) && (last->bus == (uint8_t)GET_BUS(msg));
+  last->reason = reason;
+  last->addr = (uint32_t)GET_ADDR(msg);
+  last->bus = (uint8_t)GET_BUS(msg);
+  return repeated;
+}
+
+static void safety_event_tx_blocked(const CANPacket_t *to_send, uint8_t reason) {
+  SafetyAddrCounter *counter = safety_addr_counter(to_send);
+  if (counter != NULL) {
+    counter->tx_blocked += 1U;
+  }
+  if (!safety_event_repeated(&safety_event_last_tx_blocked, reason, to_send)) {
+    safety_event_push(SAFETY_EVENT_TX_BLOCKED, reason, to_send);
+  }
+}
+
+static void safety_event_rx_invalid(const CANPacket_t *to_push, uint8_t reason) {
+  SafetyAddrCounter *counter = safety_addr_counter(to_push);
+  if (counter != NULL) {
+    counter->rx_invalid += 1U;
+  }
+  if (!safety_event_repeated(&safety_event_last_rx_invalid, reason, to_push)) {
+    safety_event_push(SAFETY_EVENT_RX_INVALID, reason, to_push);
+  }
+}
+
+static void safety_event_controls_allowed(bool controls_allowed_prev, uint8_t reason, const CANPacket_t *msg) {
+  if (controls_allowed != controls_allowed_prev) {
+    safety_event_push(controls_allowed ? SAFETY_EVENT_CONTROLS_ALLOWED : SAFETY_EVENT_CONTROLS_NOT_ALLOWED, reason, msg);
+  }
+}
+
+// Copies up to max unread events into events and returns how many, oldest first. Lock-free against
+// the CAN path, called outside of it, e.g. from the main loop or when building the health packet
+uint32_t safety_events_read(SafetyEvent events[], uint32_t max) {
+  uint32_t count = 0U;
+  while ((count < max) && (safety_events_tail != safety_events_head)) {
+    uint32_t head = safety_events_head;
+    if ((head - safety_events_tail) > SAFETY_EVENTS_SIZE) {
+      safety_events_dropped += head - safety_events_tail - SAFETY_EVENTS_SIZE;
+      safety_events_tail = head - SAFETY_EVENTS_SIZE;
+    }
+    events[count] = safety_events[safety_events_tail & (SAFETY_EVENTS_SIZE - 1U)];
+    // the event may have been overwritten while it was copied, then skip ahead on the next iteration
+    bool overwritten = (safety_events_head - safety_events_tail) > SAFETY_EVENTS_SIZE;
+    count += overwritten ? 0U : 1U;
+    safety_events_tail += overwritten ? 0U : 1U;
+  }
+  return count;
+}
+
+// prints and clears the unread events, outside of the CAN path
+void safety_events_print(void) {
+  SafetyEvent event;
+  while (safety_events_read(&event, 1U) == 1U) {
+    print("safety event ");
+    putui((uint32_t)event.type);
+    print(" reason=");
+    putui((uint32_t)event.reason);
+    print(" addr=");
+    putui(event.addr);
+    print(" bus=");
+    putui((uint32_t)event.bus);
+    print(" len=");
+    putui((uint32_t)event.len);
+    print(" ts=");
+    putui(event.timestamp);
+    print("\n");
+  }
+}
+
+static int get_addr_check_index_linear(const CANPacket_t *to_push, RxCheck addr_list[], const int len) {
   int bus = GET_BUS(to_push);
   int addr = GET_ADDR(to_push);
   int length = GET_LEN(to_push);
@@ -162,6 +333,36 @@ static int get_addr_check_index(const CANPacket_t *to_push, RxCheck addr_list[],
   return index;
 }
 
+static int get_addr_check_index(const CANPacket_t *to_push, RxCheck addr_list[], const int len) {
+  int index = -1;
+  if (rx_lookup.valid) {
+    int bus = GET_BUS(to_push);
+    int addr = GET_ADDR(to_push);
+    int length = GET_LEN(to_push);
+
+    // same result as the linear scan: the first check that either matches its seen msg,
+    // or hasn't seen one yet and has a matching msg, which is then latched
+    uint32_t slot = safety_lookup_hash(addr, bus, length);
+    while ((index == -1) && (rx_lookup.entries[slot].index != -1)) {
+      const SafetyLookupEntry *entry = &rx_lookup.entries[slot];
+      if ((addr == entry->addr) && (bus == entry->bus) && (length == entry->len)) {
+        RxStatus *status = &addr_list[entry->index].status;
+        if (!status->msg_seen) {
+          status->index = entry->msg_index;
+          status->msg_seen = true;
+        }
+        if (status->index == entry->msg_index) {
+          index = entry->index;
+        }
+      }
+      slot = safety_lookup_next(slot);
+    }
+  } else {
+    index = get_addr_check_index_linear(to_push, addr_list, len);
+  }
+  return index;
+}
+
 static void update_addr_timestamp(RxCheck addr_list[], int index) {
   if (index != -1) {
     uint32_t ts = microsecond_timer_get();
@@ -178,6 +379,25 @@ static void update_counter(RxCheck addr_list[], int index, uint8_t counter) {
   }
 }
 
+static uint8_t get_rx_invalid_reason(const RxCheck *rx_check) {
+  uint8_t reason = 0U;
+  reason |= rx_check->status.valid_checksum ? 0U : SAFETY_EVENT_REASON_CHECKSUM;
+  reason |= (rx_check->status.wrong_counters >= MAX_WRONG_COUNTERS) ? SAFETY_EVENT_REASON_COUNTER : 0U;
+  reason |= rx_check->status.valid_quality_flag ? 0U : SAFETY_EVENT_REASON_QUALITY_FLAG;
+  return reason;
+}
+
+static bool is_msg_valid(RxCheck addr_list[], int index) {
+  bool valid = true;
+  if (index != -1) {
+    if (get_rx_invalid_reason(&addr_list[index]) != 0U) {
+      valid = false;
+      controls_allowed = false;
+    }
+  }
+  return valid;
+}
+
 static bool rx_msg_safety_check(const CANPacket_t *to_push,
                                 const safety_config *cfg,
                                 const safety_hooks *safety_hooks) {
@@ -210,7 +430,12 @@ static bool rx_msg_safety_check(const CANPacket_t *to_push,
       cfg->rx_checks[index].status.valid_quality_flag = true;
     }
   }
-  return is_msg_valid(cfg->rx_checks, index);
+
+  bool valid = is_msg_valid(cfg->rx_checks, index);
+  if (!valid) {
+    safety_event_rx_invalid(to_push, get_rx_invalid_reason(&cfg->rx_checks[index]));
+  }
+  return valid;
 }
 
 bool safety_rx_hook(const CANPacket_t *to_push) {
@@ -225,38 +450,38 @@ bool safety_rx_hook(const CANPacket_t *to_push) {
   if (controls_allowed && !controls_allowed_prev) {
     heartbeat_engaged_mismatches = 0;
   }
+  safety_event_controls_allowed(controls_allowed_prev, SAFETY_EVENT_REASON_RX, to_push);
 
   return valid;
 }
 
-int _prev_not_allowed_addr = -1;
 static bool tx_msg_safety_check(const CANPacket_t *to_send, const CanMsg msg_list[], int len) {
   int addr = GET_ADDR(to_send);
   int bus = GET_BUS(to_send);
   int length = GET_LEN(to_send);
 
   bool allowed = false;
-  for (int i = 0; i < len; i++) {
-    if ((addr == msg_list[i].addr) && (bus == msg_list[i].bus) && (length == msg_list[i].len)) {
-      allowed = true;
-      break;
+  if (tx_lookup.valid) {
+    uint32_t slot = safety_lookup_hash(addr, bus, length);
+    while (!allowed && (tx_lookup.entries[slot].index != -1)) {
+      const SafetyLookupEntry *entry = &tx_lookup.entries[slot];
+      allowed = (addr == entry->addr) && (bus == entry->bus) && (length == entry->len);
+      slot = safety_lookup_next(slot);
+    }
+  } else {
+    for (int i = 0; i < len; i++) {
+      if ((addr == msg_list[i].addr) && (bus == msg_list[i].bus) && (length == msg_list[i].len)) {
+        allowed = true;
+        break;
+      }
     }
-  }
-  if (!allowed && _prev_not_allowed_addr != addr && len > 0) {
-    print("allowed addr = ");
-    for(int i=0;i<len;i++) {putui((uint32_t)msg_list[i].addr); print(",");}
-    print("\nbus = ");
-    for(int i=0;i<len;i++) {putui((uint32_t)msg_list[i].bus); print(",");}
-    print("\nlen = ");
-    for(int i=0;i<len;i++) {putui((uint32_t)msg_list[i].len); print(",");}
-    print("\n");
-    _prev_not_allowed_addr = addr;
   }
   return allowed;
 }
 
-int _prev_error_addr = -1;
 bool safety_tx_hook(CANPacket_t *to_send) {
+  bool controls_allowed_prev = controls_allowed;
+
   bool allowed = tx_msg_safety_check(to_send, current_safety_config.tx_msgs, current_safety_config.tx_msgs_len);
   if ((current_safety_mode == SAFETY_ALLOUTPUT) || (current_safety_mode == SAFETY_ELM327)) {
     allowed = true;
@@ -264,28 +489,14 @@ bool safety_tx_hook(CANPacket_t *to_send) {
 
   const bool safety_allowed = current_hooks->tx(to_send);
 
-  int addr = GET_ADDR(to_send);
-  if ((!allowed || !safety_allowed) && (addr!=_prev_error_addr)) {
-      int bus = GET_BUS(to_send);
-      int length = GET_LEN(to_send);
-      print("not allowed:");
-      if (!allowed) print("nowallowed,");
-      if (!safety_allowed) print("safety_allowed,");
-      print("addr = ");
-      putui((uint32_t)addr);
-      print(" bus=");
-      putui((uint32_t)bus);
-      print(" len=");
-      putui((uint32_t)length);
-      print(" ctrl=");
-      putui((uint32_t)controls_allowed);
-      print(" main=");
-      putui((uint32_t)acc_main_on);
-      print(" rely=");
-      putui((uint32_t)relay_malfunction);
-      print("\n");
-      _prev_error_addr = addr;
+  uint8_t reason = 0U;
+  reason |= allowed ? 0U : SAFETY_EVENT_REASON_TX_MSGS;
+  reason |= safety_allowed ? 0U : SAFETY_EVENT_REASON_TX_HOOK;
+  reason |= relay_malfunction ? SAFETY_EVENT_REASON_RELAY_MALFUNCTION : 0U;
+  if (reason != 0U) {
+    safety_event_tx_blocked(to_send, reason);
   }
+  safety_event_controls_allowed(controls_allowed_prev, SAFETY_EVENT_REASON_TX, to_send);
 
   return !relay_malfunction && allowed && safety_allowed;
 }
@@ -457,6 +668,7 @@ int set_safety_hooks(uint16_t mode, uint16_t param) {
   ts_steer_req_mismatch_last = 0;
   valid_steer_req_count = 0;
   invalid_steer_req_count = 0;
+  gm_skip_relay_check = false;
 
   // reset samples
   reset_sample(&vehicle_speed);
@@ -467,6 +679,8 @@ int set_safety_hooks(uint16_t mode, uint16_t param) {
   controls_allowed = false;
   relay_malfunction_reset();
   safety_rx_checks_invalid = false;
+  // the events are kept across safety modes, the counters are per safety mode
+  safety_events_reset_counters();
 
   current_safety_config.rx_checks = NULL;
   current_safety_config.rx_checks_len = 0;
@@ -494,6 +708,7 @@ int set_safety_hooks(uint16_t mode, uint16_t param) {
       current_safety_config.rx_checks[j].status = (RxStatus){0};
     }
   }
+  safety_lookup_build(&current_safety_config);
   return set_status;
 }
 
@@ -618,7 +833,6 @@ int ROUND(float val) {
 // Safety checks for longitudinal actuation
 bool longitudinal_accel_checks(int desired_accel, const LongitudinalLimits limits) {
     if(desired_accel != 0) {
-      if(!controls_allowed) print("@@@@@@@@ longitudinal_accel_checks... auto controls_allowed enabled...\n");
       controls_allowed = true;
     }
     //bool accel_valid = get_longitudinal_allowed() && !max_limit_check(desired_accel, limits.max_accel, limits.min_accel);
@@ -172,7 +172,6 @@ static bool gm_tx_hook(const CANPacket_t *to_send) {
   if (addr == 0x2CB) {
     bool apply = GET_BIT(to_send, 0U);
     if (apply) {
-        if(!controls_allowed) print("@@auto cruise control enabled....\n");
         controls_allowed = true;        
     }
     int gas_regen = ((GET_BYTE(to_send, 2) & 0x7FU) << 5) + ((GET_BYTE(to_send, 3) & 0xF8U) >> 3);
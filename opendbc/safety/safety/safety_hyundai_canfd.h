@@ -391,20 +391,14 @@ static bool hyundai_canfd_tx_hook(const CANPacket_t *to_send) {
       int cruise_status = ((GET_BYTE(to_send, 8) >> 4) & 0x7U);
       bool cruise_engaged = (cruise_status == 1) || (cruise_status == 2);
       if (cruise_engaged) {
-        if (!controls_allowed) print("automatic controls_allowed enabled....\n");
         controls_allowed = true;
       }
       violation |= longitudinal_accel_checks(desired_accel_raw, HYUNDAI_LONG_LIMITS);
       violation |= longitudinal_accel_checks(desired_accel_val, HYUNDAI_LONG_LIMITS);
-      if (violation) {
-          print("long violation"); putui((uint32_t)desired_accel_raw); print(","); putui((uint32_t)desired_accel_val); print("\n");
-      }
-
     } else {
       // only used to cancel on here
       if ((desired_accel_raw != 0) || (desired_accel_val != 0)) {
         violation = true;
-        print("no long violation\n");
       }
     }
 
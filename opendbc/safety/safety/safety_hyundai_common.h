@@ -84,7 +84,6 @@ void hyundai_common_cruise_state_check(const bool cruise_engaged) {
     }
 
     if (!cruise_engaged) {
-      if(controls_allowed) print("controls_allowed1 = false\n");
       controls_allowed = false;
       
     }
@@ -115,7 +114,6 @@ void hyundai_common_cruise_buttons_check(const int cruise_button, const bool mai
     // exit controls on cancel press
     if (cruise_button == HYUNDAI_BTN_CANCEL) {
       controls_allowed = false;
-      print("controls_allowed2 = false\n");
     }
 
     cruise_button_prev = cruise_button;
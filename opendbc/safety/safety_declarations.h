@@ -153,6 +153,64 @@ typedef struct {
   int tx_msgs_len;
 } safety_config;
 
+// open addressing hash table of the current safety config's rx check and tx msgs,
+// built by set_safety_hooks so looking up a message doesn't scan the whole list
+#define SAFETY_LOOKUP_BITS 7U
+#define SAFETY_LOOKUP_SIZE (1U << SAFETY_LOOKUP_BITS)
+
+typedef struct {
+  int addr;
+  int bus;
+  int len;
+  int index;                         // index in rx_checks or tx_msgs, -1 for an empty slot
+  int msg_index;                     // index in RxCheck.msg, 0 for tx msgs
+} SafetyLookupEntry;
+
+typedef struct {
+  SafetyLookupEntry entries[SAFETY_LOOKUP_SIZE];
+  uint32_t len;
+  bool valid;                        // false if the config didn't fit, lookups fall back to scanning the list
+} SafetyLookupTable;
+
+// safety events are recorded in a ring buffer and per address counters by the rx and tx hooks,
+// and read or printed with safety_events_read/safety_events_print outside of the CAN path
+#define SAFETY_EVENTS_SIZE 64U               // power of 2
+#define SAFETY_ADDR_COUNTERS_SIZE 32U        // power of 2
+
+#define SAFETY_EVENT_TX_BLOCKED 1U
+#define SAFETY_EVENT_RX_INVALID 2U
+#define SAFETY_EVENT_CONTROLS_ALLOWED 3U     // controls_allowed rising edge
+#define SAFETY_EVENT_CONTROLS_NOT_ALLOWED 4U // controls_allowed falling edge
+
+// SAFETY_EVENT_TX_BLOCKED reasons
+#define SAFETY_EVENT_REASON_TX_MSGS 1U           // not in the safety mode's tx msgs
+#define SAFETY_EVENT_REASON_TX_HOOK 2U           // blocked by the safety mode's tx hook
+#define SAFETY_EVENT_REASON_RELAY_MALFUNCTION 4U
+// SAFETY_EVENT_RX_INVALID reasons
+#define SAFETY_EVENT_REASON_CHECKSUM 1U
+#define SAFETY_EVENT_REASON_COUNTER 2U
+#define SAFETY_EVENT_REASON_QUALITY_FLAG 4U
+// controls_allowed transition reasons, the hook the msg that changed it went through
+#define SAFETY_EVENT_REASON_RX 1U
+#define SAFETY_EVENT_REASON_TX 2U
+
+typedef struct {
+  uint32_t timestamp;                // micro-s
+  uint32_t addr;
+  uint8_t bus;
+  uint8_t len;
+  uint8_t type;                      // SAFETY_EVENT_*
+  uint8_t reason;                    // SAFETY_EVENT_REASON_* flags of the event's type
+} SafetyEvent;
+
+typedef struct {
+  uint32_t addr;
+  uint8_t bus;
+  bool used;
+  uint32_t tx_blocked;
+  uint32_t rx_invalid;
+} SafetyAddrCounter;
+
 typedef uint32_t (*get_checksum_t)(const CANPacket_t *to_push);
 typedef uint32_t (*compute_checksum_t)(const CANPacket_t *to_push);
 typedef uint8_t (*get_counter_t)(const CANPacket_t *to_push);
@@ -739,6 +739,43 @@ class PandaSafetyTest(PandaSafetyTestBase):
     self.safety.set_controls_allowed(0)
     self.assertFalse(self.safety.get_controls_allowed())
 
+  def test_replay_frames(self):
+    # a batch of frames through safety_replay_frames has the same results as calling the hooks per frame
+    # rx checks, tx msgs, and a msg that's neither
+    msgs = [(False, msg) for msg in libsafety_py.get_safety_lookup_msgs(False, self.safety)] + \
+           [(True, msg) for msg in libsafety_py.get_safety_lookup_msgs(True, self.safety)] + \
+           [(False, (0x7ff, 0, 8)), (True, (0x7ff, 0, 8))]
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(300):
+      tx, (addr, bus, length) = msgs[rng.integers(len(msgs))]
+      frames.append((addr, bus, rng.bytes(length), i * 10000, tx, i % 10 == 0))
+      # and entries that only tick
+      if i % 25 == 0:
+        frames.append((None, None, None, i * 10000 + 5000, False, True))
+
+    self._reset_safety_hooks()
+    self.safety.init_tests()
+    self.safety.set_controls_allowed(True)
+    expected = []
+    for addr, bus, dat, timestamp, tx, tick in frames:
+      self.safety.set_timer(timestamp)
+      config_valid = True
+      if tick:
+        self.safety.safety_tick_current_safety_config()
+        config_valid = self.safety.safety_config_valid()
+      allowed = True
+      if addr is not None:
+        msg = libsafety_py.make_CANPacket(addr, bus, dat)
+        allowed = self._tx(msg) if tx else self._rx(msg)
+      expected.append((allowed, self.safety.get_controls_allowed(), config_valid))
+
+    self._reset_safety_hooks()
+    self.safety.init_tests()
+    self.safety.set_controls_allowed(True)
+    results = libsafety_py.replay_frames(frames, self.safety)
+    self.assertEqual(expected, [(r.allowed, r.controls_allowed, r.config_valid) for r in results])
+
   def test_tx_hook_on_wrong_safety_mode(self):
     files = os.listdir(os.path.dirname(os.path.realpath(__file__)))
     test_files = [f for f in files if f.startswith("test_") and f.endswith(".py")]
@@ -751,7 +788,7 @@ class PandaSafetyTest(PandaSafetyTestBase):
       for attr in dir(test):
         if attr.startswith("Test") and attr != current_test:
           tc = getattr(test, attr)
-          tx = tc.TX_MSGS
+          tx = getattr(tc, "TX_MSGS", None)
           if tx is not None and not attr.endswith('Base'):
             # No point in comparing different Tesla safety modes
             if 'Tesla' in attr and 'Tesla' in current_test:
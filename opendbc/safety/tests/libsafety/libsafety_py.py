@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 from cffi import FFI
 from typing import Protocol
 
@@ -8,6 +10,10 @@ from opendbc.safety.tests.libsafety.safety_helpers import PandaSafety, setup_saf
 libsafety_dir = os.path.dirname(os.path.abspath(__file__))
 libsafety_fn = os.path.join(libsafety_dir, "libsafety.so")
 
+SAFETY_LOOKUP_SIZE = 128
+SAFETY_EVENTS_SIZE = 64
+SAFETY_ADDR_COUNTERS_SIZE = 32
+
 ffi = FFI()
 
 ffi.cdef("""
@@ -21,6 +27,7 @@ typedef struct {
   unsigned int addr : 29;
   unsigned char checksum;
   unsigned char data[64];
+  unsigned char padding[2];  // CANPacket_t is aligned(4), keeps arrays of packets the same layout as in C
 } CANPacket_t;
 """, packed=True)
 
@@ -29,6 +36,17 @@ bool safety_rx_hook(CANPacket_t *to_send);
 bool safety_tx_hook(CANPacket_t *to_push);
 int safety_fwd_hook(int bus_num, int addr);
 int set_safety_hooks(uint16_t mode, uint16_t param);
+
+typedef struct {
+  uint32_t timestamp;
+  uint32_t addr;
+  uint8_t bus;
+  uint8_t len;
+  uint8_t type;
+  uint8_t reason;
+} SafetyEvent;
+uint32_t safety_events_read(SafetyEvent events[], uint32_t max);
+void safety_events_print(void);
 """)
 
 ffi.cdef("""
@@ -56,11 +74,35 @@ class Panda(PandaSafety, Protocol):
   def safety_tx_hook(self, to_push: CANPacket) -> int: ...
   def safety_fwd_hook(self, bus_num: int, addr: int) -> int: ...
   def set_safety_hooks(self, mode: int, param: int) -> int: ...
+  def safety_events_read(self, events, max: int) -> int: ...  # noqa: A002
+  def safety_events_print(self) -> None: ...
 
 
 libsafety: Panda = ffi.dlopen(libsafety_fn)
 
 
+# safety contexts, only in these test bindings: libsafety itself keeps a single global safety state
+
+# contexts' symbols stay out of the global namespace, so one can't resolve to another's state
+SAFETY_CONTEXT_DLOPEN_FLAGS = ffi.RTLD_LOCAL | ffi.RTLD_NOW
+
+
+def create_safety_context() -> Panda:
+  """Loads another libsafety instance with its own copy of all safety state, including each safety mode's.
+  Instances are independent, and can run concurrently on threads since cffi releases the GIL during calls"""
+  # dlopen returns the loaded library for a file that's already open, a copy gets its own globals
+  with tempfile.TemporaryDirectory() as tmpdir:
+    fn = os.path.join(tmpdir, "libsafety.so")
+    shutil.copyfile(libsafety_fn, fn)
+    safety: Panda = ffi.dlopen(fn, SAFETY_CONTEXT_DLOPEN_FLAGS)
+  return safety
+
+
+def destroy_safety_context(safety: Panda) -> None:
+  assert safety is not libsafety, "can't destroy the default safety context"
+  ffi.dlclose(safety)
+
+
 # helpers
 
 def make_CANPacket(addr: int, bus: int, dat):
@@ -73,3 +115,53 @@ def make_CANPacket(addr: int, bus: int, dat):
   libsafety.can_set_checksum(ret)
 
   return ret
+
+
+def make_safety_frames(frames):
+  """Packs (addr, bus, dat, timestamp, tx, tick) frames for safety_replay_frames, frames with addr None only tick"""
+  packets = ffi.new('CANPacket_t[]', len(frames))
+  safety_frames = ffi.new('SafetyFrame[]', len(frames))
+  for packet, safety_frame, (addr, bus, dat, timestamp, tx, tick) in zip(packets, safety_frames, frames, strict=True):
+    safety_frame.timestamp = timestamp
+    safety_frame.tx = tx
+    safety_frame.tick = tick
+    safety_frame.tick_only = addr is None
+    if addr is not None:
+      packet.extended = 1 if addr >= 0x800 else 0
+      packet.addr = addr
+      packet.data_len_code = LEN_TO_DLC[len(dat)]
+      packet.bus = bus
+      packet.data = bytes(dat)
+
+  return packets, safety_frames
+
+
+def replay_frames(frames, safety: Panda = libsafety):
+  """Runs (addr, bus, dat, timestamp, tx, tick) frames through the safety hooks with a single call into libsafety"""
+  packets, safety_frames = make_safety_frames(frames)
+  results = ffi.new('SafetyFrameResult[]', len(frames))
+  safety.safety_replay_frames(packets, safety_frames, results, len(frames))
+  return results
+
+
+def get_safety_lookup_msgs(tx: bool, safety: Panda = libsafety) -> list[tuple[int, int, int]]:
+  """(addr, bus, len) of the current safety config's tx msgs or rx checks"""
+  msg = ffi.new("CanMsg *")
+  return [(msg.addr, msg.bus, msg.len) for slot in range(SAFETY_LOOKUP_SIZE) if safety.get_safety_lookup_entry(tx, slot, msg)]
+
+
+def get_safety_events(safety: Panda = libsafety) -> list[tuple[int, int, int, int, int]]:
+  """(type, reason, addr, bus, len) of the unread safety events, oldest first"""
+  events = ffi.new("SafetyEvent[]", SAFETY_EVENTS_SIZE)
+  count = safety.safety_events_read(events, SAFETY_EVENTS_SIZE)
+  return [(e.type, e.reason, e.addr, e.bus, e.len) for e in events[0:count]]
+
+
+def get_safety_addr_counters(safety: Panda = libsafety) -> dict[tuple[int, int], tuple[int, int]]:
+  """(tx blocked, rx invalid) counts by (addr, bus) since the safety mode was set"""
+  counter = ffi.new("SafetyAddrCounter *")
+  counters = {}
+  for slot in range(SAFETY_ADDR_COUNTERS_SIZE):
+    if safety.get_safety_addr_counter(slot, counter):
+      counters[(counter.addr, counter.bus)] = (counter.tx_blocked, counter.rx_invalid)
+  return counters
@@ -151,6 +151,152 @@ int get_angle_meas_max(void){
 }
 
 
+// ***** rx check and tx msg lookup helpers *****
+
+static SafetyLookupTable *get_safety_lookup(bool tx) {
+  return tx ? &tx_lookup : &rx_lookup;
+}
+
+int get_safety_lookup_len(bool tx) {
+  const SafetyLookupTable *table = get_safety_lookup(tx);
+  return table->valid ? (int)table->len : -1;
+}
+
+// longest probe sequence of an entry in the table, 1 means every entry is in its home slot
+int get_safety_lookup_max_probe(bool tx) {
+  const SafetyLookupTable *table = get_safety_lookup(tx);
+  int max_probe = 0;
+  for (uint32_t slot = 0U; slot < SAFETY_LOOKUP_SIZE; slot++) {
+    const SafetyLookupEntry *entry = &table->entries[slot];
+    if (entry->index != -1) {
+      uint32_t home = safety_lookup_hash(entry->addr, entry->bus, entry->len);
+      max_probe = MAX(max_probe, (int)((slot - home) & (SAFETY_LOOKUP_SIZE - 1U)) + 1);
+    }
+  }
+  return max_probe;
+}
+
+bool get_safety_lookup_entry(bool tx, int slot, CanMsg *msg) {
+  const SafetyLookupEntry *entry = &get_safety_lookup(tx)->entries[slot];
+  *msg = (CanMsg){entry->addr, entry->bus, entry->len};
+  return entry->index != -1;
+}
+
+// fall back to scanning the lists until the next set_safety_hooks
+void set_safety_lookup_valid(bool valid) {
+  rx_lookup.valid = valid;
+  tx_lookup.valid = valid;
+}
+
+int safety_lookup_rx_index(const CANPacket_t *to_push) {
+  return get_addr_check_index(to_push, current_safety_config.rx_checks, current_safety_config.rx_checks_len);
+}
+
+bool safety_lookup_tx_allowed(const CANPacket_t *to_send) {
+  return tx_msg_safety_check(to_send, current_safety_config.tx_msgs, current_safety_config.tx_msgs_len);
+}
+
+static uint64_t get_cycle_count(void) {
+#if defined(__x86_64__) || defined(__i386__)
+  return __builtin_ia32_rdtsc();
+#else
+  struct timespec ts;
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return ((uint64_t)ts.tv_sec * 1000000000ULL) + (uint64_t)ts.tv_nsec;
+#endif
+}
+
+static uint64_t time_lookup(bool tx, int addr, int bus, int len, int iterations) {
+  CANPacket_t to_push = {0};
+  to_push.addr = addr;
+  to_push.bus = bus;
+  to_push.extended = (addr >= 0x800) ? 1U : 0U;
+  for (uint8_t dlc = 0U; dlc < sizeof(dlc_to_len); dlc++) {
+    if (dlc_to_len[dlc] == len) {
+      to_push.data_len_code = dlc;
+    }
+  }
+
+  uint64_t start = get_cycle_count();
+  for (int i = 0; i < iterations; i++) {
+    if (tx) {
+      (void)safety_lookup_tx_allowed(&to_push);
+    } else {
+      (void)safety_lookup_rx_index(&to_push);
+    }
+  }
+  return (get_cycle_count() - start) / (uint64_t)iterations;
+}
+
+// average cycles (ns if there's no cycle counter) of the slowest lookup of a message in the
+// current safety config, or of one that's not in it
+uint64_t get_safety_lookup_cycles(bool tx, int iterations) {
+  uint64_t cycles = time_lookup(tx, 0x1FFFFFFF, 3, 64, iterations);
+  if (tx) {
+    for (int i = 0; i < current_safety_config.tx_msgs_len; i++) {
+      const CanMsg *msg = &current_safety_config.tx_msgs[i];
+      cycles = MAX(cycles, time_lookup(tx, msg->addr, msg->bus, msg->len, iterations));
+    }
+  } else {
+    for (int i = 0; i < current_safety_config.rx_checks_len; i++) {
+      for (uint8_t j = 0U; (j < MAX_ADDR_CHECK_MSGS) && (current_safety_config.rx_checks[i].msg[j].addr != 0); j++) {
+        const CanMsgCheck *msg = &current_safety_config.rx_checks[i].msg[j];
+        cycles = MAX(cycles, time_lookup(tx, msg->addr, msg->bus, msg->len, iterations));
+      }
+    }
+  }
+  return cycles;
+}
+
+// ***** safety event helpers *****
+
+bool get_safety_addr_counter(int slot, SafetyAddrCounter *counter) {
+  *counter = safety_addr_counters[slot];
+  return counter->used;
+}
+
+uint32_t get_safety_addr_counters_dropped(void) {
+  return safety_addr_counters_dropped;
+}
+
+uint32_t get_safety_events_dropped(void) {
+  return safety_events_dropped;
+}
+
+// ***** batch helpers *****
+
+typedef struct {
+  uint32_t timestamp;  // microseconds, the timer is set to this before the frame
+  bool tx;             // checked with the tx hook if set, the rx hook otherwise
+  bool tick;           // run safety_tick before the frame
+  bool tick_only;      // no frame to check, only set the timer and tick
+} SafetyFrame;
+
+typedef struct {
+  bool allowed;           // tx or rx hook return value, true if the frame is tick only
+  bool controls_allowed;  // after the frame
+  bool config_valid;      // safety_config_valid after the tick, true if the frame didn't tick
+} SafetyFrameResult;
+
+// runs frames through the safety hooks in order, in one call instead of several per frame
+void safety_replay_frames(CANPacket_t packets[], const SafetyFrame frames[], SafetyFrameResult results[], int len) {
+  for (int i = 0; i < len; i++) {
+    set_timer(frames[i].timestamp);
+    results[i].config_valid = true;
+    if (frames[i].tick) {
+      safety_tick(&current_safety_config);
+      results[i].config_valid = safety_config_valid();
+    }
+
+    results[i].allowed = true;
+    if (!frames[i].tick_only) {
+      can_set_checksum(&packets[i]);
+      results[i].allowed = frames[i].tx ? safety_tx_hook(&packets[i]) : safety_rx_hook(&packets[i]);
+    }
+    results[i].controls_allowed = controls_allowed;
+  }
+}
+
 // ***** car specific helpers *****
 
 void set_honda_alt_brake_msg(bool c){
@@ -44,6 +44,43 @@ def setup_safety_helpers(ffi):
 
   void init_tests(void);
 
+  typedef struct {
+    int addr;
+    int bus;
+    int len;
+  } CanMsg;
+  int get_safety_lookup_len(bool tx);
+  int get_safety_lookup_max_probe(bool tx);
+  bool get_safety_lookup_entry(bool tx, int slot, CanMsg *msg);
+  void set_safety_lookup_valid(bool valid);
+  int safety_lookup_rx_index(const CANPacket_t *to_push);
+  bool safety_lookup_tx_allowed(const CANPacket_t *to_send);
+  uint64_t get_safety_lookup_cycles(bool tx, int iterations);
+
+  typedef struct {
+    uint32_t addr;
+    uint8_t bus;
+    bool used;
+    uint32_t tx_blocked;
+    uint32_t rx_invalid;
+  } SafetyAddrCounter;
+  bool get_safety_addr_counter(int slot, SafetyAddrCounter *counter);
+  uint32_t get_safety_addr_counters_dropped(void);
+  uint32_t get_safety_events_dropped(void);
+
+  typedef struct {
+    uint32_t timestamp;
+    bool tx;
+    bool tick;
+    bool tick_only;
+  } SafetyFrame;
+  typedef struct {
+    bool allowed;
+    bool controls_allowed;
+    bool config_valid;
+  } SafetyFrameResult;
+  void safety_replay_frames(CANPacket_t packets[], const SafetyFrame frames[], SafetyFrameResult results[], int len);
+
   void set_honda_fwd_brake(bool c);
   bool get_honda_fwd_brake(void);
   void set_honda_alt_brake_msg(bool c);
@@ -93,6 +130,20 @@ class PandaSafety(Protocol):
 
   def init_tests(self) -> None: ...
 
+  def get_safety_lookup_len(self, tx: bool) -> int: ...
+  def get_safety_lookup_max_probe(self, tx: bool) -> int: ...
+  def get_safety_lookup_entry(self, tx: bool, slot: int, msg) -> bool: ...
+  def set_safety_lookup_valid(self, valid: bool) -> None: ...
+  def safety_lookup_rx_index(self, to_push) -> int: ...
+  def safety_lookup_tx_allowed(self, to_send) -> bool: ...
+  def get_safety_lookup_cycles(self, tx: bool, iterations: int) -> int: ...
+
+  def get_safety_addr_counter(self, slot: int, counter) -> bool: ...
+  def get_safety_addr_counters_dropped(self) -> int: ...
+  def get_safety_events_dropped(self) -> int: ...
+
+  def safety_replay_frames(self, packets, frames, results, len: int) -> None: ...  # noqa: A002
+
   def set_honda_fwd_brake(self, c: bool) -> None: ...
   def get_honda_fwd_brake(self) -> bool: ...
   def set_honda_alt_brake_msg(self, c: bool) -> None: ...
@@ -1,74 +1,179 @@
 #!/usr/bin/env python3
 import argparse
+import heapq
+import itertools
 from collections import Counter
-from tqdm import tqdm
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 
 from opendbc.car.carlog import carlog
 from opendbc.safety.tests.libsafety import libsafety_py
-from opendbc.safety.tests.safety_replay.helpers import package_can_msg, init_segment
+from opendbc.safety.tests.safety_replay.helpers import init_segment, is_steering_msg
+
+# frames are run through libsafety in batches of this many
+BATCH_SIZE = 10000
+# warm up/down period at the start and end of a route, where safety ticks are skipped.
+# msgs are also buffered this long to sort them by logMonoTime
+WARMUP_TIME = int(1e9)
+
+
+@dataclass
+class ReplayStats:
+  rx_tot: int = 0
+  rx_invalid: int = 0
+  tx_tot: int = 0
+  tx_blocked: int = 0
+  tx_controls: int = 0
+  tx_controls_blocked: int = 0
+  safety_tick_rx_invalid: bool = False
+  blocked_addrs: Counter = field(default_factory=Counter)
+  invalid_addrs: set = field(default_factory=set)
+
+  @property
+  def passed(self) -> bool:
+    return self.tx_controls_blocked == 0 and self.rx_invalid == 0 and not self.safety_tick_rx_invalid
+
+  def merge(self, other: 'ReplayStats') -> None:
+    self.rx_tot += other.rx_tot
+    self.rx_invalid += other.rx_invalid
+    self.tx_tot += other.tx_tot
+    self.tx_blocked += other.tx_blocked
+    self.tx_controls += other.tx_controls
+    self.tx_controls_blocked += other.tx_controls_blocked
+    self.safety_tick_rx_invalid |= other.safety_tick_rx_invalid
+    self.blocked_addrs.update(other.blocked_addrs)
+    self.invalid_addrs |= other.invalid_addrs
+
+  def print(self) -> None:
+    print("\nRX")
+    print("total rx msgs:", self.rx_tot)
+    print("invalid rx msgs:", self.rx_invalid)
+    print("safety tick rx invalid:", self.safety_tick_rx_invalid)
+    print("invalid addrs:", self.invalid_addrs)
+    print("\nTX")
+    print("total openpilot msgs:", self.tx_tot)
+    print("total msgs with controls allowed:", self.tx_controls)
+    print("blocked msgs:", self.tx_blocked)
+    print("blocked with controls allowed:", self.tx_controls_blocked)
+    print("blocked addrs:", self.blocked_addrs)
+
+
+class SegmentReplay:
+  """Runs a stream of log msgs through a safety mode, holding on to at most WARMUP_TIME of them"""
+
+  def __init__(self, safety: libsafety_py.Panda, safety_mode: int, param: int, alternative_experience: int):
+    self.safety = safety
+    self.stats = ReplayStats()
+    self.start_t: int | None = None
+    self.msgs: list = []  # heap of (logMonoTime, seq, msg)
+    self.seq = itertools.count()
+    self.frames: list = []
+    self.frame_msgs: list = []
+
+    err = safety.set_safety_hooks(safety_mode, param)
+    assert err == 0, "invalid safety mode: %d" % safety_mode
+    safety.set_alternative_experience(alternative_experience)
+
+  def push(self, msg) -> None:
+    if msg.which() not in ('can', 'sendcan'):
+      return
+
+    heapq.heappush(self.msgs, (msg.logMonoTime, next(self.seq), msg))
+    # msgs more than WARMUP_TIME before the newest aren't in the end of the route
+    while self.msgs[0][0] < msg.logMonoTime - WARMUP_TIME:
+      self._add_frames(heapq.heappop(self.msgs)[2], tick=True)
+
+  def finish(self) -> ReplayStats:
+    while len(self.msgs):
+      self._add_frames(heapq.heappop(self.msgs)[2], tick=False)
+    self._replay_frames()
+    return self.stats
+
+  def _add_frames(self, msg, tick: bool) -> None:
+    if self.start_t is None:
+      self.start_t = msg.logMonoTime
+    timestamp = (msg.logMonoTime // 1000) % 0xFFFFFFFF
+    # skip start of route, warm up period
+    tick = tick and msg.logMonoTime - self.start_t > WARMUP_TIME
+
+    # every log msg ticks, even without any frames to check
+    if tick:
+      self.frames.append((None, None, None, timestamp, False, True))
+      self.frame_msgs.append((msg.logMonoTime, None))
+
+    tx = msg.which() == 'sendcan'
+    # ignore msgs we sent
+    canmsgs = msg.sendcan if tx else filter(lambda m: m.src < 128, msg.can)
+    for canmsg in canmsgs:
+      self.frames.append((canmsg.address, canmsg.src % 4, canmsg.dat, timestamp, tx, False))
+      self.frame_msgs.append((msg.logMonoTime, canmsg))
+
+    if len(self.frames) >= BATCH_SIZE:
+      self._replay_frames()
+
+  def _replay_frames(self) -> None:
+    stats = self.stats
+    results = libsafety_py.replay_frames(self.frames, self.safety)
+    for (_, _, _, _, tx, tick), (log_mono_time, canmsg), result in zip(self.frames, self.frame_msgs, results, strict=True):
+      if tick:
+        stats.safety_tick_rx_invalid |= not result.config_valid
+
+      if canmsg is None:
+        continue
+      elif tx:
+        if not result.allowed:
+          stats.tx_blocked += 1
+          stats.tx_controls_blocked += result.controls_allowed
+          stats.blocked_addrs[canmsg.address] += 1
+
+          carlog.debug("blocked bus %d msg %d at %f" % (canmsg.src, canmsg.address, (log_mono_time - self.start_t) / 1e9))
+        stats.tx_controls += result.controls_allowed
+        stats.tx_tot += 1
+      else:
+        if not result.allowed:
+          stats.rx_invalid += 1
+          stats.invalid_addrs.add(canmsg.address)
+        stats.rx_tot += 1
+
+    self.frames, self.frame_msgs = [], []
+
+
+def replay_segment(msgs: Iterable, safety_mode: int | None = None, param: int | None = None, alternative_experience: int | None = None,
+                   safety: libsafety_py.Panda = libsafety_py.libsafety) -> ReplayStats:
+  """Replays a stream of log msgs, the safety mode, param and alternative experience default to the log's carParams"""
+  msgs = iter(msgs)
+
+  # buffer msgs until the safety mode is known, and there's a steering msg to initialize the segment with
+  head, checked = [], 0
+  for msg in msgs:
+    head.append(msg)
+    if msg.which() == 'carParams':
+      CP = msg.carParams
+      safety_mode = CP.safetyConfigs[-1].safetyModel.raw if safety_mode is None else safety_mode
+      param = CP.safetyConfigs[-1].safetyParam if param is None else param
+      alternative_experience = CP.alternativeExperience if alternative_experience is None else alternative_experience
+
+    if None not in (safety_mode, param, alternative_experience):
+      sendcan = (can for m in head[checked:] if m.which() == 'sendcan' for can in m.sendcan)
+      checked = len(head)
+      if any(is_steering_msg(safety_mode, param, can.address) for can in sendcan):
+        break
+  assert safety_mode is not None, "no carParams in log"
+  assert param is not None, "no carParams in log"
+  assert alternative_experience is not None, "no carParams in log"
+
+  replay = SegmentReplay(safety, safety_mode, param, alternative_experience)
+  init_segment(safety, head, safety_mode, param)
+  for msg in itertools.chain(head, msgs):
+    replay.push(msg)
+  return replay.finish()
+
 
 # replay a drive to check for safety violations
-def replay_drive(msgs, safety_mode, param, alternative_experience):
-  safety = libsafety_py.libsafety
-  msgs.sort(key=lambda m: m.logMonoTime)
-
-  err = safety.set_safety_hooks(safety_mode, param)
-  assert err == 0, "invalid safety mode: %d" % safety_mode
-  safety.set_alternative_experience(alternative_experience)
-
-  init_segment(safety, msgs, safety_mode, param)
-
-  rx_tot, rx_invalid, tx_tot, tx_blocked, tx_controls, tx_controls_blocked = 0, 0, 0, 0, 0, 0
-  safety_tick_rx_invalid = False
-  blocked_addrs = Counter()
-  invalid_addrs = set()
-
-  can_msgs = [m for m in msgs if m.which() in ('can', 'sendcan')]
-  start_t = can_msgs[0].logMonoTime
-  end_t = can_msgs[-1].logMonoTime
-  for msg in tqdm(can_msgs):
-    safety.set_timer((msg.logMonoTime // 1000) % 0xFFFFFFFF)
-
-    # skip start and end of route, warm up/down period
-    if msg.logMonoTime - start_t > 1e9 and end_t - msg.logMonoTime > 1e9:
-      safety.safety_tick_current_safety_config()
-      safety_tick_rx_invalid |= not safety.safety_config_valid() or safety_tick_rx_invalid
-
-    if msg.which() == 'sendcan':
-      for canmsg in msg.sendcan:
-        to_send = package_can_msg(canmsg)
-        sent = safety.safety_tx_hook(to_send)
-        if not sent:
-          tx_blocked += 1
-          tx_controls_blocked += safety.get_controls_allowed()
-          blocked_addrs[canmsg.address] += 1
-
-          carlog.debug("blocked bus %d msg %d at %f" % (canmsg.src, canmsg.address, (msg.logMonoTime - start_t) / 1e9))
-        tx_controls += safety.get_controls_allowed()
-        tx_tot += 1
-    elif msg.which() == 'can':
-      # ignore msgs we sent
-      for canmsg in filter(lambda m: m.src < 128, msg.can):
-        to_push = package_can_msg(canmsg)
-        recv = safety.safety_rx_hook(to_push)
-        if not recv:
-          rx_invalid += 1
-          invalid_addrs.add(canmsg.address)
-        rx_tot += 1
-
-  print("\nRX")
-  print("total rx msgs:", rx_tot)
-  print("invalid rx msgs:", rx_invalid)
-  print("safety tick rx invalid:", safety_tick_rx_invalid)
-  print("invalid addrs:", invalid_addrs)
-  print("\nTX")
-  print("total openpilot msgs:", tx_tot)
-  print("total msgs with controls allowed:", tx_controls)
-  print("blocked msgs:", tx_blocked)
-  print("blocked with controls allowed:", tx_controls_blocked)
-  print("blocked addrs:", blocked_addrs)
-
-  return tx_controls_blocked == 0 and rx_invalid == 0 and not safety_tick_rx_invalid
+def replay_drive(msgs, safety_mode, param, alternative_experience, safety: libsafety_py.Panda = libsafety_py.libsafety):
+  stats = replay_segment(msgs, safety_mode, param, alternative_experience, safety)
+  stats.print()
+  return stats.passed
 
 if __name__ == "__main__":
   from openpilot.tools.lib.logreader import LogReader
@@ -81,16 +186,5 @@ if __name__ == "__main__":
   parser.add_argument("--alternative-experience", type=int, help="Override the alternative experience from the log")
   args = parser.parse_args()
 
-  lr = LogReader(args.route_or_segment_name[0])
-
-  if None in (args.mode, args.param, args.alternative_experience):
-    CP = lr.first('carParams')
-    if args.mode is None:
-      args.mode = CP.safetyConfigs[-1].safetyModel.raw
-    if args.param is None:
-      args.param = CP.safetyConfigs[-1].safetyParam
-    if args.alternative_experience is None:
-      args.alternative_experience = CP.alternativeExperience
-
-  print(f"replaying {args.route_or_segment_name[0]} with safety mode {args.mode}, param {args.param}, alternative experience {args.alternative_experience}")
-  replay_drive(list(lr), args.mode, args.param, args.alternative_experience)
+  print(f"replaying {args.route_or_segment_name[0]}")
+  replay_drive(LogReader(args.route_or_segment_name[0]), args.mode, args.param, args.alternative_experience)
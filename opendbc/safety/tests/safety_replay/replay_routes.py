@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+
+from opendbc.safety.tests.safety_replay.replay_drive import ReplayStats, replay_segment
+
+# replay many routes or segments through their safety modes on a process pool, each worker process has its own libsafety
+
+
+def read_log(identifier: str):
+  from openpilot.tools.lib.logreader import LogReader
+  return LogReader(identifier)
+
+
+def replay_log(identifier: str, safety_mode: int | None, param: int | None, alternative_experience: int | None,
+               log_reader=read_log) -> tuple[str, ReplayStats | None, str | None]:
+  try:
+    return identifier, replay_segment(log_reader(identifier), safety_mode, param, alternative_experience), None
+  except Exception:
+    return identifier, None, traceback.format_exc()
+
+
+def replay_logs(identifiers: list[str], safety_mode: int | None = None, param: int | None = None, alternative_experience: int | None = None,
+                workers: int | None = None, log_reader=read_log) -> dict[str, ReplayStats | str]:
+  """Returns the stats of each log, or the exception if replaying it failed"""
+  results: dict[str, ReplayStats | str] = {}
+  with ProcessPoolExecutor(max_workers=workers) as executor:
+    futures = [executor.submit(replay_log, identifier, safety_mode, param, alternative_experience, log_reader) for identifier in identifiers]
+    for future in tqdm(as_completed(futures), total=len(futures)):
+      identifier, stats, error = future.result()
+      results[identifier] = stats if error is None else error
+  return results
+
+
+def merge_results(results: dict[str, ReplayStats | str]) -> tuple[ReplayStats, list[str], list[str]]:
+  """Returns the stats of all logs combined, the logs with safety violations, and the logs that couldn't be replayed"""
+  total = ReplayStats()
+  failed, errors = [], []
+  for identifier, result in results.items():
+    if isinstance(result, str):
+      errors.append(identifier)
+      continue
+
+    total.merge(result)
+    if not result.passed:
+      failed.append(identifier)
+  return total, failed, errors
+
+
+def print_report(results: dict[str, ReplayStats | str]) -> bool:
+  total, failed, errors = merge_results(results)
+  total.print()
+
+  print(f"\n{len(results)} logs replayed, {len(failed)} failed, {len(errors)} errors")
+  for identifier in failed:
+    print("failed:", identifier)
+  for identifier in errors:
+    print(f"error: {identifier}\n{results[identifier]}")
+  return len(failed) == 0 and len(errors) == 0
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Replay CAN messages from many routes or segments through their safety modes",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("route_or_segment_name", nargs='*')
+  parser.add_argument("--file", help="File with a route or segment name on each line")
+  parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+  parser.add_argument("--mode", type=int, help="Override the safety mode from the logs")
+  parser.add_argument("--param", type=int, help="Override the safety param from the logs")
+  parser.add_argument("--alternative-experience", type=int, help="Override the alternative experience from the logs")
+  args = parser.parse_args()
+
+  identifiers = list(args.route_or_segment_name)
+  if args.file is not None:
+    with open(args.file) as f:
+      identifiers += [line.strip() for line in f if line.strip()]
+
+  results = replay_logs(identifiers, args.mode, args.param, args.alternative_experience, args.workers)
+  sys.exit(0 if print_report(results) else 1)
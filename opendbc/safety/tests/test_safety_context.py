@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import ctypes
+import random
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from opendbc.car.structs import CarParams
+from opendbc.safety.tests.libsafety import libsafety_py
+
+SAFETY_MODES = [
+  (CarParams.SafetyModel.toyota, 0),
+  (CarParams.SafetyModel.hondaNidec, 0),
+  (CarParams.SafetyModel.hyundai, 0),
+  (CarParams.SafetyModel.gm, 0),
+]
+
+
+def make_frames(safety: libsafety_py.Panda, num_frames: int) -> list:
+  rng = random.Random(0)
+  msgs = [(False, msg) for msg in libsafety_py.get_safety_lookup_msgs(False, safety)] + \
+         [(True, msg) for msg in libsafety_py.get_safety_lookup_msgs(True, safety)]
+  frames = []
+  for i in range(num_frames):
+    tx, (addr, bus, length) = rng.choice(msgs)
+    frames.append((addr, bus, rng.randbytes(length), i * 1000, tx, i % 100 == 0))
+  return frames
+
+
+def replay(safety: libsafety_py.Panda, mode: int, param: int, num_frames: int = 20000) -> list[tuple[bool, bool, bool]]:
+  safety.set_safety_hooks(mode, param)
+  safety.init_tests()
+  safety.set_controls_allowed(True)
+  frames = make_frames(safety, num_frames)
+  return [(r.allowed, r.controls_allowed, r.config_valid) for r in libsafety_py.replay_frames(frames, safety)]
+
+
+class TestSafetyContext(unittest.TestCase):
+  def setUp(self):
+    self.contexts = [libsafety_py.create_safety_context() for _ in SAFETY_MODES]
+
+  def tearDown(self):
+    for safety in self.contexts:
+      libsafety_py.destroy_safety_context(safety)
+    libsafety_py.libsafety.set_safety_hooks(CarParams.SafetyModel.noOutput, 0)
+
+  def test_independent_state(self):
+    default = libsafety_py.libsafety
+    default.set_safety_hooks(CarParams.SafetyModel.noOutput, 0)
+    default.set_controls_allowed(False)
+
+    for safety, (mode, param) in zip(self.contexts, SAFETY_MODES, strict=True):
+      self.assertEqual(safety.set_safety_hooks(mode, param), 0)
+      safety.set_controls_allowed(True)
+
+    for safety, (mode, param) in zip(self.contexts, SAFETY_MODES, strict=True):
+      self.assertEqual((safety.get_current_safety_mode(), safety.get_current_safety_param()), (mode, param))
+      self.assertTrue(safety.get_controls_allowed())
+    self.assertEqual(default.get_current_safety_mode(), CarParams.SafetyModel.noOutput)
+    self.assertFalse(default.get_controls_allowed())
+
+    # relay malfunction is per context too
+    self.contexts[0].set_relay_malfunction(True)
+    self.assertFalse(any(safety.get_relay_malfunction() for safety in self.contexts[1:]))
+
+    # contexts are loaded with their symbols local, none of them resolve globally
+    ffi = libsafety_py.ffi
+    with mock.patch.object(ffi, "dlopen", wraps=ffi.dlopen) as dlopen:
+      self.contexts.append(libsafety_py.create_safety_context())
+    self.assertEqual(dlopen.call_args.args[1], ffi.RTLD_LOCAL | ffi.RTLD_NOW)
+    self.assertFalse(hasattr(ctypes.CDLL(None), "set_safety_hooks"))
+
+  def test_concurrent_replay(self):
+    # replays on threads with their own context match running them one after another
+    expected = [replay(libsafety_py.libsafety, mode, param) for mode, param in SAFETY_MODES]
+    with ThreadPoolExecutor(max_workers=len(self.contexts)) as executor:
+      results = list(executor.map(replay, self.contexts, *zip(*SAFETY_MODES, strict=True)))
+    self.assertEqual(results, expected)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import unittest
+
+from opendbc.car.structs import CarParams
+from opendbc.safety.tests.libsafety import libsafety_py
+
+# SAFETY_EVENT_* and SAFETY_EVENT_REASON_* in safety_declarations.h
+TX_BLOCKED, RX_INVALID, CONTROLS_ALLOWED, CONTROLS_NOT_ALLOWED = 1, 2, 3, 4
+REASON_TX_MSGS, REASON_TX_HOOK, REASON_RELAY_MALFUNCTION = 1, 2, 4
+REASON_CHECKSUM = 1
+REASON_RX, REASON_TX = 1, 2
+
+TOYOTA_STEER_TORQUE_SENSOR = 0x260  # rx check with a checksum
+
+
+class TestSafetyEvents(unittest.TestCase):
+  def setUp(self):
+    self.safety = libsafety_py.libsafety
+    self.safety.set_safety_hooks(CarParams.SafetyModel.toyota, 0)
+    self.safety.init_tests()
+    libsafety_py.get_safety_events()
+
+  def _tx(self, addr: int, bus: int = 0, length: int = 8) -> bool:
+    return bool(self.safety.safety_tx_hook(libsafety_py.make_CANPacket(addr, bus, bytes(length))))
+
+  def _rx(self, addr: int, bus: int = 0, length: int = 8) -> bool:
+    return bool(self.safety.safety_rx_hook(libsafety_py.make_CANPacket(addr, bus, bytes(length))))
+
+  def test_tx_blocked(self):
+    # only the first of many msgs blocked in a row is an event, all are counted
+    for _ in range(5):
+      self.assertFalse(self._tx(0x7ff, 1, 8))
+    self.assertEqual(libsafety_py.get_safety_events(), [(TX_BLOCKED, REASON_TX_MSGS, 0x7ff, 1, 8)])
+    self.assertEqual(libsafety_py.get_safety_addr_counters(), {(0x7ff, 1): (5, 0)})
+
+    self.safety.set_relay_malfunction(True)
+    self.assertFalse(self._tx(0x7ff, 1, 8))
+    self.assertEqual(libsafety_py.get_safety_events(), [(TX_BLOCKED, REASON_TX_MSGS | REASON_RELAY_MALFUNCTION, 0x7ff, 1, 8)])
+    self.assertEqual(libsafety_py.get_safety_addr_counters(), {(0x7ff, 1): (6, 0)})
+
+  def test_rx_invalid(self):
+    self.safety.set_controls_allowed(True)
+    for _ in range(3):
+      self.assertFalse(self._rx(TOYOTA_STEER_TORQUE_SENSOR))
+    self.assertEqual(libsafety_py.get_safety_events(), [
+      (RX_INVALID, REASON_CHECKSUM, TOYOTA_STEER_TORQUE_SENSOR, 0, 8),
+      (CONTROLS_NOT_ALLOWED, REASON_RX, TOYOTA_STEER_TORQUE_SENSOR, 0, 8),
+    ])
+    self.assertEqual(libsafety_py.get_safety_addr_counters(), {(TOYOTA_STEER_TORQUE_SENSOR, 0): (0, 3)})
+
+    # msgs without rx checks are never invalid
+    self.assertTrue(self._rx(0x7ff))
+    self.assertEqual(libsafety_py.get_safety_events(), [])
+
+  def test_overflow(self):
+    # the oldest events are dropped when they're not read in time, the counters keep the first addresses
+    dropped = self.safety.get_safety_events_dropped()
+    addrs = list(range(0x700, 0x700 + 2 * libsafety_py.SAFETY_EVENTS_SIZE))
+    for addr in addrs:
+      self._tx(addr)
+
+    events = libsafety_py.get_safety_events()
+    self.assertEqual([e[2] for e in events], addrs[-libsafety_py.SAFETY_EVENTS_SIZE:])
+    self.assertEqual(self.safety.get_safety_events_dropped() - dropped, libsafety_py.SAFETY_EVENTS_SIZE)
+
+    counters = libsafety_py.get_safety_addr_counters()
+    self.assertEqual(set(counters), {(addr, 0) for addr in addrs[:libsafety_py.SAFETY_ADDR_COUNTERS_SIZE]})
+    self.assertEqual(self.safety.get_safety_addr_counters_dropped(), len(addrs) - libsafety_py.SAFETY_ADDR_COUNTERS_SIZE)
+
+    # once full, the counters aren't scanned, events of addresses already in them are dropped too.
+    # they're still in the ring buffer
+    self._tx(addrs[0])
+    self.assertEqual([e[2] for e in libsafety_py.get_safety_events()], [addrs[0]])
+    self.assertEqual(libsafety_py.get_safety_addr_counters(), counters)
+    self.assertEqual(self.safety.get_safety_addr_counters_dropped(), len(addrs) + 1 - libsafety_py.SAFETY_ADDR_COUNTERS_SIZE)
+
+    # counters are per safety mode, events aren't
+    self._tx(0x7ff)
+    self.safety.set_safety_hooks(CarParams.SafetyModel.toyota, 0)
+    self.assertEqual(libsafety_py.get_safety_addr_counters(), {})
+    self.assertEqual(self.safety.get_safety_addr_counters_dropped(), 0)
+    self.assertEqual(libsafety_py.get_safety_events(), [(TX_BLOCKED, REASON_TX_MSGS, 0x7ff, 0, 8)])
+
+  def test_print(self):
+    self._tx(0x7fe)
+    self._tx(0x7ff)
+    self.safety.safety_events_print()
+    self.assertEqual(libsafety_py.get_safety_events(), [])
+
+
+if __name__ == "__main__":
+  unittest.main()
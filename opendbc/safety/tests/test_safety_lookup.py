@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import random
+import unittest
+
+from opendbc.car.structs import CarParams
+from opendbc.safety import LEN_TO_DLC
+from opendbc.safety.tests.libsafety import libsafety_py
+from opendbc.safety.tests.libsafety.libsafety_py import get_safety_lookup_msgs
+
+SAFETY_PARAMS = [0, *(1 << bit for bit in range(16)), 0xFFFF]
+
+
+def get_safety_configs():
+  """All safety modes with every single param flag set, and all of them set"""
+  safety = libsafety_py.libsafety
+  for name, mode in CarParams.SafetyModel.schema.enumerants.items():
+    for param in SAFETY_PARAMS:
+      if safety.set_safety_hooks(mode, param) == 0:
+        yield name, mode, param
+
+
+class TestSafetyLookup(unittest.TestCase):
+  def setUp(self):
+    self.safety = libsafety_py.libsafety
+
+  def tearDown(self):
+    self.safety.set_safety_hooks(CarParams.SafetyModel.noOutput, 0)
+
+  def _lookup(self, tx: bool, msgs: list[tuple[int, int, int]]) -> list[int]:
+    lookup = self.safety.safety_lookup_tx_allowed if tx else self.safety.safety_lookup_rx_index
+    return [lookup(libsafety_py.make_CANPacket(addr, bus, b"\x00" * length)) for addr, bus, length in msgs]
+
+  def test_lookup_tables(self):
+    for name, _, param in get_safety_configs():
+      for tx in (False, True):
+        with self.subTest(mode=name, param=param, tx=tx):
+          # every config fits, no lookups fall back to scanning the list
+          self.assertNotEqual(self.safety.get_safety_lookup_len(tx), -1)
+          self.assertEqual(self.safety.get_safety_lookup_len(tx), len(get_safety_lookup_msgs(tx)))
+          self.assertLessEqual(self.safety.get_safety_lookup_max_probe(tx), 8)
+
+  def test_matches_linear(self):
+    # hashed lookups return the same rx check index, latching the same msg, and tx allowed as scanning the lists
+    rng = random.Random(0)
+    for name, mode, param in get_safety_configs():
+      for tx in (False, True):
+        with self.subTest(mode=name, param=param, tx=tx):
+          msgs = []
+          for addr, bus, length in get_safety_lookup_msgs(tx):
+            other_len = next(ln for ln in LEN_TO_DLC if ln != length)
+            msgs += [(addr, bus, length), (addr + 1, bus, length), (addr, (bus + 1) % 4, length), (addr, bus, other_len)]
+          msgs = rng.sample(msgs * 2, len(msgs) * 2)
+
+          self.safety.set_safety_hooks(mode, param)
+          hashed = self._lookup(tx, msgs)
+
+          self.safety.set_safety_hooks(mode, param)
+          self.safety.set_safety_lookup_valid(False)
+          self.assertEqual(self.safety.get_safety_lookup_len(tx), -1)
+          linear = self._lookup(tx, msgs)
+
+          self.assertEqual(hashed, linear)
+
+  def test_lookup_benchmark(self):
+    # reports lookup cycles of the largest config of each safety mode, correctness is covered above
+    configs = {}
+    for name, mode, param in get_safety_configs():
+      size = self.safety.get_safety_lookup_len(False) + self.safety.get_safety_lookup_len(True)
+      if size > configs.get(name, (0, 0, -1))[2]:
+        configs[name] = (mode, param, size)
+
+    print(f"{'mode':<20} {'param':>6} {'rx msgs':>8} {'hashed':>7} {'linear':>7} {'tx msgs':>8} {'hashed':>7} {'linear':>7}")
+    for name, (mode, param, _) in configs.items():
+      row = f"{name:<20} {param:>6}"
+      for tx in (False, True):
+        self.safety.set_safety_hooks(mode, param)
+        num_msgs = self.safety.get_safety_lookup_len(tx)
+        # best of a few runs, worst case message of each
+        hashed = min(self.safety.get_safety_lookup_cycles(tx, 200) for _ in range(3))
+        self.safety.set_safety_lookup_valid(False)
+        linear = min(self.safety.get_safety_lookup_cycles(tx, 200) for _ in range(3))
+        row += f" {num_msgs:>8} {hashed:>7} {linear:>7}"
+      print(row)
+
+
+if __name__ == "__main__":
+  unittest.main()
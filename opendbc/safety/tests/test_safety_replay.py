@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import random
+import unittest
+from types import SimpleNamespace
+
+from opendbc.car.structs import CarParams
+from opendbc.safety.tests.safety_replay.replay_drive import ReplayStats, replay_segment
+from opendbc.safety.tests.safety_replay.replay_routes import merge_results, replay_logs
+
+# (addr, bus, len) of a few Toyota rx checks and tx msgs
+TOYOTA_RX = [(0xaa, 0, 8), (0x260, 0, 8), (0x1d2, 0, 8), (0x224, 0, 8), (0x226, 0, 8)]
+TOYOTA_TX = [(0x2e4, 0, 5), (0x343, 0, 8), (0x412, 0, 8)]
+
+
+class LogMsg(SimpleNamespace):
+  event: str
+
+  def which(self) -> str:
+    return self.event
+
+
+def make_log(identifier: str, num_msgs: int = 3000) -> list[LogMsg]:
+  if identifier.startswith("bad"):
+    raise ValueError(f"can't read {identifier}")
+
+  rng = random.Random(identifier)
+  CP = SimpleNamespace(safetyConfigs=[SimpleNamespace(safetyModel=SimpleNamespace(raw=CarParams.SafetyModel.toyota), safetyParam=0)],
+                       alternativeExperience=0)
+  msgs = [LogMsg(event='carParams', logMonoTime=0, carParams=CP)]
+  for i in range(num_msgs):
+    t = int(i * 1e7)
+    if i % 4 == 0:
+      can = [SimpleNamespace(address=addr, src=bus, dat=bytes(length)) for addr, bus, length in TOYOTA_TX]
+      msgs.append(LogMsg(event='sendcan', logMonoTime=t, sendcan=can))
+    else:
+      can = [SimpleNamespace(address=addr, src=bus + rng.choice((0, 128)), dat=rng.randbytes(length)) for addr, bus, length in TOYOTA_RX]
+      msgs.append(LogMsg(event='can', logMonoTime=t, can=can))
+  return msgs
+
+
+class TestSafetyReplay(unittest.TestCase):
+  def test_unsorted_log(self):
+    # msgs out of order by less than the warm up period are sorted
+    msgs = make_log("unsorted")
+    expected = replay_segment(msgs)
+
+    rng = random.Random(0)
+    unsorted = sorted(msgs, key=lambda m: m.logMonoTime + rng.randrange(int(0.5e9)))
+    self.assertEqual(replay_segment(unsorted), expected)
+    self.assertGreater(expected.rx_tot, 0)
+    self.assertGreater(expected.tx_tot, 0)
+
+  def test_tick_without_frames(self):
+    # log msgs without frames to check still tick, so rx checks that stop arriving are caught
+    msgs = [m for m in make_log("no_frames") if m.which() != 'sendcan' or m.logMonoTime < 1e9]
+    for m in msgs:
+      if m.which() == 'can':
+        m.can = [SimpleNamespace(address=c.address, src=c.src | 128, dat=c.dat) for c in m.can]
+
+    stats = replay_segment(msgs)
+    self.assertEqual(stats.rx_tot, 0)
+    self.assertTrue(stats.safety_tick_rx_invalid)
+
+  def test_merge(self):
+    stats = [replay_segment(make_log(f"merge/{i}")) for i in range(3)]
+    total, failed, errors = merge_results({f"merge/{i}": s for i, s in enumerate(stats)})
+    self.assertEqual(total.rx_tot, sum(s.rx_tot for s in stats))
+    self.assertEqual(total.tx_blocked, sum(s.tx_blocked for s in stats))
+    self.assertEqual(total.invalid_addrs, set.union(*(s.invalid_addrs for s in stats)))
+    self.assertEqual(sum(total.blocked_addrs.values()), total.tx_blocked)
+    self.assertEqual(failed, [f"merge/{i}" for i, s in enumerate(stats) if not s.passed])
+    self.assertEqual(errors, [])
+
+  def test_replay_logs(self):
+    # replays on a process pool have the same results as in this process
+    identifiers = [f"route/{i}" for i in range(4)] + ["bad/0"]
+    results = replay_logs(identifiers, workers=2, log_reader=make_log)
+
+    self.assertEqual(set(results), set(identifiers))
+    self.assertIn("can't read bad/0", results["bad/0"])
+    for identifier in identifiers[:-1]:
+      self.assertIsInstance(results[identifier], ReplayStats)
+      self.assertEqual(results[identifier], replay_segment(make_log(identifier)))
+
+
+if __name__ == "__main__":
+  unittest.main()